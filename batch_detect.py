@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys
+import argparse
+import numpy as np
+
+# Add src to path
+sys.path.append('src')
+
+from eeg.batch import load_recording, make_grid, run_batch
+from game_environments.batch_pong import simulate
+
+
+def parse_list(value, cast=float):
+    return [cast(v) for v in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run blink detection over a whole EEG recording')
+    parser.add_argument('recording', help='Recording file (.csv from muselsl record, .npy, or a --record session)')
+    parser.add_argument('--fs', type=int, default=None,
+                       help='Sampling rate (inferred from CSV timestamps if omitted)')
+    parser.add_argument('--alpha-thresholds', type=parse_list, default=[150.0],
+                       help='Comma-separated initial alpha thresholds to sweep')
+    parser.add_argument('--debounce-times', type=parse_list, default=[0.3],
+                       help='Comma-separated debounce times (s) to sweep')
+    parser.add_argument('--refractory-times', type=parse_list, default=[2.0],
+                       help='Comma-separated refractory times (s) to sweep')
+    parser.add_argument('--average-lengths', type=lambda v: parse_list(v, int), default=[10],
+                       help='Comma-separated running-mean lengths to sweep')
+    parser.add_argument('--no-adapt', action='store_true',
+                       help='Keep alpha thresholds fixed instead of adapting to the running median')
+    parser.add_argument('--play', action='store_true',
+                       help="Play each configuration's blinks against the Pong AI and report the score")
+    parser.add_argument('--output', default=None,
+                       help='Save features, window timestamps and blink decisions to this .npz file')
+    args = parser.parse_args()
+    
+    data, timestamps, fs = load_recording(args.recording, args.fs)
+    configs = make_grid(args.alpha_thresholds, args.debounce_times,
+                        args.refractory_times, args.average_lengths)
+    
+    print(f"Loaded {len(data)} samples ({len(data) / fs:.1f} s at {fs} Hz), "
+          f"evaluating {len(configs)} detector configurations")
+    result = run_batch(data, fs, timestamps, configs, adapt=not args.no_adapt)
+    
+    duration_min = len(data) / fs / 60.0
+    scores = None
+    if args.play:
+        # One simulated game per configuration, driven by its detected blinks
+        games = simulate([result.blink_times(i) for i in range(len(result.configs))],
+                         len(data) / fs, start_time=timestamps[0], seed=0)
+        scores = list(zip(games.l_score, games.r_score))
+    
+    header = f"{'alpha':>8} {'debounce':>8} {'refract':>8} {'avg':>4} {'blinks':>7} {'per min':>8}"
+    print(header + (f" {'won':>5} {'lost':>5}" if scores else ""))
+    for i, (config, count, valid) in enumerate(zip(result.configs, result.blink_counts(), result.valid)):
+        note = "" if valid else "  (threshold collapsed below 10)"
+        score = " {:5d} {:5d}".format(*scores[i]) if scores else ""
+        print(f"{config['alpha_threshold']:8.1f} {config['debounce_time']:8.2f} "
+              f"{config['refractory_time']:8.2f} {config['average_length']:4d} "
+              f"{count:7d} {count / duration_min:8.2f}{score}{note}")
+    
+    if args.output:
+        np.savez_compressed(args.output, timestamps=result.timestamps, features=result.features,
+                            configs=result.configs, blinks=result.blinks, valid=result.valid)
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
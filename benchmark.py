@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import subprocess
+import tempfile
+import tracemalloc
+import numpy as np
+
+# Render offscreen so the benchmark runs without a display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+# Add src to path
+sys.path.append('src')
+
+from eeg.stream import get_eeg_chunk
+from eeg.recording import EEGRecorder, ReplayInlet
+from eeg.pipeline import open_inlet, run_detector, InProcessDSP, DSPWorker
+from eeg.stream import EEGAcquisition
+from eeg.synthetic import MUSE_CHANNELS, SyntheticEEG, SyntheticStreams, scheduled_blinks, synthesize_eeg
+from eeg.pool import PooledDSP
+from eeg.processing import StreamingPreprocessor, BandPowerEngine, ALPHA, DELTA
+from eeg.batch import batch_filter, batch_band_powers
+from detection_methods.base import BAND_POWERS
+from detection_methods.registry import DETECTORS, DEFAULT_DETECTOR, create_detector
+from profiling.instrumentation import Instrumentation
+
+
+STAGES = ('get_eeg_chunk', 'preprocess', 'band_powers', 'detect_blink', 'frame')
+# Synthetic signal options for the single-stream runs: frontal alpha strong enough for
+# the band-power detector's adaptive threshold (SyntheticEEG puts half the alpha on AF7/AF8)
+SIGNAL = {'alpha_amplitude': 40.0}
+
+
+def summarize(durations) -> dict:
+    """Distribution of stage durations (seconds in, microseconds out)."""
+    if not len(durations):
+        return {'count': 0}
+    us = np.asarray(durations) * 1e6
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {'count': len(us), 'mean_us': float(us.mean()), 'p50_us': float(p50),
+            'p95_us': float(p95), 'p99_us': float(p99), 'max_us': float(us.max())}
+
+
+def match_detections(detections, onsets, max_delay: float = 1.5) -> dict:
+    """Pair each injected blink with the first detection within max_delay after it."""
+    detections = np.asarray(detections)
+    latencies = []
+    matched = np.zeros(len(detections), dtype=bool)
+    for onset in onsets:
+        candidates = np.flatnonzero(~matched & (detections >= onset) & (detections <= onset + max_delay))
+        if len(candidates):
+            matched[candidates[0]] = True
+            latencies.append(detections[candidates[0]] - onset)
+    return {'injected': len(onsets), 'detected': len(latencies),
+            'missed': len(onsets) - len(latencies), 'false_positives': int((~matched).sum()),
+            'latency_s': summarize(latencies) if latencies else {'count': 0},
+            'latencies': latencies}
+
+
+def calibrated_thresholds(baseline: np.ndarray, fs: int) -> dict:
+    """Thresholds at twice the blink-free median, as main.py's --calibration sets them."""
+    _, features = batch_band_powers(batch_filter(baseline, fs), fs)
+    return {'alpha_threshold': 2.0 * np.median(features[:, ALPHA]),
+            'delta_threshold': 2.0 * np.median(features[:, DELTA])}
+
+
+def run_benchmark(duration: float, fs: int = 256, chunk_size: int = 12,
+                  blink_interval: float = 3.0, render: bool = True,
+                  trace_memory: bool = False, seed: int = 0,
+                  detector_name: str = DEFAULT_DETECTOR) -> dict:
+    """Drive the real pipeline with synthetic EEG as fast as possible and time each stage."""
+    onsets = scheduled_blinks(duration, blink_interval, jitter=0.5, seed=seed)
+    data, timestamps = synthesize_eeg(duration, fs, onsets, seed=seed, **SIGNAL)
+    inlet = ReplayInlet.from_arrays(data, timestamps, fs, MUSE_CHANNELS, speed=0)
+
+    preprocessor = StreamingPreprocessor(fs, data.shape[1], window_size=fs)
+    band_engine = BandPowerEngine(fs, window_size=fs)
+    # Calibrate on the blink-free lead-in (all of it when the run is too short for a blink);
+    # runs shorter than one band-power window keep the detector's default thresholds
+    baseline = data[:int(onsets[0] * fs)] if len(onsets) else data
+    options = (calibrated_thresholds(baseline, fs)
+               if detector_name == 'band-power' and len(baseline) >= fs else {})
+    detector = create_detector(detector_name, fs, **options)
+
+    game = None
+    if render:
+        import pygame
+        from game_environments.pong import PongGame
+        game = PongGame(npc_mode=True)
+
+    # Preallocated so the benchmark's own bookkeeping does not show up as memory growth
+    max_chunks = -(-len(data) // chunk_size) + 1
+    times = {stage: np.zeros(max_chunks) for stage in STAGES}
+    counts = dict.fromkeys(STAGES, 0)
+    detections = []         # Signal time of the sample that completed each detecting update
+    compute_latencies = []  # Wall time from chunk pulled to paddle flipped
+    updates = 0
+    memory = []
+
+    def record(stage, elapsed):
+        times[stage][counts[stage]] = elapsed
+        counts[stage] += 1
+
+    if trace_memory:
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    perf = time.perf_counter
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-blink prints
+        while not inlet.finished:
+            t0 = perf()
+            eeg_data, chunk_timestamps = get_eeg_chunk(inlet, timeout=0.0, max_samples=chunk_size)
+            t1 = perf()
+            record('get_eeg_chunk', t1 - t0)
+            if eeg_data is None:
+                continue
+
+            processed = preprocessor.process(eeg_data, chunk_timestamps)
+            t2 = perf()
+            record('preprocess', t2 - t1)
+
+            rows = band_engine.update(processed)
+            t3 = perf()
+            record('band_powers', t3 - t2)
+
+            row_timestamps = np.asarray(chunk_timestamps)[band_engine.row_ends - 1]
+            updates += len(rows) if detector.input == BAND_POWERS else len(eeg_data)
+            for event in run_detector(detector, eeg_data, chunk_timestamps, rows, row_timestamps,
+                                      filtered=processed):
+                detections.append(event.timestamp)
+                if game is not None:
+                    game.queue_event(event)
+                else:
+                    compute_latencies.append(perf() - t0)
+            t4 = perf()
+            if len(rows) or detector.input != BAND_POWERS:
+                record('detect_blink', t4 - t3)
+
+            if game is not None:
+                game.process_events()
+                pending = len(game.pending_blinks)
+                game.update(chunk_timestamps[-1])  # Game time follows signal time
+                pygame.display.update(game.draw())
+                record('frame', perf() - t4)
+                # Blinks applied by this update flipped the paddle just now
+                compute_latencies.extend([perf() - t0] * (pending - len(game.pending_blinks)))
+
+            if trace_memory and len(memory) < int(chunk_timestamps[-1] - timestamps[0]) + 1:
+                memory.append(tracemalloc.get_traced_memory()[0])
+
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+    if trace_memory:
+        memory.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+    if game is not None:
+        game.cleanup()
+
+    matched = match_detections(detections, onsets)
+    matched.pop('latencies')
+    result = {
+        'stages': {stage: summarize(times[stage][:n]) for stage, n in counts.items() if n},
+        'detection': matched,
+        'compute_latency': summarize(compute_latencies),
+        'throughput': {
+            'signal_seconds': duration,
+            'wall_seconds': wall_time,
+            'cpu_seconds': cpu_time,
+            'realtime_factor': duration / wall_time if wall_time else float('inf'),
+            'updates_per_cpu_second': updates / cpu_time if cpu_time else float('inf'),
+            'detections_per_cpu_second': len(detections) / cpu_time if cpu_time else float('inf'),
+        },
+    }
+    if memory:
+        # Growth after the first second, once buffers and caches are allocated
+        baseline = memory[1] if len(memory) > 1 else memory[0]
+        result['memory'] = {'traced_start_bytes': baseline, 'traced_end_bytes': memory[-1],
+                            'growth_bytes': memory[-1] - baseline}
+    return result
+
+
+def run_frame_jitter(seconds: float, replay_speed: float, dsp_process: bool,
+                     fs: int = 256, seed: int = 0) -> dict:
+    """Play the game in real time on replayed EEG and measure frame-to-frame intervals.
+
+    The replay speed multiplies the DSP load per frame; with dsp_process the
+    pipeline runs in a DSPWorker instead of the game process.
+    """
+    from game_environments.pong import PongGame
+
+    duration = seconds * replay_speed + 5.0
+    data, timestamps = synthesize_eeg(duration, fs, scheduled_blinks(duration), seed=seed, **SIGNAL)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jitter.bin')
+        with EEGRecorder(path, fs, MUSE_CHANNELS) as recorder:
+            recorder.write(data, timestamps)
+
+        metrics = Instrumentation()
+        if dsp_process:
+            backend = DSPWorker(replay=path, replay_speed=replay_speed, metrics=metrics)
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                inlet, _, clock = open_inlet(path, replay_speed)
+            backend = InProcessDSP(EEGAcquisition(inlet, metrics=metrics), clock, metrics=metrics)
+        backend.start()
+        backend.set_detector(**calibrated_thresholds(data[:2 * fs], fs))
+        game = PongGame(npc_mode=True, metrics=metrics, clock=backend.clock)
+
+        intervals = []
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                end = time.perf_counter() + seconds
+                while time.perf_counter() < end:
+                    _, _, events = backend.poll()
+                    game.run_frame(events=events)
+                    intervals.append(game.scheduler.frame_time)
+        finally:
+            backend.stop()
+            game.cleanup()
+
+    intervals = np.asarray(intervals[1:])
+    return {'frames': summarize(intervals), 'std_us': float(intervals.std() * 1e6),
+            'dsp': summarize([]) if not metrics.stages.get('dsp') else
+            {'mean_us': metrics.stages['dsp'].mean * 1e6, 'count': metrics.stages['dsp'].count}}
+
+
+def run_scaling(max_streams: int, seconds: float, fs: int = 256, detector_name: str = DEFAULT_DETECTOR,
+                blink_rate: float = 20.0, dropout_rate: float = 0.0, jitter: float = 0.0,
+                seed: int = 0) -> list:
+    """Run 1, 2, 4, ... max_streams synthetic headsets in real time and measure the detection stack.
+
+    Each count gets fresh SyntheticStreams feeding one EEGAcquisition thread
+    per stream and a PooledDSP polled at 60 Hz, as the game loop does.
+    Detections are scored against the generator's ground truth.
+    """
+    options = {'blink_rate': blink_rate, 'dropout_rate': dropout_rate, 'jitter': jitter}
+    detector_options = {}
+    if detector_name == 'band-power':
+        baseline = SyntheticEEG(1, fs, blink_rate=0, seed=seed).generate(10 * fs)[0][0]
+        detector_options = calibrated_thresholds(baseline, fs)
+
+    counts = sorted({min(1 << k, max_streams) for k in range(max_streams.bit_length() + 1)})
+    results = []
+    for n in counts:
+        streams = SyntheticStreams(n, fs, seed=seed, **options)
+        metrics = Instrumentation(lsl_clock=streams.clock)
+        backend = PooledDSP([EEGAcquisition(inlet, metrics=metrics) for inlet in streams.inlets],
+                            streams.clock, metrics=metrics)
+        backend.set_detector(detector_name, **detector_options)
+        detections = [[] for _ in range(n)]
+        polls = []
+        backend.start()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            next_frame = start
+            while time.perf_counter() - start < seconds:
+                t0 = time.perf_counter()
+                for event in backend.poll():
+                    detections[event.source].append(event.timestamp)
+                polls.append(time.perf_counter() - t0)
+                next_frame += 1 / 60
+                time.sleep(max(next_frame - time.perf_counter(), 0.0))
+        finally:
+            backend.stop()
+        cpu_time = time.process_time() - cpu_start
+        wall_time = time.perf_counter() - start
+
+        # Blinks too close to the end may not have been reported yet
+        until = streams.clock() - 1.5
+        matched = [match_detections(detections[i], streams.generator.visible_blinks(i, until))
+                   for i in range(n)]
+        latencies = [latency for m in matched for latency in m['latencies']]
+        age = metrics.stages.get('chunk_age')
+        results.append({
+            'streams': n,
+            'poll': summarize(polls),
+            'cpu_percent': 100 * cpu_time / wall_time,
+            'samples_per_second': sum(a.sample_count for a in backend.acquisitions) / wall_time,
+            'chunk_age_p99_ms': age.percentile(99) * 1e3 if age is not None else 0.0,
+            'dropped_samples': metrics.counters.get('dropped_samples', 0),
+            'injected': sum(m['injected'] for m in matched),
+            'detected': sum(m['detected'] for m in matched),
+            'false_positives': sum(m['false_positives'] for m in matched),
+            'latency_s': summarize(latencies) if latencies else {'count': 0},
+        })
+    return results
+
+
+def environment() -> dict:
+    """Identify the code and machine a result came from."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor()}
+
+
+def compare(result: dict, baseline: dict):
+    """Print p50/p95 stage ratios against a previous result (>1 means slower now)."""
+    print(f"\nCompared with {baseline['environment'].get('commit')}:")
+    print(f"{'stage':>14} {'p50 ratio':>10} {'p95 ratio':>10}")
+    for stage, stats in result['stages'].items():
+        old = baseline['stages'].get(stage)
+        if not old or not old.get('count'):
+            continue
+        print(f"{stage:>14} {stats['p50_us'] / old['p50_us']:10.2f} {stats['p95_us'] / old['p95_us']:10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the blink pipeline on synthetic EEG')
+    parser.add_argument('--duration', type=float, default=120.0,
+                       help='Seconds of synthetic EEG to process')
+    parser.add_argument('--fs', type=int, default=256, help='Sampling rate')
+    parser.add_argument('--chunk-size', type=int, default=12,
+                       help='Samples per pulled chunk (MuseLSL pushes 12)')
+    parser.add_argument('--blink-interval', type=float, default=3.0,
+                       help='Seconds between injected blinks')
+    parser.add_argument('--no-render', action='store_true', help='Skip the pygame frame stage')
+    parser.add_argument('--detector', choices=sorted(DETECTORS), default=DEFAULT_DETECTOR,
+                       help='Blink detector to benchmark')
+    parser.add_argument('--memory', action='store_true',
+                       help='Track allocation growth with tracemalloc (slows the run)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--frame-jitter', type=float, default=None, metavar='SECONDS',
+                       help='Instead, compare frame-time variance with in-process vs worker DSP')
+    parser.add_argument('--replay-speed', type=float, default=8.0,
+                       help='DSP load for --frame-jitter, as a replay speed multiplier')
+    parser.add_argument('--streams', type=int, default=None, metavar='N',
+                       help='Instead, scale from 1 to N synthetic headsets in real time '
+                            '(--duration seconds each)')
+    parser.add_argument('--blink-rate', type=float, default=20.0,
+                       help='Poisson blinks per minute per headset, for --streams')
+    parser.add_argument('--dropout-rate', type=float, default=0.0,
+                       help='Dropouts per minute per headset, for --streams')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                       help='Timestamp jitter (seconds, standard deviation), for --streams')
+    parser.add_argument('--output', default=None, help='Write JSON results to this file')
+    parser.add_argument('--compare', default=None, help='Previous JSON result to compare against')
+    args = parser.parse_args()
+
+    if args.frame_jitter:
+        print(f"{'DSP':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'std ms':>8} {'game DSP ms':>12}")
+        for dsp_process in (False, True):
+            jitter = run_frame_jitter(args.frame_jitter, args.replay_speed, dsp_process,
+                                      args.fs, args.seed)
+            frames = jitter['frames']
+            print(f"{'worker' if dsp_process else 'in-process':>11} {frames['p50_us'] / 1e3:8.2f} "
+                  f"{frames['p95_us'] / 1e3:8.2f} {frames['p99_us'] / 1e3:8.2f} "
+                  f"{jitter['std_us'] / 1e3:8.2f} {jitter['dsp'].get('mean_us', 0) / 1e3:12.3f}")
+        return
+
+    if args.streams:
+        results = run_scaling(args.streams, args.duration, args.fs, args.detector, args.blink_rate,
+                              args.dropout_rate, args.jitter, args.seed)
+        print(f"{'streams':>7} {'CPU %':>6} {'samples/s':>10} {'poll p50 us':>11} {'poll p99 us':>11} "
+              f"{'age p99 ms':>10} {'dropped':>8} {'detected':>10} {'false +':>7} {'latency p50 ms':>14}")
+        for r in results:
+            latency = r['latency_s']
+            print(f"{r['streams']:7d} {r['cpu_percent']:6.1f} {r['samples_per_second']:10.0f} "
+                  f"{r['poll']['p50_us']:11.0f} {r['poll']['p99_us']:11.0f} {r['chunk_age_p99_ms']:10.1f} "
+                  f"{r['dropped_samples']:8d} {r['detected']:4d}/{r['injected']:<5d} {r['false_positives']:7d} "
+                  f"{latency['p50_us'] / 1e3 if latency['count'] else float('nan'):14.0f}")
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'scaling': results, 'environment': environment(), 'config': vars(args)}, f, indent=2)
+            print(f"Saved results to {args.output}")
+        return
+
+    result = run_benchmark(args.duration, args.fs, args.chunk_size, args.blink_interval,
+                           render=not args.no_render, trace_memory=args.memory, seed=args.seed,
+                           detector_name=args.detector)
+    result['environment'] = environment()
+    result['config'] = vars(args)
+
+    print(f"{'stage':>14} {'count':>7} {'p50 us':>9} {'p95 us':>9} {'p99 us':>9}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:>14} {stats['count']:7d} {stats['p50_us']:9.1f} "
+              f"{stats['p95_us']:9.1f} {stats['p99_us']:9.1f}")
+
+    detection = result['detection']
+    latency = detection['latency_s']
+    print(f"\nBlinks: {detection['detected']}/{detection['injected']} detected, "
+          f"{detection['false_positives']} false positives")
+    if latency['count']:
+        print(f"Detection latency after onset: p50 {latency['p50_us'] / 1e3:.0f} ms, "
+              f"p95 {latency['p95_us'] / 1e3:.0f} ms")
+    throughput = result['throughput']
+    print(f"Processed {throughput['signal_seconds']:.0f} s of EEG in {throughput['wall_seconds']:.2f} s "
+          f"({throughput['realtime_factor']:.0f}x real time), "
+          f"{throughput['updates_per_cpu_second']:.0f} detector updates per CPU second")
+    if 'memory' in result:
+        print(f"Traced memory growth: {result['memory']['growth_bytes'] / 1024:.1f} KiB")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import argparse
+import threading
+
+# Add src to path
+sys.path.append('src')
+
+from eeg.synthetic import SyntheticOutlets
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish synthetic Muse-like EEG streams over LSL')
+    parser.add_argument('--streams', type=int, default=1, help='Number of LSL outlets (headsets)')
+    parser.add_argument('--fs', type=int, default=256, help='Sampling rate')
+    parser.add_argument('--name', default='Synthetic',
+                       help='Stream name prefix; streams are NAME-1, NAME-2, ... (connect with --stream)')
+    parser.add_argument('--chunk-size', type=int, default=12,
+                       help='Samples per pushed chunk (MuseLSL pushes 12)')
+    parser.add_argument('--blink-rate', type=float, default=20.0,
+                       help='Poisson blink rate per minute (0 for none)')
+    parser.add_argument('--blink-interval', type=float, default=None,
+                       help='Blink every this many seconds instead of at random')
+    parser.add_argument('--dropout-rate', type=float, default=0.0,
+                       help='Dropouts (lost stretches of samples) per minute')
+    parser.add_argument('--dropout-duration', type=float, default=0.5, help='Seconds lost per dropout')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                       help='Standard deviation of timestamp jitter, in seconds')
+    parser.add_argument('--duration', type=float, default=None,
+                       help='Stop after this many seconds (default: until Ctrl+C)')
+    parser.add_argument('--truth', metavar='PATH', default=None,
+                       help='Write the ground-truth blink and dropout times (LSL clock) to PATH as JSON')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    outlets = SyntheticOutlets(args.streams, args.fs, name=args.name, chunk_size=args.chunk_size,
+                               blink_rate=args.blink_rate, blink_interval=args.blink_interval,
+                               dropout_rate=args.dropout_rate, dropout_duration=args.dropout_duration,
+                               jitter=args.jitter, seed=args.seed)
+    print(f"Publishing {args.streams} synthetic EEG streams at {args.fs} Hz: "
+          f"{outlets.names[0]}{' ... ' + outlets.names[-1] if args.streams > 1 else ''}")
+
+    stop = threading.Event()
+    pusher = threading.Thread(target=outlets.run, args=(args.duration, stop), daemon=True)
+    generator = outlets.generator
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    pusher.start()
+    try:
+        while pusher.is_alive():
+            pusher.join(5.0)
+            elapsed = time.perf_counter() - start
+            blinks = sum(len(b) for b in generator.blinks)
+            print(f"{generator.count / args.fs:7.0f} s  {generator.count * args.streams / elapsed:8.0f} samples/s  "
+                  f"{blinks} blinks  {outlets.late_chunks} late chunks  "
+                  f"CPU {100 * (time.process_time() - start_cpu) / elapsed:4.1f}%")
+    except KeyboardInterrupt:
+        stop.set()
+        pusher.join()
+
+    if args.truth:
+        truth = {name: {'blinks': generator.blinks[i], 'dropouts': generator.dropouts[i]}
+                 for i, name in enumerate(outlets.names)}
+        with open(args.truth, 'w') as f:
+            json.dump({'fs': args.fs, 'streams': truth}, f, indent=2)
+        print(f"Saved ground truth to {args.truth}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,73 +2,126 @@
 
 import sys
 import time
+STARTED = time.perf_counter()  # Start of the --startup-profile timeline
 import argparse
-import numpy as np
-from typing import Optional
+import threading
 
 # Add src to path
 sys.path.append('src')
 
-from eeg.stream import connect_to_muse, get_eeg_chunk, get_sampling_rate
-from eeg.processing import preprocess_eeg, compute_band_powers
-from detection_methods.blink_detection import BlinkDetector
+from eeg.stream import get_channel_names, EEGAcquisition
+from eeg.recording import EEGRecorder
+from eeg.pipeline import open_inlet, open_inlets, InProcessDSP, DSPWorker
+from eeg.pool import PooledDSP
+from eeg.processing import BANDS
+from detection_methods.calibration import (BaselineEstimator, CalibrationProfile, DriftMonitor,
+                                            ProfileStore, DEFAULT_PROFILE_DIR)
+from detection_methods.events import EventQueue
+from detection_methods.registry import DETECTORS, DEFAULT_DETECTOR
+from profiling.instrumentation import Instrumentation
+from profiling.startup import StartupProfile
+from profiling.telemetry import SessionTelemetry
 from game_environments.pong import PongGame
+from game_environments.broadcast import StatePublisher
 
 
-def calibrate_thresholds(inlet, fs):
-    """Calibrate EEG thresholds by recording baseline without blinking."""
+def calibrate(backend, key: str, max_time: float = 5.0, tolerance: float = 0.1) -> CalibrationProfile:
+    """Measure eyes-open baselines, stopping as soon as the estimate settles."""
     print("\n=== EEG CALIBRATION ===")
-    print("Please sit still and stare at the screen WITHOUT BLINKING for 5 seconds.")
+    print(f"Please sit still and stare at the screen WITHOUT BLINKING for up to {max_time:.0f} seconds.")
     print("This will help set your personal blink detection thresholds.")
     input("Press ENTER when ready...")
     
     print("Calibrating... DO NOT BLINK!")
     
-    alpha_values = []
-    delta_values = []
+    # Band powers come from the same pipeline as the main loop (no detector yet)
+    backend.poll()  # Discard samples that arrived while waiting for ENTER
+    estimator = BaselineEstimator(tolerance=tolerance)
     
-    # Use same buffering approach as main loop
-    eeg_buffer = []
-    buffer_size = 256  # 1 second of data at 256 Hz
-    
-    # Collect 5 seconds of data
     start_time = time.time()
-    while time.time() - start_time < 5.0:
-        eeg_data, timestamp = get_eeg_chunk(inlet, timeout=0.05, max_samples=128)
+    while time.time() - start_time < max_time and not estimator.converged:
+        rows, _, _ = backend.poll()
         
-        if eeg_data is not None and len(eeg_data) > 0:
-            # Add new data to buffer (same as main loop)
-            eeg_buffer.extend(eeg_data)
-            
-            # Keep buffer at fixed size
-            if len(eeg_buffer) > buffer_size:
-                eeg_buffer = eeg_buffer[-buffer_size:]
-            
-            # Only process if we have enough data (same as main loop)
-            if len(eeg_buffer) >= 64:
-                processed_data = preprocess_eeg(np.array(eeg_buffer), fs)
-                band_powers = compute_band_powers(processed_data, fs)
-                
-                alpha_values.append(band_powers['alpha'])
-                delta_values.append(band_powers['delta'])
+        if len(rows) > 0:
+            estimator.add(rows)
+        else:
+            time.sleep(0.005)
         
         # Show progress
         elapsed = time.time() - start_time
-        print(f"\rProgress: {elapsed:.1f}/5.0 seconds", end="", flush=True)
+        print(f"\rProgress: {elapsed:.1f}/{max_time:.1f} seconds", end="", flush=True)
+    
+    status = "converged" if estimator.converged else "time limit reached"
+    print(f"\nCalibration complete ({status} after {estimator.updates} updates)!")
     
-    print("\nCalibration complete!")
+    alpha_baseline, delta_baseline = estimator.baselines
+    profile = CalibrationProfile.from_baselines(key, backend.fs, backend.channel_names,
+                                                alpha_baseline, delta_baseline, estimator.updates)
     
-    # Calculate thresholds
-    alpha_baseline = np.median(alpha_values)
-    delta_baseline = np.median(delta_values)
+    print(f"Alpha baseline: {alpha_baseline:.2f}, threshold: {profile.alpha_threshold:.2f}")
+    print(f"Delta baseline: {delta_baseline:.2f}, threshold: {profile.delta_threshold:.2f}")
     
-    alpha_threshold = alpha_baseline * 2.0
-    delta_threshold = delta_baseline * 2.0
+    return profile
+
+
+class BackgroundCall(threading.Thread):
+    """Run fn(*args) on a daemon thread; its return value or exception is kept."""
     
-    print(f"Alpha baseline: {alpha_baseline:.2f}, threshold: {alpha_threshold:.2f}")
-    print(f"Delta baseline: {delta_baseline:.2f}, threshold: {delta_threshold:.2f}")
+    def __init__(self, fn, *args):
+        super().__init__(name=getattr(fn, '__name__', 'BackgroundCall'), daemon=True)
+        self.fn = fn
+        self.args = args
+        self.result = None
+        self.error = None
+        self.duration = 0.0
     
-    return alpha_threshold, delta_threshold
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.result = self.fn(*self.args)
+        except Exception as e:
+            self.error = e
+        self.duration = time.perf_counter() - start
+
+
+def open_backend(args, two_headsets: bool, buffer_size: int, metrics, events, telemetry=None):
+    """Connect to the headset(s) or recording(s) and start the DSP backend."""
+    replay = args.replay[0] if args.replay else None
+    stream = args.stream[0] if args.stream else None
+    backend = None
+    if two_headsets:
+        # One pooled pipeline for both headsets; the second controls the right paddle
+        inlets, clock = open_inlets(args.replay, args.stream, args.replay_speed)
+        acquisitions = [EEGAcquisition(inlet, metrics=metrics) for inlet in inlets]
+        backend = PooledDSP(acquisitions, clock, window_size=buffer_size, metrics=metrics,
+                            events=events, telemetry=telemetry)
+        backend.start()
+        return backend
+    
+    if args.dsp_process:
+        # Acquisition and DSP in their own process; results come back through shared memory
+        try:
+            backend = DSPWorker(replay=replay, replay_speed=args.replay_speed,
+                                record=args.record, window_size=buffer_size, metrics=metrics,
+                                stream=stream, events=events, telemetry=telemetry)
+            backend.start()
+            return backend
+        except RuntimeError as e:
+            print(f"DSP worker unavailable ({e}); processing in-process instead")
+    
+    inlet, fs, clock = open_inlet(replay, args.replay_speed, stream)
+    
+    # Pull samples on a background thread so the frame loop never waits on LSL
+    acquisition = EEGAcquisition(inlet, metrics=metrics)
+    if args.record:
+        info = inlet.info()
+        acquisition.recorder = EEGRecorder(args.record, fs, get_channel_names(info),
+                                           dtype=acquisition.buffer.dtype,
+                                           source_id=info.source_id())
+    backend = InProcessDSP(acquisition, clock, window_size=buffer_size, metrics=metrics,
+                           events=events, telemetry=telemetry)
+    backend.start()
+    return backend
 
 
 def main():
@@ -79,91 +132,227 @@ def main():
                        help='Play against AI opponent instead of human player')
     parser.add_argument('--calibration', action='store_true', 
                        help='Run EEG calibration to set blink detection thresholds')
+    parser.add_argument('--detector', choices=sorted(DETECTORS), default=DEFAULT_DETECTOR,
+                       help='Blink detector: band-power (alpha power, ~0.5 s latency), '
+                            'time-domain (raw AF7/AF8 amplitude, tens of ms) or multi-channel '
+                            '(per-channel band powers, rejects artifacts that also reach TP9/TP10)')
+    parser.add_argument('--user', default=None,
+                       help='Name of the calibration profile to load/save (default: the headset source_id)')
+    parser.add_argument('--profile-dir', default=DEFAULT_PROFILE_DIR,
+                       help='Directory of saved calibration profiles')
+    parser.add_argument('--no-recalibrate', action='store_true',
+                       help='Keep calibrated thresholds fixed instead of re-calibrating when the baseline drifts')
+    parser.add_argument('--record', metavar='PATH', default=None,
+                       help='Record raw EEG samples and timestamps to PATH while playing')
+    parser.add_argument('--stream', metavar='NAME', action='append', default=[],
+                       help='LSL stream name or source_id to connect to; give twice for two headsets '
+                            '(the second controls the right paddle)')
+    parser.add_argument('--replay', metavar='PATH', action='append', default=[],
+                       help='Replay a recorded session instead of connecting to a headset; '
+                            'give twice to replay two headsets')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                       help='Replay speed multiplier (must be positive; use batch_detect.py to '
+                            'process a recording as fast as possible)')
+    parser.add_argument('--fps', type=float, default=60.0,
+                       help='Target frame rate (physics always ticks at 60 Hz)')
+    parser.add_argument('--dsp-process', action='store_true',
+                       help='Run acquisition and DSP in a separate process (falls back to in-process)')
+    parser.add_argument('--hud', action='store_true',
+                       help='Show a performance overlay and print timing stats on exit')
+    parser.add_argument('--startup-profile', action='store_true',
+                       help='Print the time spent in each startup phase')
+    parser.add_argument('--telemetry', metavar='DIR', default=None,
+                       help='Log band powers, detector state, blinks and game events to DIR '
+                            '(a new or empty directory)')
+    parser.add_argument('--broadcast', metavar='ADDRESS', default=None,
+                       help='Publish game state every tick for spectate.py viewers '
+                            '(host:port for UDP, or a Unix socket path)')
     args = parser.parse_args()
+    if args.replay_speed <= 0:
+        # An unpaced replay outruns the acquisition ring and its timestamps mean nothing to the game
+        parser.error("--replay-speed must be positive")
+    
+    startup = StartupProfile(enabled=args.startup_profile, start=STARTED)
+    startup.mark('imports')
     
     simulation_mode = args.simulation
     npc_mode = args.npc
     calibration_mode = args.calibration
+    n_headsets = len(args.replay) or len(args.stream) or 1  # Recordings take precedence
+    if n_headsets > 2:
+        print("At most two headsets are supported (one per paddle)")
+        return
+    two_headsets = n_headsets == 2 and not simulation_mode
+    if calibration_mode and args.detector != 'band-power':
+        print(f"The {args.detector} detector adapts its own baseline; skipping calibration")
+        calibration_mode = False
+    if two_headsets and (args.dsp_process or args.record or calibration_mode):
+        print("--dsp-process, --record and --calibration apply to a single headset; ignoring")
+        calibration_mode = False
     
-    # Initialize EEG components BEFORE pygame (only if not in simulation mode)
-    inlet = None
-    blink_detector = None
-    eeg_buffer = []
+    backend = None
+    drift = None  # Watches for baseline drift when a calibration profile is in use
+    store = ProfileStore(args.profile_dir)
     buffer_size = 256  # 1 second of data at 256 Hz
+    metrics = Instrumentation(enabled=args.hud)
+    # Detected blinks flow from the DSP backend to the game as timestamped events
+    events = EventQueue(metrics=metrics)
+    # Written by a background thread; see profiling.telemetry.load_table to read it back
+    telemetry = None
+    if args.telemetry:
+        try:
+            telemetry = SessionTelemetry(args.telemetry, BANDS, metrics=metrics)
+        except OSError as e:
+            parser.error(f"--telemetry: {e}")
     
+    # Resolve the stream and load the DSP code on a background thread while
+    # pygame opens the window (only if not in simulation mode)
+    connector = None
     if not simulation_mode:
+        connector = BackgroundCall(open_backend, args, two_headsets, buffer_size, metrics, events,
+                                   telemetry)
+        connector.start()
+    else:
+        print("Running in simulation mode - press SPACEBAR to blink")
+    
+    broadcast = None
+    if args.broadcast:
+        try:
+            broadcast = StatePublisher(args.broadcast)
+            print(f"Broadcasting game state on {args.broadcast}")
+        except OSError as e:
+            print(f"Cannot broadcast on {args.broadcast} ({e}); continuing without")
+    
+    # The game clock is switched to the blink timestamps' clock once connected,
+    # so each blink lands on its own physics tick
+    game = PongGame(npc_mode=npc_mode, metrics=metrics if args.hud else None,
+                    fps=args.fps, clock=metrics.lsl_clock, blink_right=two_headsets, events=events,
+                    telemetry=telemetry, broadcast=broadcast)
+    startup.mark('window')
+    
+    if connector is not None:
         try:
-            print("Connecting to Muse EEG stream...")
-            inlet, fs = connect_to_muse()
+            # Keep the window responsive and say what we are waiting for
+            while connector.is_alive() and game.show_status("Connecting to EEG stream..."):
+                connector.join(0.05)
+            if connector.is_alive():
+                print("Window closed; waiting for the EEG connection to finish...")
+            connector.join()
+            startup.mark('wait for EEG')
+            startup.add('EEG connect', connector.duration)
+            backend = connector.result
+            if connector.error is not None:
+                raise connector.error
+            if args.record and not two_headsets:
+                print(f"Recording raw EEG to {args.record}")
+            metrics.lsl_clock = game.clock = backend.clock
+            if not game.running:  # Window closed while connecting
+                backend.stop()
+                game.cleanup()
+                if telemetry is not None:
+                    telemetry.close()
+                if broadcast is not None:
+                    broadcast.close()
+                return
             
-            if calibration_mode:
-                # Run calibration to get personalized thresholds
-                alpha_threshold, delta_threshold = calibrate_thresholds(inlet, fs)
-                blink_detector = BlinkDetector(delta_threshold=delta_threshold, 
-                                             alpha_threshold=alpha_threshold)
+            # Calibration profiles are per user/headset and only tune the band-power detector
+            profile = None
+            if args.detector == 'band-power' and not two_headsets:
+                key = args.user or backend.source_id
+                if calibration_mode:
+                    # Run calibration to get personalized thresholds, and keep them
+                    game.show_status("Calibrating - see the terminal")
+                    profile = calibrate(backend, key or 'default')
+                    startup.mark('calibration')
+                    if key:
+                        store.save(profile)
+                        print(f"Saved calibration profile to {store.path(key)}")
+                    else:
+                        print("The stream has no source_id; pass --user to save the calibration")
+                elif key:
+                    profile = store.load(key)
+                    if profile is not None and not profile.matches(backend.fs, backend.channel_names):
+                        print(f"Calibration profile '{key}' is for a different stream layout; ignoring it")
+                        profile = None
+                    elif profile is not None:
+                        print(f"Loaded calibration profile '{key}' from "
+                              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(profile.created))}")
+            
+            if profile is not None:
+                backend.set_detector(args.detector, **profile.detector_options())
+                if not args.no_recalibrate:
+                    drift = DriftMonitor(profile)
             else:
                 # Use default thresholds
-                blink_detector = BlinkDetector()
+                backend.set_detector(args.detector)
             
             print("EEG connection established!")
         except RuntimeError as e:
+            if backend is not None:
+                backend.stop()
+            game.cleanup()
+            if telemetry is not None:
+                telemetry.close()
+            if broadcast is not None:
+                broadcast.close()
             print(f"Failed to connect to EEG stream: {e}")
             print("You can run in simulation mode with --simulation flag")
             return
-    else:
-        print("Running in simulation mode - press SPACEBAR to blink")
-    
-    # Initialize game AFTER EEG calibration
-    game = PongGame(npc_mode=npc_mode)
     
     print("Starting Muse-Pong! Blink to move the paddle.")
-    if npc_mode:
+    if two_headsets:
+        print("Two headsets: the second headset's blinks move the right paddle.")
+    elif npc_mode:
         print("Playing against AI opponent.")
     else:
         print("Playing against human opponent - use UP/DOWN arrows for right paddle.")
-    if calibration_mode and not simulation_mode:
+    if drift is not None:
         print("Using calibrated blink detection thresholds.")
     print("Close the window to quit.")
     
     # Main game loop
+    report_startup = startup.enabled
     try:
         while game.running:
-            blink_detected = False
-            
-            # Get EEG data and detect blinks (only if not in simulation mode)
-            if not simulation_mode and inlet is not None:
-                eeg_data, timestamp = get_eeg_chunk(inlet, timeout=0.05, max_samples=128)
+            # Process samples that arrived since the last frame (only if not in simulation mode);
+            # each sample is filtered once, and blinks are queued as events for the game
+            if backend is not None:
+                result = backend.poll()
                 
-                if eeg_data is not None and len(eeg_data) > 0:
-                    # Add new data to buffer
-                    eeg_buffer.extend(eeg_data)
-                    
-                    # Keep buffer at fixed size
-                    if len(eeg_buffer) > buffer_size:
-                        eeg_buffer = eeg_buffer[-buffer_size:]
-                    
-                    # Only process if we have enough data
-                    if len(eeg_buffer) >= 64:  # Minimum for processing
-                        # Process EEG data
-                        processed_data = preprocess_eeg(np.array(eeg_buffer), fs)
-                        band_powers = compute_band_powers(processed_data, fs)
-                        
-                        # Detect blink
-                        blink_detected = blink_detector.detect_blink(band_powers)
-                        
-                        if blink_detected:
-                            print("Blink detected!")
+                # Re-calibrate from play data if the baseline has moved
+                profile = drift.add(result[0]) if drift is not None else None
+                if profile is not None:
+                    backend.set_detector(args.detector, **profile.detector_options())
+                    if args.user or backend.source_id:
+                        store.save(profile)
+                    print(f"Baseline drifted; re-calibrated (alpha threshold {profile.alpha_threshold:.2f})")
             
-            # Run one frame of the game
-            if not game.run_frame(blink_detected, simulation_mode):
+            # Run one frame of the game; it applies every pending event at its own tick
+            if not game.run_frame(simulation_mode=simulation_mode):
                 break
+            if report_startup:
+                startup.mark('first frame')
+                print(startup.report())
+                report_startup = False
                 
     except KeyboardInterrupt:
         print("\nGame interrupted by user")
     except Exception as e:
         print(f"Error during game loop: {e}")
     finally:
+        if backend is not None:
+            backend.stop()
+            if args.record and not two_headsets:
+                print(f"Saved EEG recording to {args.record}")
         game.cleanup()
+        if telemetry is not None:
+            telemetry.close()
+            dropped = f" ({telemetry.dropped_rows} rows dropped)" if telemetry.dropped_rows else ""
+            print(f"Saved telemetry to {args.telemetry}{dropped}")
+        if broadcast is not None:
+            broadcast.close()
+        if metrics.enabled:
+            print(metrics.report())
         print("Game ended")
 
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import argparse
+
+# Add src to path
+sys.path.append('src')
+
+from game_environments.broadcast import DEFAULT_ADDRESS, StateReceiver, GameSnapshot
+from game_environments.pong_state import TICK
+
+
+def show(game, previous: GameSnapshot, current: GameSnapshot):
+    """Load received snapshots into the PongGame's state so its renderer can draw them."""
+    state = game.state
+    state.ball_pos = [current.ball_x, current.ball_y]
+    state.paddle1_pos[1] = current.paddle1_y
+    state.paddle2_pos[1] = current.paddle2_y
+    state.l_score, state.r_score = current.l_score, current.r_score
+    state.game_started = current.game_started
+    # Velocity from consecutive ticks, for the predicted landing point
+    if previous is not None and current.sequence - previous.sequence == 1:
+        state.ball_vel = [(current.ball_x - previous.ball_x) / TICK,
+                          (current.ball_y - previous.ball_y) / TICK]
+    else:
+        state.ball_vel = [0.0, 0.0]
+    game.previous = None if previous is None else (previous.positions()
+                                                   + (previous.l_score, previous.r_score,
+                                                      previous.game_started))
+
+
+def watch(receiver: StateReceiver, fps: float, duration: float = None):
+    """Render the broadcast match, blending between the last two ticks received."""
+    import pygame
+    from game_environments.pong import PongGame
+
+    game = PongGame(fps=fps)
+    pygame.display.set_caption("Muse-Pong (spectator)")
+    previous = current = None
+    arrived = 0.0
+    end = None if duration is None else time.perf_counter() + duration
+    try:
+        while end is None or time.perf_counter() < end:
+            snapshots = receiver.poll()
+            if snapshots:
+                previous = snapshots[-2] if len(snapshots) > 1 else current
+                current = snapshots[-1]
+                arrived = time.perf_counter()
+                show(game, previous, current)
+            if current is None:
+                if not game.show_status(f"Waiting for a game on {receiver.address}..."):
+                    break
+            else:
+                running, _ = game.process_events()
+                if not running:
+                    break
+                alpha = min((time.perf_counter() - arrived) / TICK, 1.0)
+                pygame.display.update(game.draw(alpha))
+            game.scheduler.wait()
+    finally:
+        game.cleanup()
+
+
+def follow(receiver: StateReceiver, duration: float = None):
+    """Headless consumer: print the score and link statistics once a second."""
+    start = last_report = time.perf_counter()
+    current = None
+    received = received_bytes = 0
+    while duration is None or time.perf_counter() - start < duration:
+        snapshots = receiver.poll()
+        if snapshots:
+            current = snapshots[-1]
+        time.sleep(TICK / 4)
+        now = time.perf_counter()
+        if now - last_report >= 1.0:
+            packets = receiver.received - received
+            rate = (receiver.received_bytes - received_bytes) / (now - last_report)
+            received, received_bytes, last_report = receiver.received, receiver.received_bytes, now
+            if current is None:
+                print(f"waiting for a game on {receiver.address}")
+                continue
+            print(f"tick {current.sequence:8d}  score {current.l_score}-{current.r_score}  "
+                  f"{'playing' if current.game_started else 'waiting'}  "
+                  f"{packets} packets  {rate:6.0f} B/s  lost {receiver.decoder.lost}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch a Muse-Pong game broadcast with --broadcast')
+    parser.add_argument('address', nargs='?', default=DEFAULT_ADDRESS,
+                       help=f'Publisher address: host:port (UDP) or a Unix socket path (default {DEFAULT_ADDRESS})')
+    parser.add_argument('--headless', action='store_true',
+                       help='Print the score and link statistics instead of opening a window')
+    parser.add_argument('--fps', type=float, default=60.0,
+                       help='Viewer frame rate')
+    parser.add_argument('--duration', type=float, default=None,
+                       help='Stop after this many seconds')
+    args = parser.parse_args()
+
+    receiver = StateReceiver(args.address)
+    try:
+        if args.headless:
+            follow(receiver, args.duration)
+        else:
+            watch(receiver, args.fps, args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+# What a detector consumes in update()
+BAND_POWERS = 'band_powers'  # One row per band-power update (eeg.processing BANDS layout)
+SAMPLES = 'samples'          # Raw EEG rows (samples x channels) as they arrive
+FILTERED = 'filtered'        # The same rows after the pipeline's 1-40 Hz bandpass
+
+
+class Detector:
+    """Interface shared by the blink detectors in the registry.
+
+    `update(values, timestamps)` takes rows of the kind named by `input`
+    with their signal timestamps and returns one score per row: 0 where no
+    blink was detected, otherwise the detection confidence (statistic over
+    threshold, so >= 1). Detectors are stateful and see each row exactly
+    once; debouncing uses the timestamps, never the wall clock.
+    """
+
+    input = BAND_POWERS
+    state_fields = ()  # Names of the values state() returns, e.g. for telemetry
+
+    @classmethod
+    def create(cls, fs: int, **kwargs) -> 'Detector':
+        """Build a detector for a stream sampled at fs (ignored by band-power detectors)."""
+        return cls(**kwargs)
+
+    def update(self, values: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def state(self) -> tuple:
+        """Current internal values (thresholds, baselines), in state_fields order."""
+        return tuple(getattr(self, name) for name in self.state_fields)
@@ -1,76 +1,94 @@
 import numpy as np
-from typing import Dict, Optional
+from typing import Optional
 import time
 
+from eeg.processing import ALPHA, DELTA
+from detection_methods.base import Detector
+from detection_methods.running_stats import RunningMean, SlidingQuantile
+
+
+class BlinkDetector(Detector):
+    state_fields = ('alpha_mean', 'delta_mean', 'alpha_threshold')
 
-class BlinkDetector:
     def __init__(self, delta_threshold: float = 100.0, alpha_threshold: float = 150.0, 
-                 debounce_time: float = 0.3):
+                 debounce_time: float = 0.3, refractory_time: float = 2.0,
+                 average_length: int = 10,
+                 adapt_window: int = 10000, adapt_quantile: float = 0.5,
+                 adapt_min_samples: int = 1000):
         self.delta_threshold = delta_threshold
         self.alpha_threshold = alpha_threshold
         self.debounce_time = debounce_time
+        self.refractory_time = refractory_time
         self.last_blink_time = 0
-        self.alpha = np.zeros(10)
-        self.delta = np.zeros(10)
-        self.counter = 0
+        # Running means over the last `average_length` updates
+        self.alpha = RunningMean(average_length)
+        self.delta = RunningMean(average_length)
         self.blinked = False
-        self.all_alphas = []
-        self.all_counter = 0
+        self.confidence = 0.0  # Alpha running mean over threshold at the last blink
+        # Alpha threshold adapts to a quantile of the last `adapt_window` alpha values
+        self.alpha_history = SlidingQuantile(adapt_window, adapt_quantile)
+        self.adapt_min_samples = adapt_min_samples
         
-    def detect_blink(self, band_powers: Dict[str, float]) -> bool:
+    def detect_blink(self, band_powers: np.ndarray, timestamp: Optional[float] = None) -> bool:
         """
-        Detect blink using simple thresholding on band powers.
+        Detect blink using simple thresholding on band powers
+        (fixed layout from eeg.processing, indexed by DELTA/ALPHA).
         Blink condition: delta > threshold AND alpha < threshold
+        `timestamp` is the signal time of the update; wall-clock time is used if omitted.
         """
-        current_time = time.time()
+        current_time = time.time() if timestamp is None else timestamp
         
         # Check if enough time has passed since last blink (debouncing)
         if current_time - self.last_blink_time < self.debounce_time:
             return False
         
-        delta = band_powers.get('delta', 0.0)
-        alpha = band_powers.get('alpha', 0.0)
+        delta = band_powers[DELTA]
+        alpha = band_powers[ALPHA]
         
         # Simple blink detection: high delta (artifact) and low alpha (eyes closed)
         # is blink should depend on a running mean of the last 10 samples
-        self.alpha[self.counter] = alpha
-        self.delta[self.counter] = delta
-        self.counter += 1
-        if self.counter == len(self.alpha):
-            self.counter = 0
-        is_blink = (np.mean(self.alpha) > self.alpha_threshold) #and np.mean(self.delta) > self.delta_threshold)
-
+        self.alpha.add(alpha)
+        self.delta.add(delta)
+        is_blink = (self.alpha.mean > self.alpha_threshold) #and self.delta.mean > self.delta_threshold)
+        confidence = self.alpha.mean / self.alpha_threshold  # Before the threshold adapts below
 
-        is_blink = is_blink and current_time - self.last_blink_time > 2.0
 
-        # print(f"Alpha: {np.mean(self.alpha)}, Delta: {np.mean(self.delta)}")
-        self.all_alphas.append(alpha)
+        is_blink = is_blink and current_time - self.last_blink_time > self.refractory_time
 
-        if len(self.all_alphas) > 10000:
-            self.all_alphas[self.all_counter] = alpha
-            self.all_counter += 1
-        if self.all_counter == 10000:
-            self.all_counter = 0
+        # print(f"Alpha: {self.alpha.mean}, Delta: {self.delta.mean}")
+        self.alpha_history.add(alpha)
 
-        if len(self.all_alphas) > 1000:
-            self.alpha_threshold = np.median(self.all_alphas)
+        if len(self.alpha_history) > self.adapt_min_samples:
+            self.alpha_threshold = self.alpha_history.value()
             if self.alpha_threshold < 10: # something's wrong
                 raise ValueError("Alpha threshold is too low, fix your headset")
 
         if is_blink:
             self.last_blink_time = current_time
             self.blinked = True
+            self.confidence = confidence
 
         # is_blink = False
         
         return is_blink
 
+    def state(self) -> tuple:
+        return self.alpha.mean, self.delta.mean, self.alpha_threshold
+
+    def update(self, values: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """Run detect_blink on each band-power row at its signal timestamp; confidence per row."""
+        scores = np.zeros(len(values))
+        for i, band_powers in enumerate(values):
+            if self.detect_blink(band_powers, timestamps[i]):
+                scores[i] = self.confidence
+        return scores
+
 
-def detect_blink_simple(band_powers: Dict[str, float], 
+def detect_blink_simple(band_powers: np.ndarray, 
                        delta_threshold: float = 2.0, 
                        alpha_threshold: float = 1.0) -> bool:
     """Simple stateless blink detection function."""
-    delta = band_powers.get('delta', 0.0)
-    alpha = band_powers.get('alpha', 0.0)
+    delta = band_powers[DELTA]
+    alpha = band_powers[ALPHA]
     
     return delta > delta_threshold and alpha < alpha_threshold
\ No newline at end of file
@@ -0,0 +1,154 @@
+import json
+import os
+import re
+import time
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from eeg.processing import ALPHA, DELTA
+from detection_methods.running_stats import SlidingQuantile
+
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), '.musepong', 'profiles')
+THRESHOLD_FACTOR = 2.0  # Thresholds sit at this multiple of the eyes-open baseline
+
+
+class CalibrationProfile(NamedTuple):
+    """Band-power baselines and thresholds measured for one user on one headset."""
+    key: str                   # User name or headset source_id
+    fs: int
+    channel_names: List[str]
+    alpha_baseline: float
+    delta_baseline: float
+    alpha_threshold: float
+    delta_threshold: float
+    created: float             # time.time() when measured
+    updates: int = 0           # Band-power updates the baselines came from
+
+    @classmethod
+    def from_baselines(cls, key: str, fs: int, channel_names: List[str], alpha_baseline: float,
+                       delta_baseline: float, updates: int = 0) -> 'CalibrationProfile':
+        return cls(key, int(fs), list(channel_names), float(alpha_baseline), float(delta_baseline),
+                   THRESHOLD_FACTOR * float(alpha_baseline), THRESHOLD_FACTOR * float(delta_baseline),
+                   time.time(), updates)
+
+    def detector_options(self) -> dict:
+        """Keyword arguments for the band-power BlinkDetector."""
+        return {'alpha_threshold': self.alpha_threshold, 'delta_threshold': self.delta_threshold}
+
+    def matches(self, fs: int, channel_names: List[str]) -> bool:
+        """True if the profile was measured on a stream with this rate and channel layout."""
+        return self.fs == int(fs) and list(self.channel_names) == list(channel_names)
+
+
+class ProfileStore:
+    """Calibration profiles as one JSON file per user/headset key in a directory."""
+
+    def __init__(self, directory: str = DEFAULT_PROFILE_DIR):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        safe = re.sub(r'[^A-Za-z0-9_.-]+', '_', key).strip('._') or 'default'
+        return os.path.join(self.directory, safe + '.json')
+
+    def load(self, key: str) -> Optional[CalibrationProfile]:
+        """The stored profile for `key`, or None if there is none (or it is unreadable)."""
+        try:
+            with open(self.path(key)) as f:
+                return CalibrationProfile(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, profile: CalibrationProfile):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(profile.key)
+        # Write then rename, so a crash never leaves a truncated profile
+        with open(path + '.tmp', 'w') as f:
+            json.dump(profile._asdict(), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+
+class BaselineEstimator:
+    """Running median of alpha and delta band power that knows when it has settled.
+
+    The estimate counts as converged once at least `min_updates` rows have
+    been seen and the alpha and delta medians have stayed within `tolerance`
+    (relative) of each other over the last `stable_updates` rows.
+    """
+
+    def __init__(self, tolerance: float = 0.1, min_updates: int = 16, stable_updates: int = 16,
+                 window: int = 4096):
+        self.tolerance = tolerance
+        self.min_updates = min_updates
+        self.alpha = SlidingQuantile(window, 0.5)
+        self.delta = SlidingQuantile(window, 0.5)
+        self._alpha_history = deque(maxlen=stable_updates)
+        self._delta_history = deque(maxlen=stable_updates)
+        self.updates = 0
+
+    def add(self, rows: np.ndarray):
+        """Add band-power rows (eeg.processing BANDS layout)."""
+        for row in rows:
+            self.alpha.add(row[ALPHA])
+            self.delta.add(row[DELTA])
+            self._alpha_history.append(self.alpha.value())
+            self._delta_history.append(self.delta.value())
+            self.updates += 1
+
+    @staticmethod
+    def _stable(history, tolerance: float) -> bool:
+        low, high = min(history), max(history)
+        return high - low <= tolerance * abs(high)
+
+    @property
+    def converged(self) -> bool:
+        if self.updates < self.min_updates or len(self._alpha_history) < self._alpha_history.maxlen:
+            return False
+        return (self._stable(self._alpha_history, self.tolerance)
+                and self._stable(self._delta_history, self.tolerance))
+
+    @property
+    def baselines(self):
+        """Current (alpha, delta) median estimates."""
+        return self.alpha.value(), self.delta.value()
+
+
+class DriftMonitor:
+    """Watch band powers during play for a baseline that has moved away from the profile.
+
+    Keeps a running median of the last `window` rows; every `check_every`
+    rows, reports drift if alpha or delta differs from the profile baseline
+    by more than `tolerance` (relative). Blinks are brief, so the median
+    follows the eyes-open level.
+    """
+
+    def __init__(self, profile: CalibrationProfile, window: int = 480, check_every: int = 80,
+                 tolerance: float = 0.5):
+        self.profile = profile
+        self.estimator = BaselineEstimator(window=window)
+        self.window = window
+        self.check_every = check_every
+        self.tolerance = tolerance
+        self._since_check = 0
+
+    def add(self, rows: np.ndarray) -> Optional[CalibrationProfile]:
+        """Add band-power rows; return a re-calibrated profile when drift is detected."""
+        if len(rows) == 0:
+            return None
+        self.estimator.add(rows)
+        self._since_check += len(rows)
+        if self._since_check < self.check_every or self.estimator.updates < self.window:
+            return None
+        self._since_check = 0
+
+        alpha, delta = self.estimator.baselines
+        profile = self.profile
+        drifted = (abs(alpha - profile.alpha_baseline) > self.tolerance * profile.alpha_baseline
+                   or abs(delta - profile.delta_baseline) > self.tolerance * profile.delta_baseline)
+        if not drifted:
+            return None
+        self.profile = CalibrationProfile.from_baselines(profile.key, profile.fs, profile.channel_names,
+                                                         alpha, delta, self.window)
+        return self.profile
@@ -0,0 +1,55 @@
+import threading
+from collections import deque
+from typing import List, NamedTuple
+
+from profiling.instrumentation import DISABLED
+
+
+BLINK = 'blink'
+
+
+class BlinkEvent(NamedTuple):
+    """A detection, stamped with the signal time of the sample that triggered it."""
+    timestamp: float          # LSL timestamp (the stream's clock, not wall time)
+    confidence: float = 1.0   # Detection statistic over its threshold (>= 1 when it fired)
+    source: int = 0           # Index of the headset that produced it (0 = left paddle)
+    kind: str = BLINK
+
+
+class EventQueue:
+    """Bounded thread-safe FIFO of detector events.
+
+    Producers (a DSP backend, possibly on another thread) `put` events as
+    they are detected; the game `drain`s everything pending once per frame.
+    When full, the oldest event is dropped and counted as dropped_events,
+    so a stalled consumer cannot make the producer block or grow memory.
+    """
+
+    def __init__(self, maxsize: int = 64, metrics=DISABLED):
+        self._events = deque()
+        self._lock = threading.Lock()
+        self.maxsize = maxsize
+        self.metrics = metrics
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, event: BlinkEvent):
+        with self._lock:
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self.dropped += 1
+                self.metrics.count('dropped_events')
+            self._events.append(event)
+
+    def extend(self, events):
+        for event in events:
+            self.put(event)
+
+    def drain(self) -> List[BlinkEvent]:
+        """Remove and return every pending event, oldest first."""
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
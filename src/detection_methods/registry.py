@@ -0,0 +1,29 @@
+from typing import Type
+
+from detection_methods.base import Detector
+from detection_methods.blink_detection import BlinkDetector
+from detection_methods.time_domain import TimeDomainBlinkDetector
+from detection_methods.multichannel import MultiChannelBlinkDetector
+
+
+# Detectors selectable by name (e.g. main.py --detector)
+DETECTORS = {
+    'band-power': BlinkDetector,             # Alpha band power over a 1 s window
+    'time-domain': TimeDomainBlinkDetector,  # Raw AF7/AF8 amplitude, sample by sample
+    'multi-channel': MultiChannelBlinkDetector,  # Per-channel band powers, TP9/TP10 as artifact reference
+}
+DEFAULT_DETECTOR = 'band-power'
+
+
+def register_detector(name: str, cls: Type[Detector]):
+    """Make a Detector subclass available to create_detector() under `name`."""
+    DETECTORS[name] = cls
+
+
+def create_detector(name: str = DEFAULT_DETECTOR, fs: int = 256, **kwargs) -> Detector:
+    """Build the detector registered as `name` with its keyword options."""
+    try:
+        cls = DETECTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown detector '{name}'; choose from {', '.join(DETECTORS)}")
+    return cls.create(fs, **kwargs)
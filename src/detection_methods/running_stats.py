@@ -0,0 +1,133 @@
+import heapq
+import numpy as np
+from collections import defaultdict
+
+
+class SlidingQuantile:
+    """Quantile of the last `window` values in O(log n) per update and bounded memory.
+
+    Two heaps split the window at the requested quantile (max-heap below, min-heap
+    above); expired values are removed lazily when they reach a heap top. The
+    heaps are rebuilt from the window ring whenever lazily-deleted entries would
+    let them grow past twice the window size. Quantiles use linear interpolation,
+    matching np.quantile / np.median.
+    """
+
+    def __init__(self, window: int = 10000, quantile: float = 0.5):
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if not 0.0 <= quantile <= 1.0:
+            raise ValueError("quantile must be in [0, 1]")
+        self.window = window
+        self.quantile = quantile
+        self._values = np.zeros(window)  # Ring of the values currently in the window
+        self._count = 0  # Total values added
+
+        self._low = []   # Max-heap (negated) of values at or below the quantile
+        self._high = []  # Min-heap of values above it
+        self._low_size = 0
+        self._high_size = 0
+        self._delayed = defaultdict(int)  # Value -> pending lazy deletions
+
+    def __len__(self) -> int:
+        return min(self._count, self.window)
+
+    def _prune(self, heap, sign):
+        while heap and self._delayed.get(sign * heap[0], 0):
+            value = sign * heapq.heappop(heap)
+            self._delayed[value] -= 1
+            if not self._delayed[value]:
+                del self._delayed[value]
+
+    def _target_low_size(self) -> int:
+        n = self._low_size + self._high_size
+        return int(self.quantile * (n - 1)) + 1 if n else 0
+
+    def _rebalance(self):
+        target = self._target_low_size()
+        while self._low_size > target:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low, -1)
+        while self._low_size < target:
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+            self._low_size += 1
+            self._high_size -= 1
+            self._prune(self._high, 1)
+        self._prune(self._low, -1)
+        self._prune(self._high, 1)
+
+    def _insert(self, value: float):
+        if (self._low and value <= -self._low[0]) or not self._high or value < self._high[0]:
+            heapq.heappush(self._low, -value)
+            self._low_size += 1
+        else:
+            heapq.heappush(self._high, value)
+            self._high_size += 1
+
+    def _remove(self, value: float):
+        self._delayed[value] += 1
+        if self._low and value <= -self._low[0]:
+            self._low_size -= 1
+            self._prune(self._low, -1)
+        else:
+            self._high_size -= 1
+            self._prune(self._high, 1)
+
+    def _rebuild(self):
+        values = np.sort(self._values[:len(self)])
+        split = self._target_low_size()
+        self._low = [-v for v in values[:split][::-1].tolist()]
+        self._high = values[split:].tolist()  # Sorted lists are valid heaps
+        self._low_size = len(self._low)
+        self._high_size = len(self._high)
+        self._delayed.clear()
+
+    def add(self, value: float):
+        """Add a value, evicting the oldest once the window is full."""
+        value = float(value)
+        slot = self._count % self.window
+        if self._count >= self.window:
+            self._remove(float(self._values[slot]))
+        self._values[slot] = value
+        self._count += 1
+        self._insert(value)
+        self._rebalance()
+
+        if len(self._low) + len(self._high) > 2 * self.window:
+            self._rebuild()
+
+    def value(self) -> float:
+        """Current quantile estimate (nan when empty)."""
+        if not self._low_size:
+            return float('nan')
+        low = -self._low[0]
+        position = self.quantile * (self._low_size + self._high_size - 1)
+        fraction = position - int(position)
+        if fraction and self._high_size:
+            return low + fraction * (self._high[0] - low)
+        return low
+
+
+class RunningMean:
+    """Mean of the last `size` values kept as a running sum (O(1) per update)."""
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self._values = np.zeros(size)
+        self._index = 0
+        self._sum = 0.0
+
+    def add(self, value: float):
+        self._sum += value - self._values[self._index]
+        self._values[self._index] = value
+        self._index += 1
+        if self._index == self.size:
+            self._index = 0
+            self._sum = float(self._values.sum())  # Re-sum each lap to drop accumulated rounding
+
+    @property
+    def mean(self) -> float:
+        # Matches np.mean over the zero-initialised history, as before
+        return self._sum / self.size
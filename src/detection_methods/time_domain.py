@@ -0,0 +1,90 @@
+import math
+import numpy as np
+
+from eeg.processing import frontal_signal
+from detection_methods.base import Detector, SAMPLES
+
+
+class TimeDomainBlinkDetector(Detector):
+    """Blink detector that runs sample by sample on the raw frontal signal.
+
+    The mean of AF7 and AF8 (horizontal eye movements push them in opposite
+    directions and mostly cancel) is smoothed over a few milliseconds and
+    compared with a slowly tracking baseline. A blink fires on the rising
+    edge, once the deviation exceeds `threshold` times its running mean
+    absolute value and at least `min_amplitude` µV, so it is reported before
+    the artifact peaks rather than after a spectral window fills. Baseline
+    and noise stop adapting during an artifact; the next blink needs the
+    signal to settle below half the trigger level and `refractory_time` to
+    pass. Each sample costs a handful of float operations.
+    """
+
+    input = SAMPLES
+    state_fields = ('baseline', 'noise', 'deviation')
+
+    def __init__(self, fs: int = 256, smoothing_time: float = 0.01, baseline_time: float = 1.0,
+                 noise_time: float = 5.0, threshold: float = 6.0, min_amplitude: float = 50.0,
+                 refractory_time: float = 0.4, warmup_time: float = 1.0,
+                 max_artifact_time: float = 0.6, polarity: float = 1.0):
+        self.fs = fs
+        # Per-sample weights of exponential averages with the given time constants
+        self._smooth_rate = 1.0 - math.exp(-1.0 / (fs * smoothing_time))
+        self._baseline_rate = 1.0 - math.exp(-1.0 / (fs * baseline_time))
+        self._noise_rate = 1.0 - math.exp(-1.0 / (fs * noise_time))
+        self.threshold = threshold
+        self.min_amplitude = min_amplitude
+        self.refractory_time = refractory_time
+        self.warmup_samples = int(warmup_time * fs)
+        # An "artifact" longer than this is a baseline shift (e.g. electrode moved); adapt to it
+        self.max_artifact_samples = int(max_artifact_time * fs)
+        self.polarity = polarity  # Blinks are positive deflections at AF7/AF8
+
+        self.smoothed = None
+        self.baseline = 0.0
+        self.noise = 0.0  # Running mean |deviation| while no artifact is present
+        self.deviation = 0.0
+        self.armed = True
+        self.held = 0  # Samples spent above half the trigger level
+        self.count = 0
+        self.last_blink_time = -math.inf
+
+    @classmethod
+    def create(cls, fs: int, **kwargs) -> 'TimeDomainBlinkDetector':
+        return cls(fs=fs, **kwargs)
+
+    def update(self, values: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """Feed raw samples (samples x channels); score the sample at which each blink is detected."""
+        x = frontal_signal(np.asarray(values, dtype=np.float64))
+        scores = np.zeros(len(x))
+        if len(x) == 0:
+            return scores
+        if self.smoothed is None:
+            self.smoothed = self.baseline = float(x[0])
+
+        # Plain floats: per-sample NumPy scalar arithmetic would dominate the cost
+        smoothed, baseline, noise = self.smoothed, self.baseline, self.noise
+        smooth_rate, baseline_rate, noise_rate = self._smooth_rate, self._baseline_rate, self._noise_rate
+        for i, (sample, timestamp) in enumerate(zip(x.tolist(), np.asarray(timestamps).tolist())):
+            smoothed += smooth_rate * (sample - smoothed)
+            deviation = self.polarity * (smoothed - baseline)
+            trigger = max(self.threshold * noise, self.min_amplitude)
+
+            quiet = deviation < 0.5 * trigger
+            if quiet or self.held > self.max_artifact_samples:
+                baseline += baseline_rate * (smoothed - baseline)
+                noise += noise_rate * (abs(deviation) - noise)
+            if quiet:
+                self.armed = True
+                self.held = 0
+            else:
+                self.held += 1
+                if (self.armed and deviation >= trigger and self.count >= self.warmup_samples
+                        and timestamp - self.last_blink_time >= self.refractory_time):
+                    scores[i] = deviation / trigger
+                    self.armed = False
+                    self.last_blink_time = timestamp
+            self.count += 1
+
+        self.smoothed, self.baseline, self.noise = smoothed, baseline, noise
+        self.deviation = deviation
+        return scores
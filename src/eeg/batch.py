@@ -0,0 +1,197 @@
+import itertools
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Optional, Sequence, Tuple
+
+from eeg.processing import BANDS, ALPHA, StreamingBandpassFilter, frontal_signal
+from eeg.features import channel_band_powers
+from eeg.recording import is_recording, open_recording
+from detection_methods.running_stats import SlidingQuantile
+
+
+# Detector parameters that can be swept in one batch run
+CONFIG_DTYPE = np.dtype([
+    ('alpha_threshold', np.float64),
+    ('debounce_time', np.float64),
+    ('refractory_time', np.float64),
+    ('average_length', np.int64),
+])
+
+
+class BatchResult:
+    """Per-window features and per-configuration blink decisions for a recording."""
+
+    def __init__(self, timestamps: np.ndarray, features: np.ndarray, configs: np.ndarray,
+                 blinks: np.ndarray, valid: np.ndarray):
+        self.timestamps = timestamps  # (windows,) signal time of each window's last sample
+        self.features = features      # (windows, len(BANDS)) band powers
+        self.configs = configs        # (configs,) structured array of CONFIG_DTYPE
+        self.blinks = blinks          # (configs, windows) bool
+        self.valid = valid            # (configs,) False where the online detector would raise
+
+    def blink_times(self, config_index: int) -> np.ndarray:
+        """Timestamps of the blinks detected by one configuration."""
+        return self.timestamps[self.blinks[config_index]]
+
+    def blink_counts(self) -> np.ndarray:
+        return self.blinks.sum(axis=1)
+
+
+def batch_filter(data: np.ndarray, fs: int, lowcut: float = 1.0,
+                 highcut: float = 40.0) -> np.ndarray:
+    """Filter a whole recording in one pass, identical to streaming it chunk by chunk."""
+    return StreamingBandpassFilter(lowcut, highcut, fs).process(data)
+
+
+def window_ends(n_samples: int, window_size: int, hop: int) -> np.ndarray:
+    """Exclusive end index of every hop-aligned window, as emitted by BandPowerEngine."""
+    ends = np.arange(hop, n_samples + 1, hop)
+    return ends[ends >= window_size]
+
+
+def segment_band_powers(segments: np.ndarray, fs: int, out: np.ndarray = None) -> np.ndarray:
+    """Band powers of each row of `segments` (windows x samples) with one batched rfft.
+
+    Reproduces single-segment Welch (mean removal, Hann window, density scaling).
+    """
+    return channel_band_powers(segments, fs, out=out)
+
+
+def batch_band_powers(filtered: np.ndarray, fs: int, window_size: int = None,
+                      hop: int = None, block_size: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """Band powers for every hop-aligned window of a filtered recording.
+
+    Uses strided sliding windows and one batched rfft per block of windows,
+    reproducing BandPowerEngine (single-segment Welch) on each window.
+    Returns (window end indices, features).
+    """
+    window_size = window_size or fs
+    hop = hop or max(fs // 16, 1)
+    x = frontal_signal(np.asarray(filtered, dtype=np.float64))
+    ends = window_ends(len(x), window_size, hop)
+    features = np.zeros((len(ends), len(BANDS)))
+    if len(ends) == 0:
+        return ends, features
+
+    windows = sliding_window_view(x, window_size)
+
+    # Blocks keep memory flat for multi-hour recordings
+    for start in range(0, len(ends), block_size):
+        block_ends = ends[start:start + block_size]
+        segment_band_powers(windows[block_ends - window_size], fs,
+                            out=features[start:start + len(block_ends)])
+    return ends, features
+
+
+def make_grid(alpha_thresholds: Sequence[float] = (150.0,),
+              debounce_times: Sequence[float] = (0.3,),
+              refractory_times: Sequence[float] = (2.0,),
+              average_lengths: Sequence[int] = (10,)) -> np.ndarray:
+    """Cartesian product of detector parameters as a CONFIG_DTYPE array."""
+    combos = list(itertools.product(alpha_thresholds, debounce_times,
+                                    refractory_times, average_lengths))
+    return np.array(combos, dtype=CONFIG_DTYPE)
+
+
+def detect_grid(features: np.ndarray, timestamps: np.ndarray, configs: np.ndarray,
+                adapt: bool = True, adapt_window: int = 10000, adapt_quantile: float = 0.5,
+                adapt_min_samples: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate BlinkDetector's rules for every configuration at once.
+
+    Steps through windows once with all configurations' state held in arrays,
+    so each step is a handful of vectorized operations. The adaptive alpha
+    threshold needs each configuration's own sliding quantile and is the only
+    per-configuration Python work; pass adapt=False to sweep fixed thresholds.
+    Returns (blinks (configs x windows), valid (configs,)).
+    """
+    n_configs, n_windows = len(configs), len(features)
+    threshold = configs['alpha_threshold'].astype(np.float64)
+    debounce = configs['debounce_time']
+    refractory = configs['refractory_time']
+    length = configs['average_length']
+
+    # Running means over each configuration's own accepted updates
+    max_length = int(length.max()) if n_configs else 1
+    history = np.zeros((n_configs, max_length))
+    sums = np.zeros(n_configs)
+    accepted = np.zeros(n_configs, dtype=np.int64)
+    last_blink = np.zeros(n_configs)
+    valid = np.ones(n_configs, dtype=bool)
+    blinks = np.zeros((n_configs, n_windows), dtype=bool)
+    quantiles = [SlidingQuantile(adapt_window, adapt_quantile) for _ in range(n_configs)] if adapt else None
+
+    alphas = features[:, ALPHA]
+    for w in range(n_windows):
+        now = timestamps[w]
+        alpha = alphas[w]
+
+        # Updates inside the debounce period are skipped entirely, as online
+        idx = np.flatnonzero(now - last_blink >= debounce)
+        if idx.size == 0:
+            continue
+
+        n = accepted[idx]
+        outgoing = np.where(n >= length[idx], history[idx, (n - length[idx]) % max_length], 0.0)
+        history[idx, n % max_length] = alpha
+        sums[idx] += alpha - outgoing
+        accepted[idx] = n + 1
+
+        fire = (sums[idx] / length[idx] > threshold[idx]) & (now - last_blink[idx] > refractory[idx])
+
+        if adapt:
+            for p in idx:
+                quantiles[p].add(alpha)
+                if len(quantiles[p]) > adapt_min_samples:
+                    threshold[p] = quantiles[p].value()
+                    if threshold[p] < 10:
+                        valid[p] = False
+
+        fired = idx[fire]
+        last_blink[fired] = now
+        blinks[fired, w] = True
+
+    return blinks, valid
+
+
+def run_batch(data: np.ndarray, fs: int, timestamps: Optional[np.ndarray] = None,
+              configs: Optional[np.ndarray] = None, window_size: int = None, hop: int = None,
+              **detector_kwargs) -> BatchResult:
+    """Filter, extract band powers and run a detector grid over a whole recording.
+
+    `data` is samples x channels; `timestamps` defaults to sample index / fs.
+    """
+    data = np.asarray(data)
+    if timestamps is None:
+        timestamps = np.arange(len(data)) / fs
+    if configs is None:
+        configs = make_grid()
+
+    filtered = batch_filter(data, fs)
+    ends, features = batch_band_powers(filtered, fs, window_size, hop)
+    window_times = np.asarray(timestamps)[ends - 1]
+    blinks, valid = detect_grid(features, window_times, configs, **detector_kwargs)
+    return BatchResult(window_times, features, configs, blinks, valid)
+
+
+def load_recording(path: str, fs: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Load a recording as (data, timestamps, fs).
+
+    Supports `.npy` arrays (samples x channels, needs fs), MuseLSL `record`
+    CSVs (first column timestamps, then one column per channel) and binary
+    recordings written by `--record`.
+    """
+    if is_recording(path):
+        data, timestamps, header = open_recording(path)
+        return data, timestamps, fs or int(header['fs'])
+
+    if path.endswith('.npy'):
+        if fs is None:
+            raise ValueError("fs is required for .npy recordings")
+        data = np.load(path)
+        return data, np.arange(len(data)) / fs, fs
+
+    table = np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2)
+    timestamps, data = table[:, 0], table[:, 1:]
+    if fs is None:
+        fs = int(round(1.0 / np.median(np.diff(timestamps))))
+    return data, timestamps, fs
@@ -0,0 +1,133 @@
+import numpy as np
+from typing import Tuple
+
+
+class RingBuffer:
+    """Fixed-capacity EEG sample ring (samples x channels) with a parallel timestamp array.
+
+    Storage is mirrored (every slot is written twice, half a buffer apart) so any
+    window of up to `capacity` samples is a contiguous view and reads never copy.
+    Writes land directly in a preallocated slot, which lets `pull_chunk` fill the
+    ring with no intermediate list or array.
+
+    `slack` extra slots sit between the oldest readable sample and the write
+    position, so a single producer may fill a write slot (up to `slack`
+    samples) while readers hold views of the current window. A view of n rows
+    stays valid while at most `capacity - n` more samples are committed, so
+    at least `slack` for views of up to `capacity - slack` rows; copy views
+    that must outlive that.
+    """
+
+    def __init__(self, capacity: int, n_channels: int, dtype=np.float32, slack: int = 0):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.n_channels = n_channels
+        self.slack = slack
+        self.size = capacity + slack  # Physical slots
+
+        self._data = self._allocate((2 * self.size, n_channels), dtype)
+        self._timestamps = self._allocate((2 * self.size,), np.float64)
+        self.count = 0  # Total samples committed; only advanced after data is in place
+
+    def _allocate(self, shape, dtype) -> np.ndarray:
+        """Storage for the ring arrays (overridden to place them in shared memory)."""
+        return np.zeros(shape, dtype=dtype)
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def write_limit(self) -> int:
+        """Largest number of samples a single write slot can hold."""
+        return self.slack if self.slack > 0 else self.size
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        self.count = 0
+
+    def write_slot(self, max_samples: int) -> np.ndarray:
+        """Return a contiguous writable (max_samples, n_channels) view for the next samples."""
+        if max_samples > self.write_limit:
+            raise ValueError(f"max_samples ({max_samples}) exceeds write limit ({self.write_limit})")
+        head = self.count % self.size
+        return self._data[head:head + max_samples]
+
+    def commit(self, n: int, timestamps) -> None:
+        """Publish n samples previously written into the slot from write_slot()."""
+        if n <= 0:
+            return
+        head = self.count % self.size
+        end = head + n
+        self._timestamps[head:end] = timestamps[:n] if len(timestamps) > n else timestamps
+
+        # Mirror the new rows into the other half so windows stay contiguous
+        split = min(end, self.size)
+        self._data[head + self.size:split + self.size] = self._data[head:split]
+        self._timestamps[head + self.size:split + self.size] = self._timestamps[head:split]
+        if end > self.size:
+            self._data[:end - self.size] = self._data[self.size:end]
+            self._timestamps[:end - self.size] = self._timestamps[self.size:end]
+
+        self.count += n
+
+    def write(self, data: np.ndarray, timestamps) -> None:
+        """Copy samples into the ring (for sources that cannot write in place)."""
+        n = len(data)
+        if n > self.capacity:
+            # Only the newest `capacity` samples can ever be read back
+            skip = n - self.capacity
+            data, timestamps = data[skip:], timestamps[skip:]
+            self.count += skip
+            n = self.capacity
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        limit = self.write_limit
+        for start in range(0, n, limit):
+            stop = min(start + limit, n)
+            self.write_slot(stop - start)[:] = data[start:stop]
+            self.commit(stop - start, timestamps[start:stop])
+
+    def pull(self, inlet, max_samples: int, timeout: float = 0.0) -> int:
+        """Pull a chunk from an LSL inlet straight into the ring. Returns samples received."""
+        dest = self.write_slot(max_samples)
+        _, timestamps = inlet.pull_chunk(timeout=timeout, max_samples=max_samples, dest_obj=dest)
+        n = len(timestamps)
+        if n:
+            self.commit(n, np.asarray(timestamps, dtype=np.float64))
+        return n
+
+    def window(self, n_samples: int, count: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return contiguous (data, timestamps) views of the newest n_samples (up to count)."""
+        if count is None:
+            count = self.count
+        n = min(n_samples, count, self.capacity)
+        end = count % self.size + self.size
+        return self._data[end - n:end], self._timestamps[end - n:end]
+
+    def since(self, index: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Return samples committed after `count == index`, plus the current count.
+
+        Up to `slack` samples come back as views (the usual case, a frame's
+        worth). A longer backlog is copied, since the producer could overwrite
+        a view that large while it is being processed; rows it may have lapped
+        during the copy are trimmed from the front (the caller sees them as lost).
+        """
+        count = self.count
+        data, timestamps = self.window(count - max(index, 0), count)
+        if len(data) > self.slack:
+            data, timestamps = data.copy(), timestamps.copy()
+            overrun = self.overrun(count, len(data))
+            data, timestamps = data[overrun:], timestamps[overrun:]
+        return data, timestamps, count
+
+    def overrun(self, count: int, n: int) -> int:
+        """Rows at the front of the n-row window ending at `count` that the producer may have overwritten.
+
+        The producer's write slot (up to `slack` rows past the current count,
+        possibly half written) reuses the slots of samples `size` earlier.
+        """
+        return max(self.count - count + self.slack - (self.size - n), 0)
@@ -0,0 +1,144 @@
+import numpy as np
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import NamedTuple, Sequence, Tuple
+
+from eeg.processing import (BAND_RANGES, DELTA, ALPHA, FRONTAL, TEMPORAL, band_bin_slices,
+                            hann_window)
+
+
+class Ratio(NamedTuple):
+    """Mean power of one band over `numerator` channels divided by its mean over `denominator`."""
+    name: str
+    band: int
+    numerator: Tuple[int, ...]
+    denominator: Tuple[int, ...]
+
+
+DEFAULT_RATIOS = (
+    Ratio('frontal/temporal delta', DELTA, FRONTAL, TEMPORAL),  # High for blinks, ~1 for movement
+    Ratio('frontal/temporal alpha', ALPHA, FRONTAL, TEMPORAL),
+)
+
+
+@lru_cache(maxsize=None)
+def _band_plan(fs: int, window_size: int, band_ranges: Tuple[Tuple[float, float], ...]):
+    """Hann window, spectrum bins used, and a (bins x bands) matrix that averages
+    the scaled power over each band (a zero column for an empty band)."""
+    window = hann_window(window_size)
+    scale = 2.0 / (fs * np.sum(window ** 2))  # One-sided density scaling
+    slices = band_bin_slices(fs, window_size, band_ranges)
+    bins = slice(min(b.start for b in slices), max(b.stop for b in slices))
+    averaging = np.zeros((bins.stop - bins.start, len(slices)))
+    for i, band in enumerate(slices):
+        if band.stop > band.start:
+            averaging[band.start - bins.start:band.stop - bins.start, i] = scale / (band.stop - band.start)
+    return window, bins, averaging
+
+
+def channel_band_powers(segments: np.ndarray, fs: int,
+                        band_ranges: Tuple[Tuple[float, float], ...] = BAND_RANGES,
+                        out: np.ndarray = None) -> np.ndarray:
+    """Band powers of every segment along the last axis, with one rfft for all of them.
+
+    `segments` is (..., samples), e.g. windows x channels x samples; the result
+    is (..., bands). Each segment gets single-segment Welch treatment (mean
+    removal, periodic Hann window, one-sided density scaling).
+    """
+    window, bins, averaging = _band_plan(fs, segments.shape[-1], tuple(band_ranges))
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    segments *= window
+    spectrum = np.fft.rfft(segments, axis=-1)[..., bins]
+    psd = spectrum.real ** 2 + spectrum.imag ** 2
+    if out is None:
+        return psd @ averaging
+    np.matmul(psd, averaging, out=out)
+    return out
+
+
+def compute_channel_band_powers(data: np.ndarray, fs: int, window_length: float = 1.0,
+                                band_ranges: Tuple[Tuple[float, float], ...] = BAND_RANGES) -> np.ndarray:
+    """Welch band powers of every channel of `data` (samples x channels) -> channels x bands.
+
+    The per-channel counterpart of compute_band_powers: segments of
+    `window_length` seconds with 50% overlap, all channels and segments in
+    one rfft.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data[:, None]
+    if len(data) == 0:
+        return np.zeros((data.shape[1], len(band_ranges)))
+    nperseg = min(len(data), int(fs * window_length))
+    step = nperseg - nperseg // 2
+    segments = sliding_window_view(data.T, nperseg, axis=1)[:, ::step]  # channels x segments x samples
+    return channel_band_powers(segments, fs, band_ranges).mean(axis=1)
+
+
+def band_ratios(powers: np.ndarray, ratios: Sequence[Ratio] = DEFAULT_RATIOS) -> np.ndarray:
+    """Evaluate `ratios` on powers (..., channels, bands) -> (..., len(ratios))."""
+    bands, numerator, denominator = _ratio_weights(tuple(ratios), powers.shape[-2])
+    selected = powers[..., bands]  # (..., channels, ratios)
+    return (selected * numerator).sum(axis=-2) / np.maximum((selected * denominator).sum(axis=-2), 1e-12)
+
+
+@lru_cache(maxsize=None)
+def _ratio_weights(ratios: Tuple[Ratio, ...], n_channels: int):
+    """Band of each ratio and (channels x ratios) channel-averaging weights."""
+    bands = np.array([ratio.band for ratio in ratios], dtype=int)
+    numerator = np.zeros((n_channels, len(ratios)))
+    denominator = np.zeros((n_channels, len(ratios)))
+    for i, ratio in enumerate(ratios):
+        numerator[list(ratio.numerator), i] = 1.0 / len(ratio.numerator)
+        denominator[list(ratio.denominator), i] = 1.0 / len(ratio.denominator)
+    return bands, numerator, denominator
+
+
+class ChannelFeatures(NamedTuple):
+    powers: np.ndarray      # windows x channels x bands
+    ratios: np.ndarray      # windows x ratios
+    row_ends: np.ndarray    # Offset just past the sample that completed each window
+
+
+class SpectralFeatureExtractor:
+    """Per-channel band powers and band ratios over a sliding window.
+
+    Every `hop` samples the window of all channels is transformed in one
+    batched rfft (windows completed within a chunk are batched together), so
+    a channels x bands row costs about as much as the single frontal-signal
+    Welch call of compute_band_powers. Input is filtered samples x channels.
+    """
+
+    def __init__(self, fs: int, n_channels: int, window_size: int = None, hop: int = None,
+                 band_ranges: Tuple[Tuple[float, float], ...] = BAND_RANGES,
+                 ratios: Sequence[Ratio] = DEFAULT_RATIOS):
+        self.fs = fs
+        self.n_channels = n_channels
+        self.window_size = window_size or fs
+        self.hop = hop or max(fs // 16, 1)
+        self.band_ranges = tuple(band_ranges)
+        self.ratios = tuple(ratios)
+        # Last window_size - 1 samples (windows span chunk boundaries)
+        self._tail = np.zeros((0, n_channels))
+        self.count = 0
+
+    def update(self, samples: np.ndarray) -> ChannelFeatures:
+        """Feed newly filtered samples; return features for each window completed."""
+        x = np.asarray(samples, dtype=np.float64).reshape(-1, self.n_channels)
+        n = self.window_size
+        history = np.concatenate((self._tail, x))
+        first = self.count - len(self._tail)  # Stream index of history[0]
+        ends = np.arange((self.count // self.hop + 1) * self.hop, self.count + len(x) + 1, self.hop)
+        ends = ends[ends >= n]
+
+        if len(ends):
+            # windows x channels x samples
+            segments = sliding_window_view(history, n, axis=0)[ends - first - n]
+            powers = channel_band_powers(segments, self.fs, self.band_ranges)
+        else:
+            powers = np.zeros((0, self.n_channels, len(self.band_ranges)))
+        row_ends = ends - self.count
+
+        self._tail = history[-(n - 1):] if n > 1 else history[:0]
+        self.count += len(x)
+        return ChannelFeatures(powers, band_ratios(powers, self.ratios), row_ends)
@@ -0,0 +1,328 @@
+import time
+import signal
+import multiprocessing
+import numpy as np
+from typing import List, Tuple
+
+from eeg.stream import EEGAcquisition, connect_to_muse, connect_to_headsets, get_channel_names
+from eeg.recording import EEGRecorder, ReplayInlet
+from eeg.processing import StreamingPreprocessor, BandPowerEngine, BANDS
+from eeg.shared_buffer import SharedRingBuffer
+from detection_methods.base import FILTERED, SAMPLES
+from detection_methods.events import BlinkEvent
+from detection_methods.registry import DEFAULT_DETECTOR, create_detector
+from profiling.instrumentation import DISABLED
+
+# Columns of a published update row: band powers, worker DSP seconds
+DSP_TIME = len(BANDS)
+_ROW_WIDTH = DSP_TIME + 1
+
+
+def open_replay(path: str, speed: float = 1.0) -> ReplayInlet:
+    """ReplayInlet for a recording, rebased onto the local clock.
+
+    Raises RuntimeError (which callers report as a connection failure) if the
+    file is missing or is not a recording.
+    """
+    try:
+        return ReplayInlet(path, speed=speed, rebase=True)
+    except (OSError, ValueError, KeyError) as e:
+        raise RuntimeError(f"Cannot replay {path}: {e}") from e
+
+
+def open_inlet(replay: str = None, replay_speed: float = 1.0, stream: str = None):
+    """Connect to the Muse LSL stream, or a recording when `replay` is a path.
+
+    `stream` selects an LSL stream by name or source_id (default: the first found).
+    Returns (inlet, fs, clock), where clock is the time base of the sample timestamps.
+    """
+    if replay:
+        print(f"Replaying EEG recording {replay}...")
+        inlet = open_replay(replay, replay_speed)
+        return inlet, int(inlet.info().nominal_srate()), inlet.clock
+
+    from pylsl import local_clock
+    print("Connecting to Muse EEG stream...")
+    inlet, fs = connect_to_muse(stream)
+    return inlet, fs, local_clock
+
+
+def open_inlets(replays: List[str] = (), streams: List[str] = (), replay_speed: float = 1.0):
+    """Open one inlet per recording in `replays`, or else per LSL stream name/source_id in `streams`.
+
+    Returns (inlets, clock); all inlets share one time base.
+    """
+    if replays:
+        print(f"Replaying {len(replays)} EEG recordings...")
+        inlets = [open_replay(path, replay_speed) for path in replays]
+        return inlets, inlets[0].clock
+
+    from pylsl import local_clock
+    return connect_to_headsets(list(streams)), local_clock
+
+
+def run_detector(detector, data: np.ndarray, timestamps, rows: np.ndarray,
+                 row_timestamps: np.ndarray, source: int = 0, filtered: np.ndarray = None) -> List[BlinkEvent]:
+    """Feed a detector whichever of raw samples, filtered samples or band-power rows it uses.
+
+    Returns its events. `filtered` is the bandpassed `data`, required by FILTERED detectors.
+    """
+    if detector is None:
+        return []
+    if detector.input in (SAMPLES, FILTERED):
+        times = np.asarray(timestamps)
+        scores = detector.update(filtered if detector.input == FILTERED else data, times)
+    else:
+        times = row_timestamps
+        scores = detector.update(rows, row_timestamps)
+    return [BlinkEvent(float(times[i]), float(scores[i]), source) for i in np.flatnonzero(scores)]
+
+
+class BlinkPipeline:
+    """Streaming filter -> band powers -> blink detector for one EEG stream."""
+
+    def __init__(self, fs: int, n_channels: int, window_size: int = 256, source: int = 0):
+        self.fs = fs
+        self.source = source  # Headset index stamped on events
+        self.preprocessor = StreamingPreprocessor(fs, n_channels, window_size=window_size)
+        self.band_engine = BandPowerEngine(fs, window_size=window_size)
+        self.detector = None  # Band powers are produced without one (e.g. while calibrating)
+
+    def set_detector(self, name: str = DEFAULT_DETECTOR, **kwargs):
+        self.detector = create_detector(name, self.fs, **kwargs)
+
+    def process(self, data: np.ndarray, timestamps) -> Tuple[np.ndarray, np.ndarray, List[BlinkEvent]]:
+        """Feed new raw samples; return (band power rows, row timestamps, blink events)."""
+        processed = self.preprocessor.process(data, timestamps)
+        rows = self.band_engine.update(processed)
+        row_timestamps = np.asarray(timestamps)[self.band_engine.row_ends - 1]
+        return rows, row_timestamps, run_detector(self.detector, data, timestamps, rows,
+                                                  row_timestamps, self.source, processed)
+
+
+class InProcessDSP:
+    """Run the blink pipeline in the game process on samples from an EEGAcquisition.
+
+    Detected events are returned by `poll()` and also put on `events` (an
+    EventQueue the game drains), when one is given.
+    """
+
+    def __init__(self, acquisition: EEGAcquisition, clock, window_size: int = 256,
+                 metrics=DISABLED, late_threshold: float = 0.1, events=None, telemetry=None):
+        self.acquisition = acquisition
+        self.clock = clock
+        self.fs = acquisition.fs
+        info = acquisition.inlet.info()
+        self.source_id = info.source_id()  # Identifies the headset (e.g. for calibration profiles)
+        self.channel_names = get_channel_names(info)
+        self.pipeline = BlinkPipeline(acquisition.fs, acquisition.n_channels, window_size)
+        self.metrics = metrics
+        self.late_threshold = late_threshold  # Chunks whose newest sample is older count as late
+        self.events = events
+        self.telemetry = telemetry  # Optional SessionTelemetry logging features, detector state, blinks
+        self.last_count = 0
+
+    def start(self):
+        self.acquisition.start()
+
+    def stop(self):
+        self.acquisition.stop()
+        if self.acquisition.recorder is not None:
+            self.acquisition.recorder.close()
+
+    def set_detector(self, name: str = DEFAULT_DETECTOR, **kwargs):
+        self.pipeline.set_detector(name, **kwargs)
+
+    def poll(self) -> Tuple[np.ndarray, np.ndarray, List[BlinkEvent]]:
+        """Process samples that arrived since the last poll.
+
+        Returns (band power rows, row timestamps, blink events).
+        """
+        metrics = self.metrics
+        dsp_start = metrics.clock()
+        eeg_data, timestamps, self.last_count = self.acquisition.samples_since(self.last_count)
+        if len(eeg_data) == 0:
+            if self.acquisition.error is not None:
+                # The acquisition thread has stopped; nothing more will arrive
+                raise RuntimeError(f"EEG stream lost: {self.acquisition.error}")
+            return np.zeros((0, len(BANDS))), np.zeros(0), []
+
+        if metrics.record_age('chunk_age', timestamps[-1]) > self.late_threshold:
+            metrics.count('late_chunks')
+        rows, row_timestamps, events = self.pipeline.process(eeg_data, timestamps)
+        for event in events:
+            metrics.record_age('detection_age', event.timestamp)
+        if self.events is not None:
+            self.events.extend(events)
+        if self.telemetry is not None:
+            self.telemetry.log_features(rows, row_timestamps)
+            self.telemetry.log_detector(self.pipeline.detector, timestamps[-1])
+            self.telemetry.log_blinks(events)
+        metrics.record('dsp', dsp_start)
+        return rows, row_timestamps, events
+
+
+def _worker_main(conn, replay, replay_speed, record, window_size, stream):
+    """DSP process: acquisition thread -> shared sample ring -> pipeline -> shared update/blink rings."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is handled by the game process
+    samples = updates = blinks = acquisition = None
+    try:
+        inlet, fs, _ = open_inlet(replay, replay_speed, stream)
+        info = inlet.info()
+        updates = SharedRingBuffer(16 * fs, _ROW_WIDTH, dtype=np.float64, slack=fs)
+        # Blink events: confidence, stamped with the detection timestamp
+        blinks = SharedRingBuffer(256, 1, dtype=np.float64, slack=64)
+        # Raw samples land directly in shared memory
+        acquisition = EEGAcquisition(inlet, buffer_type=SharedRingBuffer)
+        samples = acquisition.buffer
+        if record:
+            acquisition.recorder = EEGRecorder(record, fs, get_channel_names(info),
+                                               dtype=samples.dtype, source_id=info.source_id())
+        pipeline = BlinkPipeline(fs, acquisition.n_channels, window_size)
+        acquisition.start()
+        conn.send(('ready', fs, samples.spec, updates.spec, blinks.spec,
+                   info.source_id(), get_channel_names(info)))
+
+        last_count = 0
+        while True:
+            if conn.poll():
+                message = conn.recv()
+                if message[0] == 'stop':
+                    break
+                if message[0] == 'detector':
+                    pipeline.set_detector(message[1], **message[2])
+            if acquisition.error is not None:
+                raise acquisition.error
+
+            start = time.perf_counter()
+            eeg_data, timestamps, last_count = acquisition.samples_since(last_count)
+            if len(eeg_data) == 0:
+                time.sleep(0.002)
+                continue
+            rows, row_timestamps, events = pipeline.process(eeg_data, timestamps)
+            if events:
+                blinks.write(np.array([[event.confidence] for event in events]),
+                             [event.timestamp for event in events])
+            if len(rows):
+                out = np.empty((len(rows), _ROW_WIDTH))
+                out[:, :DSP_TIME] = rows
+                out[:, DSP_TIME] = time.perf_counter() - start
+                updates.write(out, row_timestamps)
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        if acquisition is not None:
+            acquisition.stop()
+            if acquisition.recorder is not None:
+                acquisition.recorder.close()
+        for ring in (samples, updates, blinks):
+            if ring is not None:
+                ring.close()
+
+
+class DSPWorker:
+    """Run acquisition and the blink pipeline in a separate process.
+
+    Raw samples go into a shared-memory ring inside the worker; band
+    powers and blink events come back through two more shared rings, so the
+    game process only reads a few rows per frame. `start()` raises
+    RuntimeError if the worker cannot start (callers fall back to
+    InProcessDSP).
+    """
+
+    def __init__(self, replay: str = None, replay_speed: float = 1.0, record: str = None,
+                 window_size: int = 256, metrics=DISABLED, start_timeout: float = 15.0,
+                 stream: str = None, events=None, telemetry=None):
+        self.replay = replay
+        self.stream = stream
+        self.replay_speed = replay_speed
+        self.record = record
+        self.window_size = window_size
+        self.metrics = metrics
+        self.start_timeout = start_timeout
+        self.events = events  # Optional EventQueue that also receives every event
+        # Optional SessionTelemetry; the detector runs in the worker, so only rows and events are logged
+        self.telemetry = telemetry
+        self.clock = time.perf_counter
+        self.fs = None
+        self.source_id = None
+        self.channel_names = None
+        self.samples = None  # Worker's raw sample ring, readable from this process
+        self.updates = None
+        self.blinks = None
+        self.last_update = 0
+        self.last_blink = 0
+        self._process = None
+        self._conn = None
+
+    def start(self):
+        ctx = multiprocessing.get_context('spawn')  # No inherited pygame/LSL state
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_worker_main, name="DSPWorker", daemon=True,
+                                    args=(child_conn, self.replay, self.replay_speed,
+                                          self.record, self.window_size, self.stream))
+        try:
+            self._process.start()
+        except OSError as e:
+            raise RuntimeError(f"could not start DSP worker: {e}")
+
+        if not self._conn.poll(self.start_timeout):
+            self.stop()
+            raise RuntimeError("DSP worker did not start in time")
+        message = self._conn.recv()
+        if message[0] != 'ready':
+            self.stop()
+            raise RuntimeError(message[1])
+        _, self.fs, sample_spec, update_spec, blink_spec, self.source_id, self.channel_names = message
+        self.samples = SharedRingBuffer.attach(sample_spec)
+        self.updates = SharedRingBuffer.attach(update_spec)
+        self.blinks = SharedRingBuffer.attach(blink_spec)
+        if not self.replay:
+            from pylsl import local_clock
+            self.clock = local_clock
+
+    def stop(self, join_timeout: float = 2.0):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        self._process.join(join_timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        for ring in (self.samples, self.updates, self.blinks):
+            if ring is not None:
+                ring.close()
+        self._process = None
+
+    def set_detector(self, name: str = DEFAULT_DETECTOR, **kwargs):
+        self._conn.send(('detector', name, kwargs))
+
+    def poll(self) -> Tuple[np.ndarray, np.ndarray, List[BlinkEvent]]:
+        """Read updates the worker published since the last poll (same shape as InProcessDSP.poll)."""
+        metrics = self.metrics
+        dsp_start = metrics.clock()
+        if self._conn.poll():
+            message = self._conn.recv()
+            if message[0] == 'error':
+                raise RuntimeError(f"DSP worker failed: {message[1]}")
+        if not self._process.is_alive():
+            raise RuntimeError("DSP worker exited")
+
+        rows, row_timestamps, self.last_update = self.updates.since(self.last_update)
+        confidences, blink_times, self.last_blink = self.blinks.since(self.last_blink)
+        events = [BlinkEvent(timestamp, confidence)
+                  for timestamp, confidence in zip(blink_times.tolist(), confidences[:, 0].tolist())]
+        for event in events:
+            metrics.record_age('detection_age', event.timestamp)
+        if self.events is not None:
+            self.events.extend(events)
+        if self.telemetry is not None:
+            self.telemetry.log_features(rows[:, :DSP_TIME], row_timestamps)
+            self.telemetry.log_blinks(events)
+        if len(rows) == 0:
+            return np.zeros((0, len(BANDS))), row_timestamps, events
+        metrics.record_value('worker_dsp', rows[-1, DSP_TIME])
+        metrics.record('dsp', dsp_start)
+        return rows[:, :DSP_TIME], row_timestamps, events
@@ -0,0 +1,184 @@
+import numpy as np
+from collections import defaultdict
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Sequence, Tuple
+
+from eeg.stream import EEGAcquisition
+from eeg.processing import BANDS, StreamingBandpassFilter, design_bandpass, frontal_signal
+from eeg.batch import segment_band_powers
+from eeg.pipeline import run_detector
+from detection_methods.base import FILTERED
+from detection_methods.events import BlinkEvent
+from detection_methods.registry import DEFAULT_DETECTOR, create_detector
+from profiling.instrumentation import DISABLED
+
+
+class HeadsetPool:
+    """Blink pipeline for several headsets that shares the filter and FFT work.
+
+    Each call to `process` takes the new samples of every headset. The frontal
+    signals are filtered in one sosfilt call per distinct chunk length (Muse
+    headsets deliver equal chunks, so usually one call), and every window that
+    completed a hop on any headset goes through a single batched rfft. Filter
+    state, history and detector are kept per headset, and the band powers
+    match BlinkPipeline on each stream. Headsets whose detector takes FILTERED
+    samples also get every channel bandpassed, since the shared filter only
+    sees the frontal signal.
+    """
+
+    def __init__(self, fs: int, n_headsets: int, window_size: int = 256, hop: int = None,
+                 lowcut: float = 1.0, highcut: float = 40.0):
+        from scipy import signal
+        self.fs = fs
+        self.n_headsets = n_headsets
+        self.window_size = window_size
+        self.hop = hop or max(fs // 16, 1)
+        self.lowcut, self.highcut = lowcut, highcut
+        self.sos = design_bandpass(lowcut, highcut, fs)
+        self._sosfilt = signal.sosfilt
+        self._zi_unit = signal.sosfilt_zi(self.sos)
+        self._zi = np.zeros(self._zi_unit.shape + (n_headsets,))  # Filter state per headset
+        self._primed = np.zeros(n_headsets, dtype=bool)
+        # Last window_size - 1 filtered samples of each headset (windows span chunk boundaries)
+        self._tails = [np.zeros(0) for _ in range(n_headsets)]
+        self.counts = np.zeros(n_headsets, dtype=np.int64)  # Samples seen per headset
+        self.detectors = [None] * n_headsets
+        self._channel_filters = [None] * n_headsets  # All-channel filters for FILTERED detectors
+
+    def set_detector(self, name: str = DEFAULT_DETECTOR, index: int = None, **kwargs):
+        """Give one headset (or all, when index is None) a fresh detector."""
+        for i in range(self.n_headsets) if index is None else (index,):
+            self.detectors[i] = create_detector(name, self.fs, **kwargs)
+            self._channel_filters[i] = (StreamingBandpassFilter(self.lowcut, self.highcut, self.fs)
+                                        if self.detectors[i].input == FILTERED else None)
+
+    def _filter(self, signals: List[np.ndarray]) -> List[np.ndarray]:
+        """Filter each headset's new frontal samples, batching equal-length chunks."""
+        filtered = [np.zeros(0)] * len(signals)
+        groups = defaultdict(list)
+        for i, x in enumerate(signals):
+            if len(x):
+                groups[len(x)].append(i)
+
+        for members in groups.values():
+            block = np.stack([signals[i] for i in members], axis=1)
+            new = ~self._primed[members]
+            if new.any():
+                # Start in steady state for the first sample, as StreamingBandpassFilter does
+                first = np.array(members)[new]
+                self._zi[..., first] = self._zi_unit[..., None] * block[0, new]
+                self._primed[first] = True
+            out, self._zi[..., members] = self._sosfilt(self.sos, block, axis=0,
+                                                        zi=self._zi[..., members])
+            for column, i in enumerate(members):
+                filtered[i] = out[:, column]
+        return filtered
+
+    def process(self, chunks: Sequence[Tuple[np.ndarray, np.ndarray]]) -> List[Tuple]:
+        """Feed (raw samples, timestamps) for every headset (empty arrays if none arrived).
+
+        Returns, per headset, (band power rows, row timestamps, blink events).
+        """
+        signals = [frontal_signal(np.asarray(data, dtype=np.float64)) for data, _ in chunks]
+        filtered = self._filter(signals)
+
+        # Collect every window that completed a hop, across all headsets
+        n = self.window_size
+        segments = []
+        owners = []
+        for i, x in enumerate(filtered):
+            count = self.counts[i]
+            m = len(x)
+            if m == 0:
+                owners.append(np.zeros(0, dtype=np.int64))
+                continue
+            history = np.concatenate((self._tails[i], x))
+            first = count - len(self._tails[i])  # Stream index of history[0]
+            ends = np.arange((count // self.hop + 1) * self.hop, count + m + 1, self.hop)
+            ends = ends[ends >= n]
+            if len(ends):
+                segments.append(sliding_window_view(history, n)[ends - first - n])
+            owners.append(ends - count - 1)  # Offsets of the completing samples in this chunk
+            self._tails[i] = history[-(n - 1):] if n > 1 else history[:0]
+            self.counts[i] = count + m
+
+        rows = (segment_band_powers(np.concatenate(segments), self.fs) if segments
+                else np.zeros((0, len(BANDS))))
+
+        results = []
+        start = 0
+        for i, offsets in enumerate(owners):
+            headset_rows = rows[start:start + len(offsets)]
+            start += len(offsets)
+            data, timestamps = chunks[i]
+            row_timestamps = np.asarray(timestamps)[offsets]
+            channel_filter = self._channel_filters[i]
+            events = run_detector(self.detectors[i], data, timestamps, headset_rows, row_timestamps,
+                                  source=i, filtered=None if channel_filter is None
+                                  else channel_filter.process(np.asarray(data, dtype=np.float64)))
+            results.append((headset_rows, row_timestamps, events))
+        return results
+
+
+class PooledDSP:
+    """Run one HeadsetPool over several EEGAcquisitions in the game process.
+
+    Same interface as InProcessDSP, except that `poll()` returns only the
+    blink events, whose `source` is the headset index.
+    """
+
+    def __init__(self, acquisitions: List[EEGAcquisition], clock, window_size: int = 256,
+                 metrics=DISABLED, late_threshold: float = 0.1, events=None, telemetry=None):
+        rates = {acquisition.fs for acquisition in acquisitions}
+        if len(rates) != 1:
+            raise RuntimeError(f"headsets must share one sampling rate, got {sorted(rates)}")
+        self.acquisitions = acquisitions
+        self.clock = clock
+        self.fs = rates.pop()
+        self.pool = HeadsetPool(self.fs, len(acquisitions), window_size)
+        self.metrics = metrics
+        self.late_threshold = late_threshold
+        self.events = events  # Optional EventQueue that also receives every event
+        self.telemetry = telemetry  # Optional SessionTelemetry; rows are logged with the headset index
+        self.last_counts = [0] * len(acquisitions)
+
+    def start(self):
+        for acquisition in self.acquisitions:
+            acquisition.start()
+
+    def stop(self):
+        for acquisition in self.acquisitions:
+            acquisition.stop()
+            if acquisition.recorder is not None:
+                acquisition.recorder.close()
+
+    def set_detector(self, name: str = DEFAULT_DETECTOR, index: int = None, **kwargs):
+        self.pool.set_detector(name, index, **kwargs)
+
+    def poll(self) -> List[BlinkEvent]:
+        """Process samples from every headset since the last poll; return their events by time."""
+        metrics = self.metrics
+        dsp_start = metrics.clock()
+        chunks = []
+        for i, acquisition in enumerate(self.acquisitions):
+            if acquisition.error is not None:
+                raise RuntimeError(f"headset {i + 1} stopped: {acquisition.error}")
+            eeg_data, timestamps, self.last_counts[i] = acquisition.samples_since(self.last_counts[i])
+            if len(timestamps) and metrics.record_age('chunk_age', timestamps[-1]) > self.late_threshold:
+                metrics.count('late_chunks')
+            chunks.append((eeg_data, timestamps))
+
+        results = self.pool.process(chunks)
+        events = sorted(event for _, _, headset_events in results for event in headset_events)
+        if self.telemetry is not None:
+            for i, (rows, row_timestamps, _) in enumerate(results):
+                self.telemetry.log_features(rows, row_timestamps, source=i)
+                if len(chunks[i][1]):
+                    self.telemetry.log_detector(self.pool.detectors[i], chunks[i][1][-1], source=i)
+            self.telemetry.log_blinks(events)
+        for event in events:
+            metrics.record_age('detection_age', event.timestamp)
+        if self.events is not None:
+            self.events.extend(events)
+        metrics.record('dsp', dsp_start)
+        return events
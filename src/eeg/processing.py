@@ -1,61 +1,280 @@
 import numpy as np
-from scipy import signal
-from typing import Tuple, Dict
+from functools import lru_cache
+from typing import Tuple
+
+from eeg.buffer import RingBuffer
+
+
+# scipy.signal is imported where it is first used: it is most of the program's
+# import time, and simulation mode never needs it
+
+
+def hann_window(n: int) -> np.ndarray:
+    """Periodic Hann window, equal to scipy.signal.get_window('hann', n)."""
+    return 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n) / n)
+
+
+@lru_cache(maxsize=None)
+def design_bandpass(lowcut: float, highcut: float, fs: int, order: int = 4) -> np.ndarray:
+    """Design (once per band/fs/order) a Butterworth bandpass as second-order sections."""
+    from scipy import signal
+    nyquist = 0.5 * fs
+    return signal.butter(order, [lowcut / nyquist, highcut / nyquist], btype='band', output='sos')
 
 
 def bandpass_filter(data: np.ndarray, lowcut: float, highcut: float, 
                    fs: int, order: int = 4) -> np.ndarray:
-    """Apply bandpass filter to EEG data."""
+    """Apply zero-phase bandpass filter to a whole EEG window (offline use)."""
     # Skip filtering if data is too short
     if len(data) < 30:  # Minimum length for filter
         return data
-        
-    nyquist = 0.5 * fs
-    low = lowcut / nyquist
-    high = highcut / nyquist
-    
-    b, a = signal.butter(order, [low, high], btype='band')
     
-    # Use filtfilt if data is long enough, otherwise use lfilter
-    try:
-        filtered_data = signal.filtfilt(b, a, data, axis=0)
-    except ValueError:
-        # Fallback to simple filter if filtfilt fails
-        filtered_data = signal.lfilter(b, a, data, axis=0)
-    
-    return filtered_data
+    from scipy import signal
+    sos = design_bandpass(lowcut, highcut, fs, order)
+    padlen = min(3 * (2 * len(sos) + 1), len(data) - 1)
+    return signal.sosfiltfilt(sos, data, axis=0, padlen=padlen)
+
+
+class StreamingBandpassFilter:
+    """Causal bandpass filter that carries sosfilt state across chunks.
+
+    Each sample is filtered exactly once, so cost scales with new samples rather
+    than window length, and the output does not depend on how the stream is chunked.
+    """
+
+    def __init__(self, lowcut: float, highcut: float, fs: int, order: int = 4):
+        from scipy import signal
+        self.sos = design_bandpass(lowcut, highcut, fs, order)
+        self._sosfilt = signal.sosfilt
+        self._sosfilt_zi = signal.sosfilt_zi
+        self._zi = None
+
+    def reset(self):
+        """Forget filter state (e.g. after a gap in the stream)."""
+        self._zi = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Filter newly arrived samples (samples x channels, or 1-D)."""
+        if len(chunk) == 0:
+            return np.asarray(chunk, dtype=np.float64)
+        
+        if self._zi is None:
+            # Start in steady state for the first sample to avoid a DC step transient
+            zi = self._sosfilt_zi(self.sos)
+            first = np.asarray(chunk[0], dtype=np.float64)
+            self._zi = zi.reshape(zi.shape + (1,) * first.ndim) * first
+        
+        filtered, self._zi = self._sosfilt(self.sos, chunk, axis=0, zi=self._zi)
+        return filtered
+
+
+class StreamingPreprocessor:
+    """Filter samples as they arrive and keep a fixed window of the filtered signal."""
+
+    def __init__(self, fs: int, n_channels: int, window_size: int = 256,
+                 lowcut: float = 1.0, highcut: float = 40.0):
+        self.filter = StreamingBandpassFilter(lowcut, highcut, fs)
+        self.buffer = RingBuffer(window_size, n_channels, dtype=np.float64)
+
+    def process(self, data: np.ndarray, timestamps) -> np.ndarray:
+        """Filter new raw samples into the window and return the filtered samples."""
+        filtered = self.filter.process(data)
+        if len(filtered) > 0:
+            self.buffer.write(filtered, timestamps)
+        return filtered
+
+    def window(self, n_samples: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return views of the filtered window (data, timestamps)."""
+        return self.buffer.window(n_samples or self.buffer.capacity)
+
+
+# Fixed band layout shared by every band-power producer and consumer
+BANDS = ('delta', 'theta', 'alpha', 'beta')
+BAND_RANGES = ((1.0, 4.0), (4.0, 8.0), (8.0, 13.0), (13.0, 30.0))  # Hz, inclusive
+DELTA, THETA, ALPHA, BETA = range(len(BANDS))
+
+# Muse channel groups (TP9, AF7, AF8, TP10, AUX): blinks show at the frontal
+# electrodes and barely at the temporal ones, which pick up jaw and movement artifacts
+FRONTAL = (1, 2)   # AF7, AF8
+TEMPORAL = (0, 3)  # TP9, TP10
+
+
+@lru_cache(maxsize=None)
+def band_bin_slices(fs: int, nfft: int,
+                    band_ranges: Tuple[Tuple[float, float], ...] = BAND_RANGES) -> Tuple[slice, ...]:
+    """Bin-index slices of a one-sided nfft-point spectrum for each band in band_ranges."""
+    freqs = np.fft.rfftfreq(nfft, 1.0 / fs)
+    slices = []
+    for low, high in band_ranges:
+        bins = np.flatnonzero((freqs >= low) & (freqs <= high))
+        slices.append(slice(bins[0], bins[-1] + 1) if len(bins) else slice(0, 0))
+    return tuple(slices)
+
+
+def frontal_signal(data: np.ndarray) -> np.ndarray:
+    """Average the frontal channels (AF7, AF8), which are most sensitive to blinks."""
+    if data.ndim > 1 and data.shape[1] >= 2:
+        return np.mean(data[:, 1:3], axis=1)  # AF7, AF8
+    return data.flatten()
+
+
+def band_means(psd: np.ndarray, slices: Tuple[slice, ...], out: np.ndarray = None) -> np.ndarray:
+    """Average a PSD over each band slice into a fixed-layout array (0 for empty bands)."""
+    if out is None:
+        out = np.zeros(len(slices))
+    for i, band in enumerate(slices):
+        out[i] = psd[band].mean() if band.stop > band.start else 0.0
+    return out
 
 
 def compute_band_powers(data: np.ndarray, fs: int, 
-                       window_length: float = 1.0) -> Dict[str, float]:
-    """Compute EEG band powers using FFT."""
+                       window_length: float = 1.0) -> np.ndarray:
+    """Compute EEG band powers using Welch's method; indexed by DELTA, THETA, ALPHA, BETA."""
     if len(data) == 0:
-        return {'delta': 0.0, 'theta': 0.0, 'alpha': 0.0, 'beta': 0.0}
+        return np.zeros(len(BANDS))
     
-    # Use the frontal channels (AF7, AF8) which are most sensitive to blinks
-    if data.ndim > 1 and data.shape[1] >= 2:
-        frontal_data = np.mean(data[:, 1:3], axis=1)  # AF7, AF8
-    else:
-        frontal_data = data.flatten()
+    frontal_data = frontal_signal(data)
     
     # Compute power spectral density
-    freqs, psd = signal.welch(frontal_data, fs, nperseg=min(len(frontal_data), int(fs * window_length)))
-    
-    # Define frequency bands
-    delta_mask = (freqs >= 1) & (freqs <= 4)
-    theta_mask = (freqs >= 4) & (freqs <= 8)
-    alpha_mask = (freqs >= 8) & (freqs <= 13)
-    beta_mask = (freqs >= 13) & (freqs <= 30)
+    from scipy import signal
+    nperseg = min(len(frontal_data), int(fs * window_length))
+    _, psd = signal.welch(frontal_data, fs, nperseg=nperseg)
     
-    # Calculate band powers
-    band_powers = {
-        'delta': np.mean(psd[delta_mask]) if np.any(delta_mask) else 0.0,
-        'theta': np.mean(psd[theta_mask]) if np.any(theta_mask) else 0.0,
-        'alpha': np.mean(psd[alpha_mask]) if np.any(alpha_mask) else 0.0,
-        'beta': np.mean(psd[beta_mask]) if np.any(beta_mask) else 0.0
-    }
-    
-    return band_powers
+    return band_means(psd, band_bin_slices(fs, nperseg))
+
+
+class BandPowerEngine:
+    """Incremental band powers over a sliding window of the frontal signal.
+
+    Maintains a sliding DFT of only the bins the bands need, so each new sample
+    costs O(bins) instead of a full Welch pass. The Hann window and mean removal
+    are applied in the frequency domain, which reproduces single-segment
+    `signal.welch` on the same window. Powers are emitted every `hop` samples.
+    """
+
+    def __init__(self, fs: int, window_size: int = None, hop: int = None,
+                 resync_interval: int = None):
+        self.fs = fs
+        self.window_size = window_size or fs
+        self.hop = hop or max(fs // 16, 1)
+        # Periodically recompute the DFT exactly to bound floating-point drift
+        self.resync_interval = resync_interval or 8 * self.window_size
+        n = self.window_size
+
+        self.slices = band_bin_slices(fs, n)
+        used = [b for b in self.slices if b.stop > b.start]
+        lo = min(b.start for b in used)
+        hi = max(b.stop for b in used)
+        # Hann-windowed bin k needs rectangular bins k-1..k+1
+        self._rect_lo = max(lo - 1, 0)
+        rect_bins = np.arange(self._rect_lo, hi + 1)
+        self._win_slice = slice(lo - self._rect_lo, hi - self._rect_lo)
+        self._band_slices = tuple(slice(b.start - lo, b.stop - lo) for b in self.slices)
+
+        # Twiddle powers w^m for m = 0..n, so a chunk of m samples is one matrix product
+        twiddle = np.exp(2j * np.pi * rect_bins / n)
+        self._powers = twiddle[None, :] ** np.arange(n + 1)[:, None]
+        self._rfft_bins = slice(self._rect_lo, hi + 1)
+
+        window = hann_window(n)
+        self._scale = 2.0 / (fs * np.sum(window ** 2))  # One-sided density scaling
+
+        self._history = np.zeros(n)
+        self._pos = 0  # Next history slot to overwrite (oldest sample)
+        self._rect = np.zeros(len(rect_bins), dtype=complex)
+        self._psd = np.zeros(hi - lo)
+        self._results = np.zeros((1, len(BANDS)))
+        self._row_ends = np.zeros(1, dtype=int)
+        self.row_ends = self._row_ends[:0]  # Offsets in the last chunk where each row completed
+        self.powers = np.zeros(len(BANDS))
+        self.count = 0
+        self._since_hop = 0
+        self._since_resync = 0
+
+    @property
+    def ready(self) -> bool:
+        """True once a full window of samples has been seen."""
+        return self.count >= self.window_size
+
+    def reset(self):
+        self._history[:] = 0.0
+        self._rect[:] = 0.0
+        self._pos = 0
+        self.count = 0
+        self._since_hop = 0
+        self._since_resync = 0
+
+    def _slide(self, x: np.ndarray):
+        """Advance the sliding DFT by len(x) <= window_size samples."""
+        n = self.window_size
+        m = len(x)
+        end = self._pos + m
+        if end <= n:
+            old = self._history[self._pos:end]
+            delta = x - old
+            self._history[self._pos:end] = x
+        else:
+            split = n - self._pos
+            delta = np.empty(m)
+            np.subtract(x[:split], self._history[self._pos:], out=delta[:split])
+            np.subtract(x[split:], self._history[:end - n], out=delta[split:])
+            self._history[self._pos:] = x[:split]
+            self._history[:end - n] = x[split:]
+        self._pos = end % n
+
+        self._rect *= self._powers[m]
+        self._rect += delta @ self._powers[m:0:-1]
+
+        self._since_resync += m
+        if self._since_resync >= self.resync_interval:
+            self._resync()
+
+    def _resync(self):
+        ordered = np.roll(self._history, -self._pos)
+        self._rect[:] = np.fft.rfft(ordered)[self._rfft_bins]
+        self._since_resync = 0
+
+    def _compute(self) -> np.ndarray:
+        rect = self._rect
+        if self._rect_lo == 0:
+            rect = rect.copy()
+            rect[0] = 0.0  # Mean removal (welch detrend='constant') only touches DC
+        # Periodic Hann window as a 3-tap convolution in the frequency domain
+        windowed = 0.5 * rect[1:-1] - 0.25 * (rect[:-2] + rect[2:])
+        np.abs(windowed, out=self._psd)
+        self._psd **= 2
+        self._psd *= self._scale
+        return band_means(self._psd, self._band_slices, out=self.powers)
+
+    def update(self, samples: np.ndarray) -> np.ndarray:
+        """Feed newly filtered samples; return band powers for each hop completed (rows x bands).
+
+        The returned array is reused between calls. Rows are only produced once
+        a full window has been seen; `row_ends` gives, for each row, the offset
+        just past the sample in `samples` that completed it.
+        """
+        x = frontal_signal(np.asarray(samples, dtype=np.float64))
+        max_rows = len(x) // self.hop + 1
+        if len(self._results) < max_rows:
+            self._results = np.zeros((max_rows, len(BANDS)))
+            self._row_ends = np.zeros(max_rows, dtype=int)
+
+        rows = 0
+        start = 0
+        while start < len(x):
+            step = min(self.hop - self._since_hop, len(x) - start, self.window_size)
+            self._slide(x[start:start + step])
+            start += step
+            self.count += step
+            self._since_hop += step
+            if self._since_hop == self.hop:
+                self._since_hop = 0
+                if self.ready:
+                    self._results[rows] = self._compute()
+                    self._row_ends[rows] = start
+                    rows += 1
+        self.row_ends = self._row_ends[:rows]
+        return self._results[:rows]
 
 
 def preprocess_eeg(data: np.ndarray, fs: int) -> np.ndarray:
@@ -0,0 +1,237 @@
+import json
+import os
+import struct
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+# File layout: MAGIC, uint32 header length, JSON header (padded so records start
+# on a 64-byte boundary), then fixed-size records of (float64 timestamp,
+# n_channels sample values) appended chunk by chunk. The record area is a flat
+# structured array, so a whole recording can be memory-mapped.
+MAGIC = b'MUSEREC1'
+_ALIGN = 64
+
+# LSL channel_format codes for the sample dtypes a recording can hold
+_FORMATS = {np.dtype(np.float32): 1, np.dtype(np.float64): 2}
+
+
+def record_dtype(n_channels: int, dtype=np.float32) -> np.dtype:
+    """Structured dtype of one recorded sample."""
+    return np.dtype([('timestamp', '<f8'), ('data', np.dtype(dtype).newbyteorder('<'), (n_channels,))])
+
+
+def is_recording(path: str) -> bool:
+    """True if the file starts with the recording magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class EEGRecorder:
+    """Append-only writer for raw EEG samples and their LSL timestamps."""
+
+    def __init__(self, path: str, fs: float, channel_names: List[str],
+                 dtype=np.float32, source_id: str = ''):
+        self.path = path
+        self.n_channels = len(channel_names)
+        self.dtype = record_dtype(self.n_channels, dtype)
+        self.samples_written = 0
+
+        header = {
+            'fs': fs,
+            'channel_names': list(channel_names),
+            'dtype': np.dtype(dtype).str,
+            'source_id': source_id,
+            'created': time.time(),
+        }
+        encoded = json.dumps(header).encode('utf-8')
+        offset = len(MAGIC) + 4 + len(encoded)
+        encoded += b' ' * (-offset % _ALIGN)
+
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(struct.pack('<I', len(encoded)))
+        self._file.write(encoded)
+        self._chunk = np.zeros(0, dtype=self.dtype)
+
+    def write(self, data: np.ndarray, timestamps) -> None:
+        """Append a chunk of samples (samples x channels) with their timestamps."""
+        n = len(data)
+        if n == 0:
+            return
+        if len(self._chunk) < n:
+            self._chunk = np.zeros(n, dtype=self.dtype)
+        chunk = self._chunk[:n]
+        chunk['timestamp'] = timestamps
+        chunk['data'] = data
+        self._file.write(chunk.tobytes())
+        self.samples_written += n
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path: str) -> Tuple[dict, int]:
+    """Return (header dict, byte offset of the first record)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an EEG recording")
+        prefix = f.read(4)
+        if len(prefix) < 4:
+            raise ValueError(f"{path} has a truncated header")
+        (length,) = struct.unpack('<I', prefix)
+        header = json.loads(f.read(length).decode('utf-8'))
+    return header, len(MAGIC) + 4 + length
+
+
+def open_recording(path: str) -> Tuple[np.ndarray, np.ndarray, dict]:
+    """Memory-map a recording as (data, timestamps, header) without loading it.
+
+    A trailing partial record (e.g. from a crash mid-write) is ignored.
+    """
+    header, offset = read_header(path)
+    dtype = record_dtype(len(header['channel_names']), header['dtype'])
+    n_records = (os.path.getsize(path) - offset) // dtype.itemsize
+    if n_records == 0:
+        records = np.zeros(0, dtype=dtype)
+    else:
+        records = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(n_records,))
+    return records['data'], records['timestamp'], header
+
+
+class ReplayStreamInfo:
+    """The subset of pylsl.StreamInfo used by this package, for a recording."""
+
+    def __init__(self, header: dict):
+        self._header = header
+
+    def name(self) -> str:
+        return 'Replay'
+
+    def type(self) -> str:
+        return 'EEG'
+
+    def source_id(self) -> str:
+        return self._header.get('source_id', '')
+
+    def nominal_srate(self) -> float:
+        return float(self._header['fs'])
+
+    def channel_count(self) -> int:
+        return len(self._header['channel_names'])
+
+    def channel_format(self) -> int:
+        return _FORMATS[np.dtype(self._header['dtype'])]
+
+    def channel_names(self) -> List[str]:
+        return list(self._header['channel_names'])
+
+
+class ReplayInlet:
+    """Play a recording back through the StreamInlet.pull_chunk interface.
+
+    speed=1.0 replays in real time, N replays N times faster, and 0 (or None)
+    returns samples as fast as they are pulled. Recorded timestamps are
+    returned unchanged unless rebase=True, which maps them onto the current
+    clock (compressed by the replay speed) so sample ages can be measured
+    against local time.
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, rebase: bool = False,
+                 clock=time.perf_counter):
+        data, timestamps, header = open_recording(path)
+        self._setup(data, timestamps, header, speed, rebase, clock)
+
+    @classmethod
+    def from_arrays(cls, data: np.ndarray, timestamps: np.ndarray, fs: float,
+                    channel_names: List[str] = None, speed: Optional[float] = 0.0,
+                    rebase: bool = False, clock=time.perf_counter) -> 'ReplayInlet':
+        """Replay in-memory samples (e.g. synthetic EEG) instead of a file."""
+        data = np.asarray(data)
+        if data.dtype not in _FORMATS:
+            data = data.astype(np.float64)
+        if channel_names is None:
+            channel_names = [f"ch{i}" for i in range(data.shape[1])]
+        header = {'fs': fs, 'channel_names': list(channel_names), 'dtype': data.dtype.str}
+        inlet = cls.__new__(cls)
+        inlet._setup(data, np.asarray(timestamps, dtype=np.float64), header, speed, rebase, clock)
+        return inlet
+
+    def _setup(self, data, timestamps, header, speed, rebase, clock):
+        self.data, self.timestamps, self.header = data, timestamps, header
+        self.speed = speed or 0.0
+        self.rebase = rebase
+        self.clock = clock
+        self._info = ReplayStreamInfo(self.header)
+        self._position = 0
+        self._start_wall = None
+        self._offset = 0.0
+
+    def info(self, timeout: float = None) -> ReplayStreamInfo:
+        return self._info
+
+    @property
+    def finished(self) -> bool:
+        return self._position >= len(self.timestamps)
+
+    def _available(self) -> int:
+        """Index one past the last sample that is due by now."""
+        if self.speed <= 0:
+            return len(self.timestamps)
+        elapsed = (self.clock() - self._start_wall) * self.speed
+        due = self.timestamps[0] + elapsed
+        return int(np.searchsorted(self.timestamps, due, side='right'))
+
+    def pull_chunk(self, timeout: float = 0.0, max_samples: int = 1024, dest_obj=None):
+        if self._start_wall is None:
+            self._start_wall = self.clock()
+            if self.rebase and len(self.timestamps):
+                self._offset = self._start_wall - self.timestamps[0]
+
+        if self.finished:
+            # Behave like a live inlet with nothing to deliver
+            time.sleep(timeout)
+            return ([] if dest_obj is None else None), []
+
+        deadline = self.clock() + timeout
+        end = self._available()
+        while end <= self._position:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            # Sleep until the next sample is due (or the timeout expires)
+            wait = (self.timestamps[self._position] - self.timestamps[0]) / self.speed \
+                - (self.clock() - self._start_wall)
+            time.sleep(max(min(wait, remaining), 0.0005))
+            end = self._available()
+
+        start = self._position
+        stop = min(end, start + max_samples)
+        self._position = max(stop, start)
+        if stop <= start:
+            return ([] if dest_obj is None else None), []
+
+        timestamps = self.timestamps[start:stop]
+        if self.rebase and self.speed > 0:
+            timestamps = self._start_wall + (timestamps - self.timestamps[0]) / self.speed
+        else:
+            timestamps = timestamps + self._offset
+        timestamps = timestamps.tolist()
+        if dest_obj is None:
+            return self.data[start:stop].tolist(), timestamps
+
+        dest = np.frombuffer(memoryview(dest_obj).cast('B'), dtype=self.data.dtype)
+        dest = dest.reshape(-1, self.data.shape[1])
+        dest[:stop - start] = self.data[start:stop]
+        return None, timestamps
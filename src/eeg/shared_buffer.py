@@ -0,0 +1,89 @@
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple
+
+from eeg.buffer import RingBuffer
+
+
+_ALIGN = 64  # Each array starts on a cache-line boundary
+
+
+def _aligned(nbytes: int) -> int:
+    return -(-nbytes // _ALIGN) * _ALIGN
+
+
+def _attach(name: str) -> SharedMemory:
+    """Open an existing segment without taking ownership of it."""
+    try:
+        return SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Older versions register the segment again; spawned processes share the
+        # creator's resource tracker, so this only duplicates its existing entry
+        return SharedMemory(name=name)
+
+
+class SharedRingBuffer(RingBuffer):
+    """RingBuffer whose arrays and sample count live in shared memory.
+
+    One process creates the ring and is its only writer; other processes
+    attach with `SharedRingBuffer.attach(ring.spec)` and read with `since()`,
+    which copies out of the segment and discards rows the writer overwrote
+    during the copy. No locks are taken: the count is published only after
+    the rows are in place, and readers never write.
+    """
+
+    def __init__(self, capacity: int, n_channels: int, dtype=np.float32, slack: int = 0,
+                 name: str = None):
+        self.owner = name is None
+        size = capacity + slack
+        nbytes = (_ALIGN + _aligned(2 * size * n_channels * np.dtype(dtype).itemsize)
+                  + _aligned(2 * size * 8))
+        self.shm = SharedMemory(create=True, size=nbytes) if self.owner else _attach(name)
+        self._header = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self._cursor = _ALIGN
+        super().__init__(capacity, n_channels, dtype=dtype, slack=slack)
+
+    def _allocate(self, shape, dtype) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=self._cursor)
+        self._cursor += _aligned(array.nbytes)
+        return array
+
+    @property
+    def count(self) -> int:
+        return int(self._header[0])
+
+    @count.setter
+    def count(self, value: int):
+        if self.owner:  # Readers never move the shared count
+            self._header[0] = value
+
+    @property
+    def spec(self) -> tuple:
+        """Picklable description another process can attach() with."""
+        return (self.capacity, self.n_channels, self.dtype.str, self.slack, self.shm.name)
+
+    @classmethod
+    def attach(cls, spec: tuple) -> 'SharedRingBuffer':
+        capacity, n_channels, dtype, slack, name = spec
+        return cls(capacity, n_channels, dtype=dtype, slack=slack, name=name)
+
+    def since(self, index: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Copies of samples committed after `count == index`, plus that count."""
+        count = self.count
+        data, timestamps = self.window(count - max(index, 0), count)
+        data, timestamps = data.copy(), timestamps.copy()
+        # Rows the writer may have lapped while they were being copied
+        overrun = self.overrun(count, len(data))
+        return data[overrun:], timestamps[overrun:], count
+
+    def close(self):
+        """Detach from the segment; the creator also removes it."""
+        if self.shm is None:
+            return
+        self._data = self._timestamps = None
+        self._header = np.zeros(1, dtype=np.int64)  # Keep count readable after closing
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
@@ -1,24 +1,69 @@
+import threading
 import numpy as np
-from pylsl import StreamInlet, resolve_byprop
-from typing import Optional, Tuple, List
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple, List
 
+from eeg.buffer import RingBuffer
+from profiling.instrumentation import DISABLED
 
-def connect_to_muse() -> tuple[StreamInlet, int]:
-    """Connect to Muse EEG stream via LSL."""
-    print("Looking for an EEG stream...")
-    streams = resolve_byprop('type', 'EEG', timeout=5)
-    
+if TYPE_CHECKING:
+    from pylsl import StreamInlet
+
+
+def find_eeg_streams(timeout: float = 5.0, selectors: Sequence[str] = ()) -> list:
+    """Resolve the EEG streams visible on the network.
+
+    Without selectors this returns as soon as any stream answers. With
+    selectors (stream names or source_ids) it waits until a stream matching
+    each has answered (or the timeout), since with many streams on the
+    network the first to answer is rarely the one wanted.
+    """
+    from pylsl import resolve_byprop, resolve_bypred  # Only needed (and imported) when a headset is used
+    if not selectors:
+        return resolve_byprop('type', 'EEG', timeout=timeout)
+    matches = " or ".join(f"name='{s}' or source_id='{s}'" for s in selectors)
+    return resolve_bypred(f"type='EEG' and ({matches})", minimum=len(set(selectors)), timeout=timeout)
+
+
+def select_stream(streams: list, selector: Optional[str] = None):
+    """Pick the stream whose name or source_id equals selector (the first one if None)."""
     if not streams:
         raise RuntimeError("No EEG stream found. Make sure MuseLSL is running.")
+    if selector is None:
+        return streams[0]
+    for info in streams:
+        if selector in (info.name(), info.source_id()):
+            return info
+    available = ", ".join(f"{info.name()} ({info.source_id()})" for info in streams)
+    raise RuntimeError(f"No EEG stream named '{selector}'. Available: {available}")
+
+
+def connect_to_muse(selector: Optional[str] = None) -> tuple['StreamInlet', int]:
+    """Connect to a Muse EEG stream via LSL, optionally by stream name or source_id."""
+    from pylsl import StreamInlet
+    print("Looking for an EEG stream...")
+    streams = find_eeg_streams(selectors=[selector] if selector else ())
     
-    inlet = StreamInlet(streams[0])
+    inlet = StreamInlet(select_stream(streams, selector))
     fs = int(inlet.info().nominal_srate())
     print(f"Connected to EEG stream with sampling rate: {fs} Hz")
     
     return inlet, fs
 
 
-def get_eeg_chunk(inlet: StreamInlet, timeout: float = 1.0, 
+def connect_to_headsets(selectors: List[str]) -> List['StreamInlet']:
+    """Connect to several EEG streams, one per name/source_id, resolving only once."""
+    from pylsl import StreamInlet
+    print(f"Looking for {len(selectors)} EEG streams...")
+    streams = find_eeg_streams(selectors=selectors)
+    inlets = []
+    for selector in selectors:
+        info = select_stream(streams, selector)
+        inlets.append(StreamInlet(info))
+        print(f"Connected to {info.name()} ({info.source_id()}) at {int(info.nominal_srate())} Hz")
+    return inlets
+
+
+def get_eeg_chunk(inlet: 'StreamInlet', timeout: float = 1.0, 
                   max_samples: int = 128) -> Tuple[Optional[np.ndarray], Optional[List[float]]]:
     """Pull a chunk of EEG data from the stream."""
     eeg_data, timestamp = inlet.pull_chunk(timeout=timeout, max_samples=max_samples)
@@ -29,6 +74,113 @@ def get_eeg_chunk(inlet: StreamInlet, timeout: float = 1.0,
     return np.array(eeg_data), timestamp
 
 
-def get_sampling_rate(inlet: StreamInlet) -> int:
+def get_sampling_rate(inlet: 'StreamInlet') -> int:
     """Get the sampling rate of the EEG stream."""
-    return int(inlet.info().nominal_srate())
\ No newline at end of file
+    return int(inlet.info().nominal_srate())
+
+
+def get_channel_names(info) -> List[str]:
+    """Channel labels from a stream's description (ch0, ch1, ... if unlabelled)."""
+    if hasattr(info, 'channel_names'):  # Replay and synthetic stream infos
+        return info.channel_names()
+    
+    names = []
+    channel = info.desc().child('channels').child('channel')
+    for i in range(info.channel_count()):
+        names.append(channel.child_value('label') or f"ch{i}")
+        channel = channel.next_sibling()
+    return names
+
+
+# LSL channel formats that can be pulled straight into a NumPy ring
+_LSL_DTYPES = {1: np.float32, 2: np.float64}  # cf_float32, cf_double64
+
+
+class EEGAcquisition:
+    """Drain an LSL inlet on a background thread so the game loop never blocks on pull_chunk."""
+
+    def __init__(self, inlet: 'StreamInlet', buffer_seconds: float = 4.0,
+                 max_samples: int = 128, timeout: float = 0.05, recorder=None, metrics=DISABLED,
+                 buffer_type=RingBuffer):
+        self.inlet = inlet
+        self.recorder = recorder  # Optional EEGRecorder that receives every raw chunk
+        self.metrics = metrics
+        self.fs = get_sampling_rate(inlet)
+        info = inlet.info()
+        self.n_channels = info.channel_count()
+        self.max_samples = max_samples
+        self.timeout = timeout
+
+        # Samples land directly in the ring when the stream format matches a NumPy dtype
+        dtype = _LSL_DTYPES.get(info.channel_format())
+        self._direct = dtype is not None
+        capacity = max(int(buffer_seconds * self.fs), max_samples)
+        # buffer_type may be a RingBuffer subclass, e.g. one in shared memory
+        self.buffer = buffer_type(capacity, self.n_channels, dtype=dtype or np.float64,
+                                  slack=max_samples)
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.error = None  # Exception that stopped the thread, if any
+
+    def start(self):
+        """Start the acquisition thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="EEGAcquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self, join_timeout: float = 1.0):
+        """Signal the acquisition thread to stop and wait for it."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=join_timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def sample_count(self) -> int:
+        """Total number of samples received so far."""
+        return self.buffer.count
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            count = self.buffer.count
+            try:
+                if self._direct:
+                    self.buffer.pull(self.inlet, self.max_samples, timeout=self.timeout)
+                else:
+                    eeg_data, timestamps = get_eeg_chunk(self.inlet, timeout=self.timeout,
+                                                         max_samples=self.max_samples)
+                    if eeg_data is not None and len(eeg_data) > 0:
+                        self.buffer.write(eeg_data, timestamps)
+                
+                if self.recorder is not None and self.buffer.count > count:
+                    self.recorder.write(*self.buffer.window(self.buffer.count - count))
+            except Exception as e:  # e.g. pylsl.LostError
+                self.error = e
+                break
+
+    def latest_window(self, n_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (data, timestamps) views of up to the most recent n_samples.
+
+        Views stay valid until another `max_samples` samples arrive; copy them to keep longer.
+        """
+        return self.buffer.window(n_samples)
+
+    def samples_since(self, index: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Return samples received after sample_count == index, plus the new sample_count.
+
+        If the caller fell more than one buffer behind (or the producer lapped a
+        long backlog while it was being copied), the oldest samples are lost and
+        counted as dropped_samples. Short results are views; see RingBuffer.since.
+        """
+        data, timestamps, count = self.buffer.since(index)
+        lost = count - max(index, 0) - len(data)
+        if lost > 0:
+            self.metrics.count('dropped_samples', lost)
+        return data, timestamps, count
@@ -0,0 +1,353 @@
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from itertools import count, takewhile
+
+import numpy as np
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from eeg.recording import ReplayStreamInfo
+
+
+# Channel layout of a Muse 2 LSL stream
+MUSE_CHANNELS = ('TP9', 'AF7', 'AF8', 'TP10', 'Right AUX')
+
+# Fraction of the frontal blink amplitude that reaches each channel
+_BLINK_GAIN = np.array([0.1, 1.0, 1.0, 0.1, 0.0])
+
+
+def blink_artifact(fs: int, duration: float = 0.2, amplitude: float = 600.0) -> np.ndarray:
+    """Raised-cosine pulse shaped like an eye-blink deflection (µV)."""
+    n = max(int(duration * fs), 1)
+    return amplitude * 0.5 * (1.0 - np.cos(2.0 * np.pi * np.arange(n) / n))
+
+
+def scheduled_blinks(duration: float, interval: float = 3.0, start: float = 2.0,
+                     jitter: float = 0.0, seed: Optional[int] = None) -> np.ndarray:
+    """Blink onset times every `interval` seconds (± uniform jitter) within duration."""
+    times = np.arange(start, duration - 1.0, interval)
+    if jitter:
+        rng = np.random.default_rng(seed)
+        times = times + rng.uniform(-jitter, jitter, len(times))
+    return times[(times >= 0) & (times < duration)]
+
+
+def _poisson_onsets(rng: np.random.Generator, rate: float, start: float,
+                    refractory: float) -> Iterator[float]:
+    """Endless blink onsets after `start` at a Poisson `rate` (per minute), at least `refractory` apart."""
+    onset = start + rng.exponential(60.0 / rate)
+    while True:
+        yield onset
+        onset += max(rng.exponential(60.0 / rate), refractory)
+
+
+def poisson_blinks(duration: float, rate: float = 20.0, start: float = 2.0, refractory: float = 0.3,
+                   seed: Optional[int] = None) -> np.ndarray:
+    """Blink onset times at a Poisson `rate` (per minute), as SyntheticEEG schedules them."""
+    onsets = _poisson_onsets(np.random.default_rng(seed), rate, start, refractory)
+    return np.fromiter(takewhile(lambda onset: onset < duration - 1.0, onsets), dtype=np.float64)
+
+
+# Pink (1/f) noise filter for white noise input: three pole/zero pairs keep the
+# spectrum within ~0.3 dB of 1/f from about 0.001 to 0.5 of the sampling rate
+_PINK_B = np.array([0.049922035, -0.095993537, 0.050612699, -0.004408786])
+_PINK_A = np.array([1.0, -2.494956002, 2.017265875, -0.522189400])
+
+
+@lru_cache(maxsize=None)
+def _pink_gain() -> float:
+    """Standard deviation of the pink filter's output for unit white noise."""
+    from scipy.signal import lfilter
+    impulse = np.zeros(1 << 16)
+    impulse[0] = 1.0
+    return float(np.sqrt(np.sum(lfilter(_PINK_B, _PINK_A, impulse) ** 2)))
+
+
+def synthesize_eeg(duration: float, fs: int = 256, blink_times: Sequence[float] = (),
+                   start_time: float = 0.0, seed: Optional[int] = None,
+                   **options) -> Tuple[np.ndarray, np.ndarray]:
+    """One SyntheticEEG stream (samples x 5 channels, float32) with blinks at known onsets.
+
+    `blink_times` are seconds from the start; timestamps start at
+    `start_time` and are evenly spaced at 1/fs. Other keyword options go to
+    SyntheticEEG (e.g. noise levels, alpha_amplitude, blink_amplitude).
+    """
+    generator = SyntheticEEG(1, fs, blink_times=blink_times, start_time=start_time, seed=seed, **options)
+    data, timestamps, _ = generator.generate(int(duration * fs))
+    return data[0], timestamps[0]
+
+
+# Fraction of the alpha rhythm seen on each channel (strongest at the temporal sites)
+_ALPHA_GAIN = np.array([1.0, 0.5, 0.5, 1.0, 0.0])
+
+
+class SyntheticEEG:
+    """Many Muse-like EEG streams generated block by block, with known blink times.
+
+    Each stream is 1/f background plus white sensor noise, an alpha rhythm
+    that waxes and wanes (each stream near `alpha_frequency`), and blink
+    pulses on AF7/AF8: at `blink_times` (seconds from the start, the same
+    for every stream) if given, else every `blink_interval` seconds if
+    given, otherwise at a Poisson `blink_rate` per minute (0 for none; see
+    poisson_blinks). Dropouts delete stretches of samples as lost Bluetooth
+    packets do, and `jitter` adds Gaussian noise (seconds) to the timestamps. All streams are generated in the same
+    array operations, so dozens cost little more than one.
+
+    Ground truth: `blinks[i]` holds the onset times of stream i (including
+    blinks lost in a dropout; see visible_blinks) and `dropouts[i]` its
+    (start, end) times, both on the nominal (unjittered) time base.
+    """
+
+    def __init__(self, n_streams: int = 1, fs: int = 256, pink_noise: float = 20.0, noise: float = 5.0,
+                 alpha_amplitude: float = 15.0, alpha_frequency: float = 10.0, blink_rate: float = 20.0,
+                 blink_interval: Optional[float] = None, blink_times: Optional[Sequence[float]] = None,
+                 blink_amplitude: float = 600.0,
+                 blink_duration: float = 0.2, refractory: float = 0.3, dropout_rate: float = 0.0,
+                 dropout_duration: float = 0.5, jitter: float = 0.0, start_time: float = 0.0,
+                 seed: Optional[int] = None):
+        from scipy.signal import lfilter
+        self._lfilter = lfilter
+        self.n_streams = n_streams
+        self.fs = fs
+        self.pink_noise = pink_noise
+        self.noise = noise
+        self.alpha_amplitude = alpha_amplitude
+        self.dropout_rate = dropout_rate  # Dropouts per minute
+        self.dropout_duration = dropout_duration
+        self.jitter = jitter
+        self.start_time = start_time
+        self.count = 0  # Samples generated per stream so far
+        # Signal noise, and each stream's blink and dropout times, come from separate
+        # generators, so the ground truth does not depend on the block sizes requested
+        seeds = np.random.SeedSequence(seed).spawn(1 + 2 * n_streams)
+        self.rng = rng = np.random.default_rng(seeds[0])
+        self._blink_rngs = [np.random.default_rng(s) for s in seeds[1:1 + n_streams]]
+        self._dropout_rngs = [np.random.default_rng(s) for s in seeds[1 + n_streams:]]
+        n_channels = len(MUSE_CHANNELS)
+
+        self._pink_zi = np.zeros((n_streams, len(_PINK_A) - 1, n_channels))
+        self._pink_scale = pink_noise / _pink_gain()
+        self._alpha_step = 2.0 * np.pi * (alpha_frequency + rng.uniform(-0.5, 0.5, n_streams)) / fs
+        self._alpha_phase = rng.uniform(0.0, 2.0 * np.pi, n_streams)
+        self._envelope_phase = rng.uniform(0.0, 2.0 * np.pi, n_streams)  # 0.1 Hz waxing and waning
+        self._pulse = blink_artifact(fs, blink_duration, blink_amplitude)[:, None] * _BLINK_GAIN
+        self._carry = np.zeros((n_streams, len(self._pulse), n_channels))  # Pulse tails for the next block
+
+        # Each stream's onsets, in order; random schedules start out of step with each other
+        if blink_times is not None:
+            onsets = sorted(start_time + np.asarray(blink_times, dtype=np.float64))
+            self._schedules = [iter(onsets) for _ in range(n_streams)]
+        elif blink_interval:
+            self._schedules = [count(start_time + 2.0 + r.uniform(0.0, blink_interval), blink_interval)
+                               for r in self._blink_rngs]
+        elif blink_rate > 0:
+            self._schedules = [_poisson_onsets(r, blink_rate, start_time + 2.0, refractory)
+                               for r in self._blink_rngs]
+        else:
+            self._schedules = [iter(()) for _ in range(n_streams)]
+        self._next_blink = np.array([next(schedule, np.inf) for schedule in self._schedules])
+        self._next_dropout = start_time + (
+            np.array([r.exponential(60.0 / dropout_rate) for r in self._dropout_rngs])
+            if dropout_rate > 0 else np.full(n_streams, np.inf))
+        self._dropout_end = np.full(n_streams, -np.inf)
+        self.blinks: List[List[float]] = [[] for _ in range(n_streams)]
+        self.dropouts: List[List[Tuple[float, float]]] = [[] for _ in range(n_streams)]
+
+    def generate(self, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The next n samples of every stream.
+
+        Returns (data streams x n x 5 float32, timestamps streams x n,
+        delivered streams x n); samples with delivered False fell in a dropout.
+        """
+        fs = self.fs
+        k = len(self._pulse)
+        rng = self.rng
+        first = self.count
+        t = self.start_time + (first + np.arange(n)) / fs
+        end_time = self.start_time + (first + n) / fs
+
+        white = rng.standard_normal((self.n_streams, n, len(MUSE_CHANNELS)))
+        pink, self._pink_zi = self._lfilter(_PINK_B, _PINK_A, white, axis=1, zi=self._pink_zi)
+        data = np.zeros((self.n_streams, n + k, len(MUSE_CHANNELS)))
+        data[:, :n] = pink * self._pink_scale
+        if self.noise:
+            data[:, :n] += rng.normal(0.0, self.noise, pink.shape)
+        data[:, :k] += self._carry
+
+        steps = np.arange(n)
+        phase = self._alpha_phase[:, None] + self._alpha_step[:, None] * steps
+        envelope = 0.75 + 0.25 * np.sin(self._envelope_phase[:, None] + 2.0 * np.pi * 0.1 / fs * steps)
+        data[:, :n] += (self.alpha_amplitude * envelope * np.sin(phase))[..., None] * _ALPHA_GAIN
+        self._alpha_phase = (self._alpha_phase + self._alpha_step * n) % (2.0 * np.pi)
+        self._envelope_phase = (self._envelope_phase + 2.0 * np.pi * 0.1 * n / fs) % (2.0 * np.pi)
+
+        for s in np.flatnonzero(self._next_blink < end_time):
+            while self._next_blink[s] < end_time:
+                onset = self._next_blink[s]
+                start = max(int(round((onset - self.start_time) * fs)) - first, 0)
+                data[s, start:start + k] += self._pulse[:n + k - start]
+                self.blinks[s].append(float(onset))
+                self._next_blink[s] = next(self._schedules[s], np.inf)
+        self._carry = data[:, n:].copy()
+
+        delivered = np.ones((self.n_streams, n), dtype=bool)
+        for s in np.flatnonzero((self._next_dropout < end_time) | (self._dropout_end > t[0])):
+            delivered[s] &= t >= self._dropout_end[s]
+            while self._next_dropout[s] < end_time:
+                start, stop = self._next_dropout[s], self._next_dropout[s] + self.dropout_duration
+                self.dropouts[s].append((float(start), float(stop)))
+                delivered[s] &= (t < start) | (t >= stop)
+                self._dropout_end[s] = stop
+                self._next_dropout[s] = stop + self._dropout_rngs[s].exponential(60.0 / self.dropout_rate)
+
+        timestamps = np.broadcast_to(t, (self.n_streams, n))
+        if self.jitter:
+            timestamps = timestamps + rng.normal(0.0, self.jitter, timestamps.shape)
+        self.count += n
+        return data[:, :n].astype(np.float32), np.array(timestamps), delivered
+
+    def visible_blinks(self, index: int, until: float = np.inf) -> np.ndarray:
+        """Onsets of stream `index` before `until` whose whole pulse was delivered."""
+        duration = len(self._pulse) / self.fs
+        onsets = np.asarray(self.blinks[index])
+        onsets = onsets[onsets < until]
+        visible = np.ones(len(onsets), dtype=bool)
+        for start, stop in self.dropouts[index]:
+            visible &= (onsets + duration <= start) | (onsets >= stop)
+        return onsets[visible]
+
+
+class SyntheticStreamInfo(ReplayStreamInfo):
+    """Stream metadata of a SyntheticInlet."""
+
+    def name(self) -> str:
+        return self._header['name']
+
+
+class SyntheticInlet:
+    """One stream of SyntheticStreams through the StreamInlet.pull_chunk interface."""
+
+    def __init__(self, streams: 'SyntheticStreams', index: int, max_chunks: int):
+        self.streams = streams
+        self.index = index
+        # Like an LSL inlet's buffer, the oldest chunks are lost if nobody pulls
+        self._pending = deque(maxlen=max_chunks)
+        self._info = SyntheticStreamInfo({
+            'name': f"Synthetic-{index + 1}", 'source_id': f"synthetic-{index + 1}",
+            'fs': streams.generator.fs, 'channel_names': list(MUSE_CHANNELS), 'dtype': '<f4'})
+
+    def info(self, timeout: float = None) -> SyntheticStreamInfo:
+        return self._info
+
+    def pull_chunk(self, timeout: float = 0.0, max_samples: int = 1024, dest_obj=None):
+        clock = self.streams.clock
+        deadline = clock() + timeout
+        self.streams.advance()
+        while not self._pending:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return ([] if dest_obj is None else None), []
+            time.sleep(min(remaining, self.streams.chunk_period))
+            self.streams.advance()
+
+        chunks = []
+        n = 0
+        while self._pending and n < max_samples:
+            data, timestamps = self._pending.popleft()
+            if n + len(data) > max_samples:
+                keep = max_samples - n
+                self._pending.appendleft((data[keep:], timestamps[keep:]))
+                data, timestamps = data[:keep], timestamps[:keep]
+            chunks.append((data, timestamps))
+            n += len(data)
+        data = np.concatenate([chunk[0] for chunk in chunks])
+        timestamps = np.concatenate([chunk[1] for chunk in chunks]).tolist()
+        if dest_obj is None:
+            return data.tolist(), timestamps
+        dest = np.frombuffer(memoryview(dest_obj).cast('B'), dtype=np.float32).reshape(-1, data.shape[1])
+        dest[:n] = data
+        return None, timestamps
+
+
+class SyntheticStreams:
+    """In-process stand-ins for `n_streams` LSL headsets, generated in real time.
+
+    `inlets` can be passed wherever a pylsl StreamInlet is used (e.g.
+    EEGAcquisition). Samples are generated for all streams together, in
+    `chunk_size` blocks as they fall due on `clock`, and timestamped on that
+    clock. Keyword options go to SyntheticEEG; its ground truth is in
+    `generator`.
+    """
+
+    def __init__(self, n_streams: int, fs: int = 256, chunk_size: int = 12, clock=time.perf_counter,
+                 buffer_seconds: float = 360.0, **options):
+        self.clock = clock
+        self.chunk_size = chunk_size
+        self.chunk_period = chunk_size / fs
+        _pink_gain()  # Loads SciPy, which takes a while, before the streams' clock starts
+        self.generator = SyntheticEEG(n_streams, fs, start_time=clock(), **options)
+        max_chunks = max(int(buffer_seconds / self.chunk_period), 1)
+        self.inlets = [SyntheticInlet(self, i, max_chunks) for i in range(n_streams)]
+        self._lock = threading.Lock()  # Inlets are pulled from several acquisition threads
+
+    def advance(self):
+        """Generate every whole chunk that is due by now and queue it on the inlets."""
+        generator = self.generator
+        with self._lock:
+            due = int((self.clock() - generator.start_time) * generator.fs)
+            n = due // self.chunk_size * self.chunk_size - generator.count
+            if n <= 0:
+                return
+            data, timestamps, delivered = generator.generate(n)
+            for inlet, samples, times, mask in zip(self.inlets, data, timestamps, delivered):
+                if mask.all():
+                    inlet._pending.append((samples, times))
+                elif mask.any():
+                    inlet._pending.append((samples[mask], times[mask]))
+
+
+class SyntheticOutlets:
+    """Publish `n_streams` synthetic headsets as local LSL outlets.
+
+    Streams are named '<name>-1', '<name>-2', ... (source_id in lower case)
+    with Muse channel labels, so main.py --stream and connect_to_muse find
+    them like real headsets. `run()` pushes `chunk_size` samples per stream
+    as they fall due on the LSL clock. Keyword options go to SyntheticEEG;
+    its ground truth is in `generator`.
+    """
+
+    def __init__(self, n_streams: int, fs: int = 256, name: str = 'Synthetic', chunk_size: int = 12,
+                 **options):
+        from pylsl import StreamInfo, StreamOutlet, local_clock
+        self.clock = local_clock
+        self.chunk_size = chunk_size
+        self.names = [f"{name}-{i + 1}" for i in range(n_streams)]
+        self.outlets = []
+        for stream_name in self.names:
+            info = StreamInfo(stream_name, 'EEG', len(MUSE_CHANNELS), fs, 'float32', stream_name.lower())
+            channels = info.desc().append_child('channels')
+            for label in MUSE_CHANNELS:
+                channels.append_child('channel').append_child_value('label', label)
+            self.outlets.append(StreamOutlet(info, chunk_size))
+        _pink_gain()  # Loads SciPy, which takes a while, before the streams' clock starts
+        self.generator = SyntheticEEG(n_streams, fs, start_time=local_clock(), **options)
+        self.late_chunks = 0  # Chunks pushed more than a chunk period after they were due
+
+    def run(self, duration: float = None, stop: threading.Event = None):
+        """Push chunks in real time for `duration` seconds (or until `stop` is set)."""
+        generator = self.generator
+        period = self.chunk_size / generator.fs
+        end = None if duration is None else self.clock() + duration
+        stop = stop or threading.Event()
+        while not stop.is_set() and (end is None or self.clock() < end):
+            # A chunk is due once its last sample has been "captured"
+            wait = generator.start_time + (generator.count + self.chunk_size) / generator.fs - self.clock()
+            if wait > 0:
+                stop.wait(wait)
+            elif wait < -period:
+                self.late_chunks += 1
+            data, timestamps, delivered = generator.generate(self.chunk_size)
+            for outlet, samples, times, mask in zip(self.outlets, data, timestamps, delivered):
+                if mask.any():
+                    outlet.push_chunk(samples[mask], times[mask].tolist())
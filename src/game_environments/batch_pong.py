@@ -0,0 +1,217 @@
+import numpy as np
+from typing import Optional, Sequence
+
+from game_environments.pong_state import PongState, TICK, TICK_RATE, reflect
+
+
+class BatchPong:
+    """N independent NPC-mode Pong games stepped together as NumPy arrays.
+
+    Follows the same rules as PongState (blink to start / flip the left
+    paddle, wall bounces, 1.1x speed-up on paddle hits, round reset after a
+    goal, AI right paddle tracking the ball), so a blink stream scores the
+    same way it would in the interactive game, only thousands at a time.
+    """
+
+    def __init__(self, n_games: int, width: int = 600, height: int = 400,
+                 ball_speed: float = 6.0 * TICK_RATE, seed: Optional[int] = None):
+        # Constants come from the scalar rules so the two cannot drift apart
+        rules = PongState(width, height, npc_mode=True, ball_speed=ball_speed)
+        self.WIDTH = rules.WIDTH
+        self.HEIGHT = rules.HEIGHT
+        self.BALL_RADIUS = rules.BALL_RADIUS
+        self.PAD_WIDTH = rules.PAD_WIDTH
+        self.HALF_PAD_HEIGHT = rules.HALF_PAD_HEIGHT
+        self.PADDLE_SPEED = rules.PADDLE_SPEED
+        self.NPC_SPEED = rules.NPC_SPEED
+        self.NPC_DEADBAND = rules.NPC_DEADBAND
+        self.SPEEDUP = rules.SPEEDUP
+        self.BALL_TOP = rules.BALL_TOP
+        self.BALL_BOTTOM = rules.BALL_BOTTOM
+        self.LEFT_LINE = rules.LEFT_LINE
+        self.RIGHT_LINE = rules.RIGHT_LINE
+        self.MAX_CONTACTS = rules.MAX_CONTACTS
+        self.ball_speed = ball_speed
+
+        self.n_games = n_games
+        self.rng = np.random.default_rng(seed)
+
+        self.ball_x = np.full(n_games, width / 2)
+        self.ball_y = np.full(n_games, height / 2)
+        self.ball_vx = np.zeros(n_games)
+        self.ball_vy = np.zeros(n_games)
+        self.paddle1_y = np.full(n_games, height / 2)
+        self.paddle2_y = np.full(n_games, height / 2)
+        self.paddle1_vel = np.zeros(n_games)
+        self.paddle_direction = np.ones(n_games)
+        self.l_score = np.zeros(n_games, dtype=np.int64)
+        self.r_score = np.zeros(n_games, dtype=np.int64)
+        self.game_started = np.zeros(n_games, dtype=bool)
+        self.ball_start_right = self.rng.integers(0, 2, n_games) == 0
+        self.time = 0.0
+
+    def _launch(self, games: np.ndarray):
+        """Give the ball of each listed game a random launch velocity."""
+        horz = self.ball_speed * self.rng.uniform(0.7, 1.3, len(games))
+        vert = self.ball_speed * self.rng.uniform(0.3, 0.8, len(games))
+        self.ball_vx[games] = np.where(self.ball_start_right[games], horz, -horz)
+        self.ball_vy[games] = -vert
+
+    def handle_blinks(self, games: np.ndarray):
+        """Apply one blink to each listed game (indices, without duplicates)."""
+        started = self.game_started[games]
+        start = games[~started]
+        flip = games[started]
+
+        self.game_started[start] = True
+        self.paddle1_vel[start] = self.paddle_direction[start] * self.PADDLE_SPEED
+        self._launch(start)
+
+        self.paddle_direction[flip] *= -1
+        self.paddle1_vel[flip] = self.paddle_direction[flip] * self.PADDLE_SPEED
+
+    def _reset_round(self, mask: np.ndarray, ball_direction_right: bool):
+        self.game_started[mask] = False
+        self.paddle1_vel[mask] = 0.0
+        self.paddle1_y[mask] = self.HEIGHT / 2
+        self.paddle2_y[mask] = self.HEIGHT / 2
+        self.paddle_direction[mask] = 1.0
+        self.ball_x[mask] = self.WIDTH / 2
+        self.ball_y[mask] = self.HEIGHT / 2
+        self.ball_vx[mask] = 0.0
+        self.ball_vy[mask] = 0.0
+        self.ball_start_right[mask] = ball_direction_right
+
+    def step(self, dt: float = TICK, blinks: Optional[np.ndarray] = None):
+        """Advance every game by dt seconds; `blinks` lists games that blinked this step."""
+        if blinks is not None and len(blinks):
+            self.handle_blinks(blinks)
+
+        started = self.game_started
+        top = self.HALF_PAD_HEIGHT
+        bottom = self.HEIGHT - self.HALF_PAD_HEIGHT
+
+        # Blink paddle stops at the top/bottom walls until the next blink
+        # (its velocity is 0 while a round waits to start)
+        y = self.paddle1_y
+        v = self.paddle1_vel
+        y += v * dt
+        stopped = ((y <= top) & (v < 0)) | ((y >= bottom) & (v > 0))
+        np.clip(y, top, bottom, out=y, where=stopped)
+        v[stopped] = 0.0
+
+        # AI heads for where the ball will cross its line, or follows the ball while it moves away
+        target = self.ball_y.copy()
+        coming = np.flatnonzero((self.ball_vx > 0) & (self.ball_x <= self.RIGHT_LINE))
+        t = (self.RIGHT_LINE - self.ball_x[coming]) / self.ball_vx[coming]
+        target[coming] = reflect(self.ball_y[coming] + self.ball_vy[coming] * t,
+                                 self.BALL_TOP, self.BALL_BOTTOM)
+        step = self.NPC_SPEED * dt
+        p = self.paddle2_y
+        up = started & (target < p - self.NPC_DEADBAND)
+        down = started & (target > p + self.NPC_DEADBAND)
+        p[up] = np.maximum(p[up] - step, target[up])
+        p[down] = np.minimum(p[down] + step, target[down])
+        np.clip(p, top, bottom, out=p)
+
+        self._move_balls(dt)
+        self.time += dt
+
+    @staticmethod
+    def _time_to_limit(p: np.ndarray, v: np.ndarray, low: float, high: float) -> np.ndarray:
+        """Seconds until each p reaches the limit it is heading for (meaningless where v == 0)."""
+        return np.maximum((np.where(v > 0, high, low) - p) / v, 0.0)
+
+    def _next_contact(self, games):
+        """Time to the next wall and paddle-line contact of each game (all games for slice(None))."""
+        t_wall = self._time_to_limit(self.ball_y[games], self.ball_vy[games],
+                                     self.BALL_TOP, self.BALL_BOTTOM)
+        t_line = self._time_to_limit(self.ball_x[games], self.ball_vx[games],
+                                     self.LEFT_LINE, self.RIGHT_LINE)
+        return t_wall, t_line
+
+    def _move_balls(self, dt: float):
+        """Sweep every moving ball through dt seconds, resolving contacts at their time of impact.
+
+        Each pass handles the next contact of every game that has one left;
+        games drop out once their ball travels freely to the end of the step
+        or scores.
+        """
+        remaining = np.full(self.n_games, dt)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Most balls touch nothing in a step; only the others go through the contact passes.
+            # Balls waiting for a round to start are still (a moving ball always has vx, vy != 0)
+            t_wall, t_line = self._next_contact(slice(None))
+            active = np.flatnonzero((np.minimum(t_wall, t_line) <= dt) & (self.ball_vx != 0))
+        for _ in range(self.MAX_CONTACTS):
+            if not len(active):
+                break
+            t_wall, t_line = self._next_contact(active)
+            t = np.minimum(t_wall, t_line)
+            contact = t <= remaining[active]
+            active, t, wall = active[contact], t[contact], (t_wall <= t_line)[contact]
+            self.ball_x[active] += self.ball_vx[active] * t
+            self.ball_y[active] += self.ball_vy[active] * t
+            remaining[active] -= t
+
+            self.ball_vy[active[wall]] *= -1.0
+            line = active[~wall]
+            right = self.ball_vx[line] > 0
+            paddle_y = np.where(right, self.paddle2_y[line], self.paddle1_y[line])
+            ball_y = self.ball_y[line]
+            covered = (paddle_y - self.HALF_PAD_HEIGHT <= ball_y) & (ball_y < paddle_y + self.HALF_PAD_HEIGHT)
+            hit = line[covered]
+            self.ball_vx[hit] *= -self.SPEEDUP
+            self.ball_vy[hit] *= self.SPEEDUP
+            for scored, score, serve_right in ((line[~covered & right], self.l_score, False),
+                                               (line[~covered & ~right], self.r_score, True)):
+                score[scored] += 1
+                self._reset_round(scored, serve_right)
+                remaining[scored] = 0.0
+            active = np.concatenate((active[wall], hit))
+
+        self.ball_x += self.ball_vx * remaining
+        self.ball_y += self.ball_vy * remaining
+
+
+def _carry_over(steps: np.ndarray) -> np.ndarray:
+    """Steps at which sorted blink steps are applied, at most one per step.
+
+    A blink waits for the step after the previous blink's, so blink i lands
+    at max(steps[i], applied[i - 1] + 1) = i + max(steps[j] - j for j <= i).
+    """
+    index = np.arange(len(steps))
+    return index + np.maximum.accumulate(steps - index) if len(steps) else steps
+
+
+def simulate(blink_times: Sequence[np.ndarray], duration: float, dt: float = TICK,
+             start_time: float = 0.0, seed: Optional[int] = None, **kwargs) -> BatchPong:
+    """Play one game per blink stream (blink times in seconds) for `duration` seconds.
+
+    Each blink is applied at the step whose interval [start, end) contains its
+    time, as PongGame applies it at the first tick ending after it; like
+    PongGame, a game takes one blink per step and carries the rest over to
+    the following steps. Returns the finished BatchPong; compare `l_score`
+    (blinker) with `r_score` (AI).
+    """
+    n_games = len(blink_times)
+    games = BatchPong(n_games, seed=seed, **kwargs)
+    n_steps = int(duration / dt)
+
+    # Flatten the event streams into (step, game) pairs sorted by step. A blink on a
+    # step boundary belongs to the step starting there (the tolerance absorbs the
+    # rounding of (time - start_time) / dt); blinks before start_time go to the first
+    steps = [np.maximum(np.floor((np.asarray(times, dtype=np.float64) - start_time) / dt + 1e-6), 0)
+             .astype(np.int64) for times in blink_times]
+    steps = [_carry_over(np.sort(s)) for s in steps]
+    owners = np.repeat(np.arange(n_games), [len(s) for s in steps])
+    steps = np.concatenate(steps) if n_games else np.zeros(0, dtype=np.int64)
+    order = np.lexsort((owners, steps))
+    steps, owners = steps[order], owners[order]
+    bounds = np.searchsorted(steps, np.arange(n_steps + 1))
+
+    for k in range(n_steps):
+        lo, hi = bounds[k], bounds[k + 1]
+        blinks = owners[lo:hi] if hi > lo else None
+        games.step(dt, blinks)
+    return games
@@ -0,0 +1,255 @@
+import os
+import socket
+import struct
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from game_environments.pong_state import TICK
+
+
+# Wire format. Every datagram starts with HEADER (kind, flags, sequence
+# number, one per physics tick). A keyframe carries the full state; a delta
+# carries only the position changes since the previous tick, and is sent
+# while scores and the started flag are unchanged and the move fits in int16.
+# Positions are fixed point (SCALE units per pixel), so deltas reconstruct
+# the publisher's quantized positions exactly. A consumer that misses a
+# sequence number ignores deltas until the next keyframe.
+KEYFRAME = 1
+DELTA = 2
+STARTED = 0x01  # Flag: the round is in play
+HEADER = struct.Struct('<BBI')
+KEY_BODY = struct.Struct('<d4iHH')  # Tick time, ball x/y, paddle 1/2 y, left/right score
+DELTA_BODY = struct.Struct('<4h')   # Change of ball x/y, paddle 1/2 y
+SCALE = 16
+# Consumers subscribe by sending HELLO to the publisher, and repeat it to stay subscribed
+HELLO = b'MPHI'
+DEFAULT_ADDRESS = '127.0.0.1:5750'
+
+
+class GameSnapshot(NamedTuple):
+    sequence: int
+    time: float  # Game clock time at the end of the tick
+    ball_x: float
+    ball_y: float
+    paddle1_y: float
+    paddle2_y: float
+    l_score: int
+    r_score: int
+    game_started: bool
+
+    def positions(self) -> Tuple[float, float, float, float]:
+        return self.ball_x, self.ball_y, self.paddle1_y, self.paddle2_y
+
+
+def parse_address(address: str):
+    """'host:port' is a UDP address; anything else is a Unix datagram socket path.
+
+    Returns (socket family, address for bind/sendto).
+    """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+
+class StateEncoder:
+    """Turn per-tick PongGame snapshots into keyframe or delta datagrams."""
+
+    def __init__(self, keyframe_interval: int = 30):
+        self.keyframe_interval = keyframe_interval  # Ticks between keyframes (resync after loss)
+        self.sequence = 0
+        self._previous = None  # (time, fixed-point positions, scores, flags) last sent
+
+    def encode(self, time: float, snapshot: Sequence) -> bytes:
+        """Encode (ball x, ball y, paddle 1 y, paddle 2 y, l_score, r_score, game_started)."""
+        positions = tuple(int(round(value * SCALE)) for value in snapshot[:4])
+        scores = (int(snapshot[4]), int(snapshot[5]))
+        flags = STARTED if snapshot[6] else 0
+        previous = self._previous
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self._previous = (time, positions, scores, flags)
+
+        if (previous is not None and self.sequence % self.keyframe_interval
+                and previous[2] == scores and previous[3] == flags
+                and abs(time - previous[0] - TICK) < 1e-6):
+            deltas = [p - q for p, q in zip(positions, previous[1])]
+            if all(-32768 <= d <= 32767 for d in deltas):
+                # Keep the time the consumer will reconstruct, so rounding cannot drift
+                self._previous = (previous[0] + TICK, positions, scores, flags)
+                return HEADER.pack(DELTA, flags, self.sequence) + DELTA_BODY.pack(*deltas)
+        return HEADER.pack(KEYFRAME, flags, self.sequence) + KEY_BODY.pack(time, *positions, *scores)
+
+
+class StateDecoder:
+    """Rebuild GameSnapshots from the datagrams of one StateEncoder."""
+
+    def __init__(self):
+        self.sequence = None  # Sequence number of the last snapshot decoded
+        self.lost = 0         # Datagrams missed (sequence gaps)
+        self.skipped = 0      # Deltas ignored while waiting for a keyframe
+        self._state = None    # (time, fixed-point positions, scores, flags)
+
+    def decode(self, packet: bytes) -> Optional[GameSnapshot]:
+        """The snapshot in `packet`, or None if it cannot be applied (or is malformed)."""
+        if len(packet) < HEADER.size:
+            return None
+        kind, flags, sequence = HEADER.unpack_from(packet)
+        if self.sequence is not None:
+            gap = (sequence - self.sequence) & 0xFFFFFFFF
+            if gap == 0 or gap > 0x7FFFFFFF:
+                return None  # Duplicate or reordered
+            self.lost += gap - 1
+            if gap > 1:
+                self._state = None
+
+        if kind == KEYFRAME and len(packet) == HEADER.size + KEY_BODY.size:
+            values = KEY_BODY.unpack_from(packet, HEADER.size)
+            self._state = (values[0], values[1:5], values[5:7], flags)
+        elif kind == DELTA and len(packet) == HEADER.size + DELTA_BODY.size and self._state is not None:
+            deltas = DELTA_BODY.unpack_from(packet, HEADER.size)
+            time, positions, scores, _ = self._state
+            self._state = (time + TICK, tuple(p + d for p, d in zip(positions, deltas)), scores, flags)
+        else:
+            self.skipped += kind == DELTA
+            self.sequence = sequence
+            return None
+        self.sequence = sequence
+
+        time, positions, scores, flags = self._state
+        return GameSnapshot(sequence, time, *(p / SCALE for p in positions), *scores,
+                            bool(flags & STARTED))
+
+
+class StatePublisher:
+    """Send a snapshot of every physics tick to subscribed consumers.
+
+    Listens on `address` (see parse_address) for HELLO datagrams; each
+    sender is subscribed until it has been silent for `subscriber_timeout`
+    seconds. Sends never block: a datagram a consumer has no room for is
+    dropped and counted in `dropped`.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, keyframe_interval: int = 30,
+                 subscriber_timeout: float = 5.0, max_subscribers: int = 256):
+        self.address = address
+        self.family, sockaddr = parse_address(address)
+        self.encoder = StateEncoder(keyframe_interval)
+        self.subscriber_timeout = subscriber_timeout
+        self.max_subscribers = max_subscribers
+        self.subscribers: Dict = {}  # Consumer address -> time.monotonic() of its last HELLO
+        self.dropped = 0
+        self.sent_bytes = 0
+        if self.family == socket.AF_UNIX and os.path.exists(sockaddr):
+            os.unlink(sockaddr)  # Left over from an earlier session
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        try:
+            self.sock.bind(sockaddr)
+        except OSError:
+            self.sock.close()
+            raise
+        self.sock.setblocking(False)
+        self._last_expiry = time.monotonic()
+
+    def _accept_subscribers(self):
+        now = time.monotonic()
+        while True:
+            try:
+                message, sender = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                continue  # e.g. an ICMP error from a consumer that went away
+            if message == HELLO and sender and (sender in self.subscribers
+                                                or len(self.subscribers) < self.max_subscribers):
+                self.subscribers[sender] = now
+        if now - self._last_expiry >= 1.0:
+            self._last_expiry = now
+            expired = now - self.subscriber_timeout
+            self.subscribers = {sender: heard for sender, heard in self.subscribers.items()
+                                if heard >= expired}
+
+    def publish(self, time: float, snapshot: Sequence):
+        """Send the state at the end of the tick at game-clock `time` (PongGame.snapshot() layout)."""
+        self._accept_subscribers()
+        packet = self.encoder.encode(time, snapshot)
+        for subscriber in list(self.subscribers):
+            try:
+                self.sock.sendto(packet, subscriber)
+                self.sent_bytes += len(packet)
+            except (ConnectionRefusedError, FileNotFoundError):
+                del self.subscribers[subscriber]  # The consumer has gone
+            except OSError:
+                self.dropped += 1  # Socket buffer full; the consumer resyncs on a keyframe
+
+    def close(self):
+        self.sock.close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+
+class StateReceiver:
+    """Subscribe to a StatePublisher and decode the snapshots it sends.
+
+    Nonblocking: `poll()` returns whatever arrived since the last call.
+    HELLO is re-sent every `keepalive` seconds, so a consumer started
+    before the game (or after a restart) attaches once the publisher is up.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, keepalive: float = 1.0):
+        self.address = address
+        self.family, self.publisher = parse_address(address)
+        self.keepalive = keepalive
+        self.decoder = StateDecoder()
+        self.received = 0
+        self.received_bytes = 0
+        self.sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.path = None
+        if self.family == socket.AF_UNIX:
+            # Datagram replies need a bound address of our own
+            self.path = os.path.join(tempfile.gettempdir(),
+                                     f"musepong-viewer-{os.getpid()}-{id(self):x}.sock")
+            self.sock.bind(self.path)
+        else:
+            self.sock.bind((self.publisher[0], 0))
+        self.sock.setblocking(False)
+        self._last_hello = None
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def poll(self) -> List[GameSnapshot]:
+        now = time.monotonic()
+        if self._last_hello is None or now - self._last_hello >= self.keepalive:
+            self._last_hello = now
+            try:
+                self.sock.sendto(HELLO, self.publisher)
+            except BlockingIOError:
+                self._last_hello = None  # Publisher's queue full; retry on the next poll
+            except OSError:
+                pass  # Publisher not running (yet)
+        snapshots = []
+        while True:
+            try:
+                packet = self.sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                continue  # e.g. ICMP port unreachable from an earlier HELLO
+            self.received += 1
+            self.received_bytes += len(packet)
+            snapshot = self.decoder.decode(packet)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def close(self):
+        self.sock.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
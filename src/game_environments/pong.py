@@ -1,19 +1,30 @@
+import bisect
 import pygame
-import random
 import sys
-from typing import Tuple
+import time
+from typing import Sequence, Tuple
+
+from detection_methods.events import BlinkEvent, BLINK
+from game_environments.pong_state import PongState, PongInputs, TICK, TICK_RATE
+from game_environments.scheduler import FrameScheduler
 
 
 class PongGame:
-    def __init__(self, width: int = 600, height: int = 400, npc_mode: bool = False, ball_speed: float = 6.0):
-        # Constants
+    def __init__(self, width: int = 600, height: int = 400, npc_mode: bool = False, ball_speed: float = 6.0,
+                 metrics=None, fps: float = 60.0, clock=time.perf_counter, blink_right: bool = False,
+                 events=None, show_landing: bool = True, telemetry=None, broadcast=None):
+        # Rules and physics live in a headless core; this class only renders and reads input
+        # (blink_right: a second headset's blinks drive the right paddle)
+        self.state = PongState(width, height, npc_mode=npc_mode, ball_speed=ball_speed * TICK_RATE,
+                               blink_right=blink_right)
+        
+        # Geometry shared with the physics core
         self.WIDTH = width
         self.HEIGHT = height
-        self.BALL_RADIUS = 10
-        self.PAD_WIDTH = 8
-        self.PAD_HEIGHT = 80
-        self.HALF_PAD_WIDTH = self.PAD_WIDTH / 2
-        self.HALF_PAD_HEIGHT = self.PAD_HEIGHT / 2
+        self.BALL_RADIUS = self.state.BALL_RADIUS
+        self.PAD_WIDTH = self.state.PAD_WIDTH
+        self.HALF_PAD_WIDTH = self.state.HALF_PAD_WIDTH
+        self.HALF_PAD_HEIGHT = self.state.HALF_PAD_HEIGHT
         
         # Colors
         self.WHITE = (255, 255, 255)
@@ -26,214 +37,211 @@ class PongGame:
         pygame.init()
         self.window = pygame.display.set_mode((self.WIDTH, self.HEIGHT), 0, 32)
         pygame.display.set_caption("Muse-Pong")
-        self.clock = pygame.time.Clock()
         
-        # Game state
-        self.ball_pos = [0, 0]
-        self.ball_vel = [0, 0]
-        self.paddle1_pos = [0, 0]
-        self.paddle2_pos = [0, 0]
-        self.paddle1_vel = 0
-        self.paddle2_vel = 0
-        self.l_score = 0
-        self.r_score = 0
+        # Physics runs in fixed TICK steps on `clock` (the clock blink timestamps
+        # use, e.g. pylsl.local_clock); rendering is paced separately at `fps`
+        self.scheduler = FrameScheduler(fps)
+        self.clock = clock
         self.running = True
-        self.paddle_direction = 1  # 1 for up, -1 for down
-        self.paddle_speed = 4
         self.npc_mode = npc_mode
-        self.ball_speed = ball_speed
-        self.game_started = False  # New state for blink-to-start
-        self.ball_start_right = True  # Default ball direction for start
+        self.sim_time = None  # Clock time the physics has been advanced to
+        self.max_steps = 5  # Physics steps per frame before dropping time we cannot catch up
+        self.events = events  # Optional EventQueue of detector events, drained every update
+        self.show_landing = show_landing  # Mark where the ball will cross the paddle line
+        self.pending_blinks = []  # Sorted (timestamp, player) of blinks not yet applied; player 1 is right
+        self.previous = None  # Positions before the last physics step, for interpolation
+        self.telemetry = telemetry  # Optional SessionTelemetry that logs game events
+        if telemetry is not None:
+            self.state.on_event = self.log_event
+        self.broadcast = broadcast  # Optional StatePublisher sent a snapshot of every tick
         
         # Keyboard state for paddle2
         self.keys_pressed = set()
         
-        self.init_game()
-    
-    def ball_init(self, right):
-        """Initialize ball position and velocity."""
-        self.ball_pos = [self.WIDTH/2, self.HEIGHT/2]
-        
-        if self.game_started:
-            # Only set velocity if game has started
-            horz = self.ball_speed * random.uniform(0.7, 1.3)  # Random variation
-            vert = self.ball_speed * random.uniform(0.3, 0.8)
-            
-            if not right:
-                horz = -horz
-                
-            self.ball_vel = [horz, -vert]
-        else:
-            # Ball starts stationary
-            self.ball_vel = [0, 0]
-            # Store intended direction for when game starts
-            self.ball_start_right = right
-    
-    def init_game(self):
-        """Initialize game state."""
-        self.paddle1_pos = [self.HALF_PAD_WIDTH - 1, self.HEIGHT/2]
-        self.paddle2_pos = [self.WIDTH + 1 - self.HALF_PAD_WIDTH, self.HEIGHT/2]
-        self.paddle1_vel = 0  # Don't start moving until game starts
-        self.l_score = 0
-        self.r_score = 0
+        # Optional Instrumentation; when set, frames are timed and a HUD is drawn
+        self.metrics = metrics
         
-        if random.randrange(0, 2) == 0:
-            self.ball_init(True)
-        else:
-            self.ball_init(False)
-    
-    def reset_paddles(self):
-        """Reset paddles to center position and continue moving."""
-        self.paddle1_pos = [self.HALF_PAD_WIDTH - 1, self.HEIGHT/2]
-        self.paddle2_pos = [self.WIDTH + 1 - self.HALF_PAD_WIDTH, self.HEIGHT/2]
-        self.paddle_direction = 1  # Reset to moving up
-        if self.game_started:  # Only start moving if game has started
-            self.paddle1_vel = self.paddle_direction * self.paddle_speed
+        # Render cache: fonts and static text are built once, the court is a
+        # prebuilt background, and only rectangles that changed are pushed
+        self.score_font = pygame.font.SysFont("Comic Sans MS", 20)
+        self.hud_font = pygame.font.SysFont("monospace", 12) if metrics is not None else None
+        self.start_text = pygame.font.SysFont("Comic Sans MS", 36).render("Blink to start!", 1, self.WHITE)
+        self.start_rect = self.start_text.get_rect(center=(self.WIDTH//2, self.HEIGHT//2))
+        self.score_labels = {}  # (x position, score) -> rendered label
+        self.background = self.render_court()
+        self.dirty_rects = []  # Rectangles drawn last frame, erased on the next
+        self.full_redraw = True
     
     def handle_blink(self):
         """Handle blink input - starts game or changes paddle direction."""
-        if not self.game_started:
-            self.start_game()
-        else:
-            self.paddle_direction *= -1  # Alternate direction
-            self.paddle1_vel = self.paddle_direction * self.paddle_speed
+        self.state.handle_blink()
         print("Blink detected!")
     
-    def start_game(self):
-        """Start the game - begin paddle and ball movement."""
-        self.game_started = True
-        self.paddle1_vel = self.paddle_direction * self.paddle_speed
-        
-        # Start ball movement using stored direction
-        horz = self.ball_speed * random.uniform(0.7, 1.3)
-        vert = self.ball_speed * random.uniform(0.3, 0.8)
-        
-        if not self.ball_start_right:
-            horz = -horz
-            
-        self.ball_vel = [horz, -vert]
+    def log_event(self, time: float, kind: str, player: int):
+        """Log a game event, converting simulated time to `clock` time."""
+        state = self.state
+        now = self.clock() if self.sim_time is None else self.sim_time + time - state.time
+        self.telemetry.log_game(now, kind, player, state.l_score, state.r_score)
+    
+    def queue_blink(self, timestamp: float = None, right: bool = False):
+        """Schedule a blink for the physics tick covering `timestamp` (default: now)."""
+        bisect.insort(self.pending_blinks, (self.clock() if timestamp is None else timestamp, int(right)))
     
-    def reset_round(self, ball_direction_right):
-        """Reset for next round - requires blink to start."""
-        self.game_started = False
-        self.paddle1_vel = 0
-        self.reset_paddles()
-        self.ball_init(ball_direction_right)
+    def queue_event(self, event: BlinkEvent):
+        """Schedule a detector event: headset 0 drives the left paddle, headset 1 the right."""
+        if event.kind == BLINK and event.source in (0, 1):
+            self.queue_blink(event.timestamp, right=event.source == 1)
     
-    def draw(self):
-        """Main draw function."""
-        self.window.fill(self.BLACK)
+    def snapshot(self) -> Tuple:
+        state = self.state
+        return (state.ball_pos[0], state.ball_pos[1], state.paddle1_pos[1], state.paddle2_pos[1],
+                state.l_score, state.r_score, state.game_started)
+    
+    def update(self, now: float = None):
+        """Advance the physics in fixed TICK steps up to clock time `now`.
+
+        Each queued blink is applied at the first tick ending after its
+        timestamp (one per player per tick, so simultaneous blinks are not merged). A
+        blink that arrives after its tick already ran is applied at the next
+        one; the delay is recorded as blink_to_paddle.
+        """
+        if now is None:
+            now = self.clock()
+        if self.events is not None:
+            for event in self.events.drain():
+                self.queue_event(event)
+        if self.sim_time is None:
+            self.sim_time = now - TICK
+        self.sim_time = max(self.sim_time, now - self.max_steps * TICK)
         
-        # Draw lines
-        pygame.draw.line(self.window, self.WHITE, [self.WIDTH / 2, 0], [self.WIDTH / 2, self.HEIGHT], 1)
-        pygame.draw.line(self.window, self.WHITE, [self.PAD_WIDTH, 0], [self.PAD_WIDTH, self.HEIGHT], 1)
-        pygame.draw.line(self.window, self.WHITE, [self.WIDTH - self.PAD_WIDTH, 0], [self.WIDTH - self.PAD_WIDTH, self.HEIGHT], 1)
-        pygame.draw.circle(self.window, self.WHITE, [self.WIDTH//2, self.HEIGHT//2], 70, 1)
+        inputs = PongInputs(up=pygame.K_UP in self.keys_pressed,
+                            down=pygame.K_DOWN in self.keys_pressed)
+        while self.sim_time + TICK <= now:
+            tick_end = self.sim_time + TICK
+            blinks = [False, False]
+            i = 0
+            while i < len(self.pending_blinks) and self.pending_blinks[i][0] < tick_end:
+                timestamp, player = self.pending_blinks[i]
+                if blinks[player]:
+                    i += 1  # This player already blinked this tick; keep it for the next
+                    continue
+                blinks[player] = True
+                del self.pending_blinks[i]
+                if self.metrics is not None:
+                    self.metrics.record_value('blink_to_paddle', tick_end - timestamp)
+                print("Blink detected!" if not player else "Blink detected (right)!")
+            self.previous = self.snapshot()
+            self.state.step(TICK, inputs._replace(blink=blinks[0], blink2=blinks[1]))
+            self.sim_time = tick_end
+            if self.broadcast is not None:
+                self.broadcast.publish(tick_end, self.snapshot())
+    
+    def interpolated(self, alpha: float) -> Tuple[float, float, float, float]:
+        """Ball x/y and paddle y positions blended between the last two ticks."""
+        current = self.snapshot()
+        previous = self.previous
+        # Don't blend across a goal or round start (positions jump)
+        if previous is None or previous[4:] != current[4:]:
+            return current[:4]
+        return tuple(p + (c - p) * alpha for p, c in zip(previous[:4], current[:4]))
+    
+    def render_court(self):
+        """Pre-render the static court (background, center line, gutters, circle)."""
+        court = pygame.Surface((self.WIDTH, self.HEIGHT)).convert()
+        court.fill(self.BLACK)
+        pygame.draw.line(court, self.WHITE, [self.WIDTH / 2, 0], [self.WIDTH / 2, self.HEIGHT], 1)
+        pygame.draw.line(court, self.WHITE, [self.PAD_WIDTH, 0], [self.PAD_WIDTH, self.HEIGHT], 1)
+        pygame.draw.line(court, self.WHITE, [self.WIDTH - self.PAD_WIDTH, 0], [self.WIDTH - self.PAD_WIDTH, self.HEIGHT], 1)
+        pygame.draw.circle(court, self.WHITE, [self.WIDTH//2, self.HEIGHT//2], 70, 1)
+        return court
+    
+    def score_label(self, x: int, score: int):
+        """Rendered score text, re-rendered only when the score changes."""
+        key = (x, score)
+        label = self.score_labels.get(key)
+        if label is None:
+            # Keep just the current label for each side
+            self.score_labels = {k: v for k, v in self.score_labels.items() if k[0] != x}
+            label = self.score_labels[key] = self.score_font.render("Score " + str(score), 1, self.YELLOW)
+        return label
+    
+    def draw(self, alpha: float = 1.0):
+        """Render the game state; returns the screen rectangles that changed.
+
+        `alpha` is how far the frame lies between the last two physics ticks.
+        """
+        state = self.state
+        ball_x, ball_y, paddle1_y, paddle2_y = self.interpolated(alpha)
         
-        # Only update positions if game has started
-        if self.game_started:
-            # Update paddle positions - paddle bounces off top/bottom walls
-            if (self.paddle1_pos[1] > self.HALF_PAD_HEIGHT and 
-                self.paddle1_pos[1] < self.HEIGHT - self.HALF_PAD_HEIGHT):
-                self.paddle1_pos[1] += self.paddle1_vel
-            elif self.paddle1_pos[1] <= self.HALF_PAD_HEIGHT and self.paddle1_vel < 0:
-                # Hit top wall, reverse direction
-                self.paddle1_vel = 0
-            elif self.paddle1_pos[1] >= self.HEIGHT - self.HALF_PAD_HEIGHT and self.paddle1_vel > 0:
-                # Hit bottom wall, reverse direction  
-                self.paddle1_vel = 0
-            else:
-                self.paddle1_pos[1] += self.paddle1_vel
-            
-            # Update paddle2 position
-            if self.npc_mode:
-                # AI follows ball Y position
-                ball_center_y = self.ball_pos[1]
-                paddle2_center_y = self.paddle2_pos[1]
-                
-                if ball_center_y < paddle2_center_y - 5:
-                    self.paddle2_pos[1] -= 3  # Move up
-                elif ball_center_y > paddle2_center_y + 5:
-                    self.paddle2_pos[1] += 3  # Move down
-                
-                # Keep paddle2 in bounds
-                self.paddle2_pos[1] = max(self.HALF_PAD_HEIGHT, 
-                                        min(self.paddle2_pos[1], self.HEIGHT - self.HALF_PAD_HEIGHT))
-            else:
-                # Human keyboard control
-                if pygame.K_UP in self.keys_pressed:
-                    self.paddle2_pos[1] -= 6
-                if pygame.K_DOWN in self.keys_pressed:
-                    self.paddle2_pos[1] += 6
-                
-                # Keep paddle2 in bounds
-                self.paddle2_pos[1] = max(self.HALF_PAD_HEIGHT, 
-                                        min(self.paddle2_pos[1], self.HEIGHT - self.HALF_PAD_HEIGHT))
-            
-            # Update ball position
-            self.ball_pos[0] += int(self.ball_vel[0])
-            self.ball_pos[1] += int(self.ball_vel[1])
+        # Restore the court under everything drawn last frame
+        if self.full_redraw:
+            self.window.blit(self.background, (0, 0))
+            erased = [self.window.get_rect()]
+            self.full_redraw = False
+        else:
+            erased = self.dirty_rects
+            for rect in erased:
+                self.window.blit(self.background, rect, rect)
+        drawn = []
         
         # Draw ball and paddles
-        pygame.draw.circle(self.window, self.RED, [int(self.ball_pos[0]), int(self.ball_pos[1])], self.BALL_RADIUS, 0)
-        
-        # Draw paddle1 (left, controlled by blinks)
-        pygame.draw.polygon(self.window, self.GREEN, [
-            [self.paddle1_pos[0] - self.HALF_PAD_WIDTH, self.paddle1_pos[1] - self.HALF_PAD_HEIGHT],
-            [self.paddle1_pos[0] - self.HALF_PAD_WIDTH, self.paddle1_pos[1] + self.HALF_PAD_HEIGHT],
-            [self.paddle1_pos[0] + self.HALF_PAD_WIDTH, self.paddle1_pos[1] + self.HALF_PAD_HEIGHT],
-            [self.paddle1_pos[0] + self.HALF_PAD_WIDTH, self.paddle1_pos[1] - self.HALF_PAD_HEIGHT]
-        ], 0)
+        drawn.append(pygame.draw.circle(self.window, self.RED, [int(ball_x), int(ball_y)], self.BALL_RADIUS, 0))
         
-        # Draw paddle2 (right, stationary for now)
-        pygame.draw.polygon(self.window, self.GREEN, [
-            [self.paddle2_pos[0] - self.HALF_PAD_WIDTH, self.paddle2_pos[1] - self.HALF_PAD_HEIGHT],
-            [self.paddle2_pos[0] - self.HALF_PAD_WIDTH, self.paddle2_pos[1] + self.HALF_PAD_HEIGHT],
-            [self.paddle2_pos[0] + self.HALF_PAD_WIDTH, self.paddle2_pos[1] + self.HALF_PAD_HEIGHT],
-            [self.paddle2_pos[0] + self.HALF_PAD_WIDTH, self.paddle2_pos[1] - self.HALF_PAD_HEIGHT]
-        ], 0)
+        # Draw paddle1 (left, controlled by blinks) and paddle2 (right)
+        for paddle_pos in ((state.paddle1_pos[0], paddle1_y), (state.paddle2_pos[0], paddle2_y)):
+            drawn.append(pygame.draw.polygon(self.window, self.GREEN, [
+                [paddle_pos[0] - self.HALF_PAD_WIDTH, paddle_pos[1] - self.HALF_PAD_HEIGHT],
+                [paddle_pos[0] - self.HALF_PAD_WIDTH, paddle_pos[1] + self.HALF_PAD_HEIGHT],
+                [paddle_pos[0] + self.HALF_PAD_WIDTH, paddle_pos[1] + self.HALF_PAD_HEIGHT],
+                [paddle_pos[0] + self.HALF_PAD_WIDTH, paddle_pos[1] - self.HALF_PAD_HEIGHT]
+            ], 0))
         
-        # Ball collision with walls
-        if int(self.ball_pos[1]) <= self.BALL_RADIUS:
-            self.ball_vel[1] = -self.ball_vel[1]
-        if int(self.ball_pos[1]) >= self.HEIGHT + 1 - self.BALL_RADIUS:
-            self.ball_vel[1] = -self.ball_vel[1]
+        # Predicted landing point on the paddle line the ball is heading for
+        landing = state.landing() if self.show_landing and state.game_started else None
+        if landing is not None:
+            x, y, _ = landing
+            drawn.append(pygame.draw.circle(self.window, self.YELLOW, [int(x), int(y)], 5, 1))
         
-        # Ball collision with paddles
-        if (int(self.ball_pos[0]) <= self.BALL_RADIUS + self.PAD_WIDTH and 
-            int(self.ball_pos[1]) in range(int(self.paddle1_pos[1] - self.HALF_PAD_HEIGHT), 
-                                         int(self.paddle1_pos[1] + self.HALF_PAD_HEIGHT), 1)):
-            self.ball_vel[0] = -self.ball_vel[0]
-            self.ball_vel[0] *= 1.1
-            self.ball_vel[1] *= 1.1
-        elif int(self.ball_pos[0]) <= self.BALL_RADIUS + self.PAD_WIDTH:
-            self.r_score += 1
-            self.reset_round(True)
+        # Draw scores (cached surfaces; the ball may have passed over them)
+        drawn.append(self.window.blit(self.score_label(50, state.l_score), (50, 20)))
+        drawn.append(self.window.blit(self.score_label(470, state.r_score), (470, 20)))
         
-        if (int(self.ball_pos[0]) >= self.WIDTH + 1 - self.BALL_RADIUS - self.PAD_WIDTH and 
-            int(self.ball_pos[1]) in range(int(self.paddle2_pos[1] - self.HALF_PAD_HEIGHT), 
-                                         int(self.paddle2_pos[1] + self.HALF_PAD_HEIGHT), 1)):
-            self.ball_vel[0] = -self.ball_vel[0]
-            self.ball_vel[0] *= 1.1
-            self.ball_vel[1] *= 1.1
-        elif int(self.ball_pos[0]) >= self.WIDTH + 1 - self.BALL_RADIUS - self.PAD_WIDTH:
-            self.l_score += 1
-            self.reset_round(False)
+        # Draw "Blink to start!" text if game hasn't started
+        if not state.game_started:
+            drawn.append(self.window.blit(self.start_text, self.start_rect))
         
-        # Draw scores
-        font = pygame.font.SysFont("Comic Sans MS", 20)
-        label1 = font.render("Score " + str(self.l_score), 1, self.YELLOW)
-        self.window.blit(label1, (50, 20))
+        if self.metrics is not None:
+            drawn.extend(self.draw_hud())
         
-        label2 = font.render("Score " + str(self.r_score), 1, self.YELLOW)
-        self.window.blit(label2, (470, 20))
+        self.dirty_rects = drawn
+        return erased + drawn
+    
+    def draw_hud(self):
+        """Overlay fps, frame time, DSP time and the latest detection latency."""
+        rects = []
+        lines = [
+            f"{self.scheduler.fps:5.1f} fps  frame {self.metrics.last('frame') * 1e3:5.1f} ms",
+            f"DSP {self.metrics.last('dsp') * 1e3:5.2f} ms",
+            f"latency {self.metrics.last('detection_age') * 1e3:5.0f} ms",
+        ]
+        y = self.HEIGHT - 16 * len(lines) - 4
+        for line in lines:
+            rects.append(self.window.blit(self.hud_font.render(line, 1, self.WHITE), (self.PAD_WIDTH + 6, y)))
+            y += 16
+        return rects
+    
+    def show_status(self, message: str) -> bool:
+        """Draw the empty court with a message (e.g. while connecting); False once the window is closed."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
         
-        # Draw "Blink to start!" text if game hasn't started
-        if not self.game_started:
-            big_font = pygame.font.SysFont("Comic Sans MS", 36)
-            start_text = big_font.render("Blink to start!", 1, self.WHITE)
-            text_rect = start_text.get_rect(center=(self.WIDTH//2, self.HEIGHT//2))
-            self.window.blit(start_text, text_rect)
+        self.window.blit(self.background, (0, 0))
+        text = self.score_font.render(message, 1, self.WHITE)
+        self.window.blit(text, text.get_rect(center=(self.WIDTH//2, self.HEIGHT//2)))
+        pygame.display.flip()
+        self.full_redraw = True  # The game's first frame starts from a clean court
+        return self.running
     
     def process_events(self):
         """Process pygame events."""
@@ -250,11 +258,19 @@ class PongGame:
             elif event.type == pygame.KEYUP:
                 if event.key in [pygame.K_UP, pygame.K_DOWN]:
                     self.keys_pressed.discard(event.key)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.full_redraw = True  # Window contents were lost
         
         return True, spacebar_pressed
     
-    def run_frame(self, blink_detected: bool = False, simulation_mode: bool = False):
-        """Run one frame of the game."""
+    def run_frame(self, blink_detected: bool = False, simulation_mode: bool = False,
+                  events: Sequence[BlinkEvent] = ()):
+        """Run one frame of the game.
+
+        Detector events (given here or pending on the event queue) are
+        applied at the physics tick covering their timestamp, however many
+        arrived since the last frame; `blink_detected` and the spacebar mean "now".
+        """
         continue_running, spacebar_pressed = self.process_events()
         
         if not continue_running:
@@ -262,14 +278,19 @@ class PongGame:
             return False
         
         # Handle input
+        now = self.clock()
         if blink_detected or (simulation_mode and spacebar_pressed):
-            self.handle_blink()
-        
-        # Draw everything
-        self.draw()
+            self.queue_blink(now)
+        for event in events:
+            self.queue_event(event)
         
-        pygame.display.update()
-        self.clock.tick(60)
+        # Catch the physics up to now, then draw between the last two ticks
+        frame_start = time.perf_counter()
+        self.update(now)
+        pygame.display.update(self.draw((now - self.sim_time) / TICK))
+        if self.metrics is not None:
+            self.metrics.record('frame', frame_start)
+        self.scheduler.wait()
         
         return True
     
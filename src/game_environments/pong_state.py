@@ -0,0 +1,279 @@
+import math
+import random
+from typing import NamedTuple, Optional, Tuple
+
+
+# Speeds are in pixels per second; the original game moved per 60 Hz frame
+TICK_RATE = 60
+TICK = 1.0 / TICK_RATE
+
+
+class PongInputs(NamedTuple):
+    """Player input for one physics step."""
+    blink: bool = False  # Left player: start the round or flip paddle direction
+    up: bool = False     # Right player (human mode)
+    down: bool = False
+    blink2: bool = False  # Right player when it is blink-controlled (a second headset)
+
+
+NO_INPUT = PongInputs()
+
+
+def reflect(y, low: float, high: float):
+    """Fold an unbounded coordinate into [low, high], as a ball bouncing between walls there.
+
+    Works elementwise on NumPy arrays too.
+    """
+    span = high - low
+    u = (y - low) % (2 * span)
+    return low + span - abs(u - span)
+
+
+def _time_to_limit(p: float, v: float, low: float, high: float) -> float:
+    """Seconds until p, moving at v, reaches the limit it is heading for (inf if v == 0)."""
+    if v > 0:
+        return max((high - p) / v, 0.0)
+    if v < 0:
+        return max((low - p) / v, 0.0)
+    return math.inf
+
+
+class PongState:
+    """Pong rules and physics with no rendering or pygame dependency.
+
+    `step(dt, inputs)` advances the game by dt seconds, so the same rules can
+    run interactively at the display rate or headless as fast as possible.
+    Speeds match the original per-frame movement at dt = 1/60; ball contacts
+    are resolved at their time of impact, so a long step or a fast ball
+    cannot skip a bounce.
+    """
+
+    def __init__(self, width: int = 600, height: int = 400, npc_mode: bool = False,
+                 ball_speed: float = 6.0 * TICK_RATE, rng: Optional[random.Random] = None,
+                 blink_right: bool = False):
+        # Constants
+        self.WIDTH = width
+        self.HEIGHT = height
+        self.BALL_RADIUS = 10
+        self.PAD_WIDTH = 8
+        self.PAD_HEIGHT = 80
+        self.HALF_PAD_WIDTH = self.PAD_WIDTH / 2
+        self.HALF_PAD_HEIGHT = self.PAD_HEIGHT / 2
+        self.PADDLE_SPEED = 4 * TICK_RATE     # Blink-controlled paddle
+        self.NPC_SPEED = 3 * TICK_RATE        # AI paddle
+        self.KEYBOARD_SPEED = 6 * TICK_RATE   # Arrow-key paddle
+        self.NPC_DEADBAND = 5
+        self.SPEEDUP = 1.1                    # Ball speed-up per paddle hit
+        # Limits of the ball centre: walls, and the lines where a paddle returns it or it scores
+        self.BALL_TOP = self.BALL_RADIUS
+        self.BALL_BOTTOM = self.HEIGHT + 1 - self.BALL_RADIUS
+        self.LEFT_LINE = self.BALL_RADIUS + self.PAD_WIDTH
+        self.RIGHT_LINE = self.WIDTH + 1 - self.BALL_RADIUS - self.PAD_WIDTH
+        self.MAX_CONTACTS = 16                # Bounces resolved per step (more only at absurd speeds)
+
+        self.rng = rng or random.Random()
+        self.npc_mode = npc_mode
+        self.blink_right = blink_right  # Right paddle follows blink2 instead of AI/keys
+        self.ball_speed = ball_speed
+
+        # Game state
+        self.ball_pos = [0.0, 0.0]
+        self.ball_vel = [0.0, 0.0]
+        self.paddle1_pos = [0.0, 0.0]
+        self.paddle2_pos = [0.0, 0.0]
+        self.paddle1_vel = 0.0
+        self.paddle2_vel = 0.0  # Only used when the right paddle is blink-controlled
+        self.l_score = 0
+        self.r_score = 0
+        self.paddle_direction = 1  # 1 for up, -1 for down
+        self.paddle2_direction = 1
+        self.game_started = False  # Waiting for a blink to start the round
+        self.ball_start_right = True  # Ball direction for when the round starts
+        self.time = 0.0  # Simulated seconds
+        # Optional callable(time, kind, player) told of 'start', 'flip', 'hit' and 'goal' events;
+        # player is 0 (left) or 1 (right), and time is when the event happened in simulated seconds
+        self.on_event = None
+
+        self.init_game()
+
+    def _launch_velocity(self, right: bool):
+        horz = self.ball_speed * self.rng.uniform(0.7, 1.3)  # Random variation
+        vert = self.ball_speed * self.rng.uniform(0.3, 0.8)
+        if not right:
+            horz = -horz
+        return [horz, -vert]
+
+    def ball_init(self, right: bool):
+        """Centre the ball; it only moves once the round has started."""
+        self.ball_pos = [self.WIDTH / 2, self.HEIGHT / 2]
+        if self.game_started:
+            self.ball_vel = self._launch_velocity(right)
+        else:
+            self.ball_vel = [0.0, 0.0]
+            self.ball_start_right = right
+
+    def init_game(self):
+        """Reset positions and scores."""
+        self.paddle1_pos = [self.HALF_PAD_WIDTH - 1, self.HEIGHT / 2]
+        self.paddle2_pos = [self.WIDTH + 1 - self.HALF_PAD_WIDTH, self.HEIGHT / 2]
+        self.paddle1_vel = 0.0  # Don't start moving until game starts
+        self.paddle2_vel = 0.0
+        self.l_score = 0
+        self.r_score = 0
+        self.ball_init(self.rng.randrange(0, 2) == 0)
+
+    def reset_paddles(self):
+        """Reset paddles to center position and continue moving."""
+        self.paddle1_pos = [self.HALF_PAD_WIDTH - 1, self.HEIGHT / 2]
+        self.paddle2_pos = [self.WIDTH + 1 - self.HALF_PAD_WIDTH, self.HEIGHT / 2]
+        self.paddle_direction = 1  # Reset to moving up
+        self.paddle2_direction = 1
+        if self.game_started:
+            self.paddle1_vel = self.paddle_direction * self.PADDLE_SPEED
+            if self.blink_right:
+                self.paddle2_vel = self.paddle2_direction * self.PADDLE_SPEED
+
+    def handle_blink(self, right: bool = False):
+        """Start the round, or alternate the direction of the left (or blink-controlled right) paddle."""
+        if not self.game_started:
+            self.start_game()
+            return
+        if right:
+            self.paddle2_direction *= -1
+            self.paddle2_vel = self.paddle2_direction * self.PADDLE_SPEED
+        else:
+            self.paddle_direction *= -1
+            self.paddle1_vel = self.paddle_direction * self.PADDLE_SPEED
+        if self.on_event is not None:
+            self.on_event(self.time, 'flip', int(right))
+
+    def start_game(self):
+        """Begin paddle and ball movement using the stored direction."""
+        self.game_started = True
+        self.paddle1_vel = self.paddle_direction * self.PADDLE_SPEED
+        if self.blink_right:
+            self.paddle2_vel = self.paddle2_direction * self.PADDLE_SPEED
+        self.ball_vel = self._launch_velocity(self.ball_start_right)
+        if self.on_event is not None:
+            self.on_event(self.time, 'start', 0)
+
+    def reset_round(self, ball_direction_right: bool):
+        """Reset for next round - requires blink to start."""
+        self.game_started = False
+        self.paddle1_vel = 0.0
+        self.paddle2_vel = 0.0
+        self.reset_paddles()
+        self.ball_init(ball_direction_right)
+
+    def _clamp_paddle(self, y: float) -> float:
+        return max(self.HALF_PAD_HEIGHT, min(y, self.HEIGHT - self.HALF_PAD_HEIGHT))
+
+    def _move_blink_paddle(self, y: float, vel: float, dt: float) -> Tuple[float, float]:
+        """Blink paddles stop at the top/bottom walls until the next blink."""
+        y += vel * dt
+        if (y <= self.HALF_PAD_HEIGHT and vel < 0) or (y >= self.HEIGHT - self.HALF_PAD_HEIGHT and vel > 0):
+            return self._clamp_paddle(y), 0.0
+        return y, vel
+
+    def _move_paddles(self, dt: float, inputs: PongInputs):
+        self.paddle1_pos[1], self.paddle1_vel = self._move_blink_paddle(
+            self.paddle1_pos[1], self.paddle1_vel, dt)
+
+        if self.blink_right:
+            self.paddle2_pos[1], self.paddle2_vel = self._move_blink_paddle(
+                self.paddle2_pos[1], self.paddle2_vel, dt)
+            return
+        if self.npc_mode:
+            # AI heads for where the ball will cross its line, or follows the ball while it moves away
+            target = self.ball_pos[1]
+            intercept = self.predict_intercept(right=True)
+            if intercept is not None:
+                target = intercept[0]
+            if target < self.paddle2_pos[1] - self.NPC_DEADBAND:
+                self.paddle2_pos[1] = max(self.paddle2_pos[1] - self.NPC_SPEED * dt, target)
+            elif target > self.paddle2_pos[1] + self.NPC_DEADBAND:
+                self.paddle2_pos[1] = min(self.paddle2_pos[1] + self.NPC_SPEED * dt, target)
+        else:
+            if inputs.up:
+                self.paddle2_pos[1] -= self.KEYBOARD_SPEED * dt
+            if inputs.down:
+                self.paddle2_pos[1] += self.KEYBOARD_SPEED * dt
+        self.paddle2_pos[1] = self._clamp_paddle(self.paddle2_pos[1])
+
+    def _paddle_covers(self, paddle_y: float, ball_y: float) -> bool:
+        return paddle_y - self.HALF_PAD_HEIGHT <= ball_y < paddle_y + self.HALF_PAD_HEIGHT
+
+    def predict_intercept(self, right: bool) -> Optional[Tuple[float, float]]:
+        """(y, seconds) where the ball will cross the left or right paddle line, bouncing off
+        the walls on the way; None if it is not moving towards that line."""
+        x, y = self.ball_pos
+        vx, vy = self.ball_vel
+        line = self.RIGHT_LINE if right else self.LEFT_LINE
+        if vx == 0 or (line - x) * vx < 0:
+            return None
+        t = (line - x) / vx
+        return reflect(y + vy * t, self.BALL_TOP, self.BALL_BOTTOM), t
+
+    def landing(self) -> Optional[Tuple[float, float, float]]:
+        """(x, y, seconds) of the paddle line the ball is heading for; None while it is still."""
+        if self.ball_vel[0] == 0:
+            return None
+        right = self.ball_vel[0] > 0
+        y, t = self.predict_intercept(right)
+        return (self.RIGHT_LINE if right else self.LEFT_LINE), y, t
+
+    def _move_ball(self, dt: float):
+        """Move the ball dt seconds, resolving each wall and paddle contact at its time of impact.
+
+        The path is swept rather than sampled, so the ball cannot pass through a
+        paddle or wall however fast it moves or however long the step.
+        """
+        remaining = dt
+        for _ in range(self.MAX_CONTACTS):
+            x, y = self.ball_pos
+            vx, vy = self.ball_vel
+            t_wall = _time_to_limit(y, vy, self.BALL_TOP, self.BALL_BOTTOM)
+            t_line = _time_to_limit(x, vx, self.LEFT_LINE, self.RIGHT_LINE)
+            t = min(t_wall, t_line)
+            if t > remaining:
+                break
+            self.ball_pos = [x + vx * t, y + vy * t]
+            remaining -= t
+
+            if t_wall <= t_line:
+                self.ball_vel[1] = -vy
+                continue
+            right = vx > 0
+            paddle_y = self.paddle2_pos[1] if right else self.paddle1_pos[1]
+            covered = self._paddle_covers(paddle_y, self.ball_pos[1])
+            if covered:
+                self.ball_vel[0] = -vx * self.SPEEDUP
+                self.ball_vel[1] = vy * self.SPEEDUP
+            elif right:
+                self.l_score += 1
+                self.reset_round(False)
+            else:
+                self.r_score += 1
+                self.reset_round(True)
+            if self.on_event is not None:
+                # A hit is credited to the paddle's player, a goal to the scorer
+                player = int(right) if covered else int(not right)
+                self.on_event(self.time + dt - remaining, 'hit' if covered else 'goal', player)
+            if not covered:
+                return
+
+        self.ball_pos[0] += self.ball_vel[0] * remaining
+        self.ball_pos[1] += self.ball_vel[1] * remaining
+
+    def step(self, dt: float = TICK, inputs: PongInputs = NO_INPUT):
+        """Apply inputs and advance the game by dt seconds."""
+        started = self.game_started
+        if inputs.blink:
+            self.handle_blink()
+        if inputs.blink2 and self.blink_right and (started or not inputs.blink):
+            self.handle_blink(right=True)  # Both starting the round together is one start
+
+        if self.game_started:
+            self._move_paddles(dt, inputs)
+            self._move_ball(dt)
+        self.time += dt
@@ -0,0 +1,46 @@
+import time
+
+
+class FrameScheduler:
+    """Pace a loop to a target frame rate.
+
+    Sleeps until shortly before each deadline and busy-waits the remainder,
+    which is far more accurate than sleep alone (pygame.time.Clock.tick
+    can overshoot by several ms). Deadlines advance by exactly one period so
+    rounding does not accumulate; after a stall longer than a period the
+    schedule restarts from now instead of rushing frames to catch up.
+    """
+
+    def __init__(self, fps: float = 60.0, spin: float = 0.002, clock=time.perf_counter):
+        self.period = 1.0 / fps
+        self.spin = spin  # Seconds before a deadline to stop sleeping and spin
+        self.clock = clock
+        self.next_deadline = None
+        self.last_frame = None
+        self.frame_time = self.period  # Seconds between the last two frames
+        self.fps = 0.0  # Smoothed frame rate
+
+    def wait(self) -> float:
+        """Block until the next frame is due; return seconds since the previous frame."""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now + self.period
+
+        remaining = self.next_deadline - now
+        if remaining > self.spin:
+            time.sleep(remaining - self.spin)
+        while self.clock() < self.next_deadline:
+            pass
+
+        now = self.clock()
+        if now - self.next_deadline > self.period:
+            self.next_deadline = now + self.period  # Fell behind; don't try to catch up
+        else:
+            self.next_deadline += self.period
+
+        if self.last_frame is not None:
+            self.frame_time = now - self.last_frame
+            rate = 1.0 / self.frame_time if self.frame_time > 0 else 0.0
+            self.fps = rate if not self.fps else 0.9 * self.fps + 0.1 * rate
+        self.last_frame = now
+        return self.frame_time
@@ -0,0 +1,123 @@
+import math
+import time
+import numpy as np
+from typing import Dict
+
+
+class Histogram:
+    """Fixed-size log-spaced histogram of durations in seconds (1 µs to ~100 s).
+
+    Adding a value is O(1) with no allocation; percentiles are accurate to
+    the bin width (about 5% with the default resolution).
+    """
+
+    def __init__(self, low: float = 1e-6, high: float = 100.0, bins_per_decade: int = 48):
+        self.low = low
+        self._scale = bins_per_decade / math.log(10.0)
+        self._log_low = math.log(low)
+        n_bins = int(math.ceil(math.log10(high / low) * bins_per_decade)) + 1
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, value: float):
+        index = int((math.log(value) - self._log_low) * self._scale) if value > self.low else 0
+        self.counts[min(index, len(self.counts) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin holding the q-th percentile (0 when empty)."""
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100.0 * self.count))
+        return min(math.exp(self._log_low + (index + 1) / self._scale), self.max)
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+
+class Instrumentation:
+    """Named stage timers, counters and sample ages for the hot path.
+
+    Usage is `t0 = metrics.clock(); ...; metrics.record('dsp', t0)`. When
+    disabled every method returns immediately, so the calls can stay in the
+    frame loop. Sample ages compare LSL timestamps against `lsl_clock`
+    (pylsl.local_clock for live streams, the replay clock for recordings).
+    """
+
+    def __init__(self, enabled: bool = True, lsl_clock=None):
+        self.enabled = enabled
+        self.clock = time.perf_counter
+        self.lsl_clock = lsl_clock or time.perf_counter
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, int] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        return histogram
+
+    def record(self, name: str, start: float):
+        """Record the time elapsed since `start` (a value of self.clock())."""
+        if self.enabled:
+            self.histogram(name).add(self.clock() - start)
+
+    def record_value(self, name: str, value: float):
+        if self.enabled:
+            self.histogram(name).add(value)
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_age(self, name: str, lsl_timestamp: float) -> float:
+        """Record how old a sample is now, from its LSL timestamp. Returns the age."""
+        if not self.enabled:
+            return 0.0
+        age = self.lsl_clock() - lsl_timestamp
+        self.histogram(name).add(max(age, 0.0))
+        return age
+
+    def last(self, name: str) -> float:
+        histogram = self.stages.get(name)
+        return histogram.last if histogram is not None else 0.0
+
+    def summary(self) -> dict:
+        """Per-stage count/mean/p50/p95/p99/max (seconds) plus counters."""
+        stages = {}
+        for name, histogram in self.stages.items():
+            if histogram.count:
+                stages[name] = {'count': histogram.count, 'mean': histogram.mean,
+                                'p50': histogram.percentile(50), 'p95': histogram.percentile(95),
+                                'p99': histogram.percentile(99), 'max': histogram.max}
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+    def report(self) -> str:
+        """Human-readable summary table (milliseconds)."""
+        summary = self.summary()
+        lines = [f"{'stage':>16} {'count':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"]
+        for name, stats in summary['stages'].items():
+            lines.append(f"{name:>16} {stats['count']:8d} {stats['p50'] * 1e3:8.2f} "
+                         f"{stats['p95'] * 1e3:8.2f} {stats['p99'] * 1e3:8.2f} {stats['max'] * 1e3:8.2f}")
+        for name, value in summary['counters'].items():
+            lines.append(f"{name:>16} {value:8d}")
+        return "\n".join(lines)
+
+
+# Shared disabled instance for components created without instrumentation
+DISABLED = Instrumentation(enabled=False)
@@ -0,0 +1,39 @@
+import time
+from typing import List, Tuple
+
+
+class StartupProfile:
+    """Wall-clock time of each startup phase, reported by main.py --startup-profile.
+
+    `mark(name)` closes a phase on the main thread (it started at the
+    previous mark, or at `start`). Work overlapped on another thread is
+    added with `add` and listed separately, since it does not add to the
+    time to first frame.
+    """
+
+    def __init__(self, enabled: bool = True, start: float = None):
+        self.enabled = enabled
+        self.clock = time.perf_counter
+        self.start = self.clock() if start is None else start
+        self._last = self.start
+        self.phases: List[Tuple[str, float]] = []
+        self.background: List[Tuple[str, float]] = []
+
+    def mark(self, name: str):
+        if self.enabled:
+            now = self.clock()
+            self.phases.append((name, now - self._last))
+            self._last = now
+
+    def add(self, name: str, seconds: float):
+        if self.enabled:
+            self.background.append((name, seconds))
+
+    def report(self) -> str:
+        lines = ["Startup (ms):"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<24} {seconds * 1e3:8.1f}")
+        for name, seconds in self.background:
+            lines.append(f"  {name + ' (background)':<24} {seconds * 1e3:8.1f}")
+        lines.append(f"  {'total':<24} {(self._last - self.start) * 1e3:8.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+import glob
+import json
+import os
+import queue
+import threading
+from collections import deque
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from profiling.instrumentation import DISABLED
+
+
+# Layout of a telemetry directory: schema.json maps each table to its column
+# names, and <table>/<chunk>.npy holds one batch as a (columns x rows)
+# float64 array, so each column is contiguous on disk and a chunk can be
+# memory-mapped. Chunks are complete files; a crash loses at most the
+# batches still in memory.
+SCHEMA = 'schema.json'
+
+# Game event kinds, stored by index in the 'game' table's kind column
+GAME_EVENTS = ('start', 'flip', 'hit', 'goal')
+
+
+class TelemetryTable:
+    """One named log with fixed float columns, filled into preallocated batches.
+
+    Rows are copied into a (columns x batch_rows) batch; a full batch is
+    handed to the writer thread and replaced by a recycled one, so memory
+    stays at a few batches however long the session runs.
+    """
+
+    def __init__(self, writer: 'TelemetryWriter', name: str, columns: Sequence[str],
+                 batch_rows: int = 4096):
+        self.writer = writer
+        self.name = name
+        self.columns = tuple(columns)
+        self.batch_rows = batch_rows
+        self._spare = deque()  # Batches the writer has finished with (deque ops are atomic)
+        self._batch = self._new_batch()
+        self._rows = 0
+        self.rows_written = 0  # Rows handed to the writer (some may have been dropped)
+
+    def _new_batch(self) -> np.ndarray:
+        try:
+            return self._spare.pop()
+        except IndexError:
+            return np.zeros((len(self.columns), self.batch_rows))
+
+    def append(self, *values: float):
+        """Add one row (one value per column)."""
+        self._batch[:, self._rows] = values
+        self._rows += 1
+        if self._rows == self.batch_rows:
+            self.flush()
+
+    def extend(self, *columns):
+        """Add many rows, given as one array (or scalar, repeated) per column."""
+        n = max((np.size(column) for column in columns), default=0)
+        start = 0
+        while start < n:
+            count = min(n - start, self.batch_rows - self._rows)
+            block = self._batch[:, self._rows:self._rows + count]
+            for i, column in enumerate(columns):
+                block[i] = column[start:start + count] if np.ndim(column) else column
+            self._rows += count
+            start += count
+            if self._rows == self.batch_rows:
+                self.flush()
+
+    def flush(self):
+        """Hand the current (possibly partial) batch to the writer."""
+        if self._rows == 0:
+            return
+        self.writer._submit(self, self._batch, self._rows)
+        self.rows_written += self._rows
+        self._batch = self._new_batch()
+        self._rows = 0
+
+
+class TelemetryWriter:
+    """Write TelemetryTables to a directory from a background thread.
+
+    The directory must be new or empty (FileExistsError otherwise), so one
+    session's schema never describes another session's chunks. At most `max_pending` batches wait for the disk; when the queue is full a
+    batch is dropped and its rows counted in `dropped_rows` (and the
+    'dropped_telemetry_rows' counter of `metrics`), so producers never block.
+    """
+
+    def __init__(self, directory: str, max_pending: int = 32, metrics=DISABLED):
+        self.directory = directory
+        self.metrics = metrics
+        self.tables: Dict[str, TelemetryTable] = {}
+        self.dropped_rows = 0
+        self.error = None  # Exception that stopped the writer thread, if any
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._chunks: Dict[str, int] = {}  # Next chunk number per table
+        os.makedirs(directory, exist_ok=True)
+        if os.listdir(directory):
+            raise FileExistsError(f"{directory} is not empty; telemetry needs a new directory per session")
+        self._thread = threading.Thread(target=self._run, name="TelemetryWriter", daemon=True)
+        self._thread.start()
+
+    def table(self, name: str, columns: Sequence[str], batch_rows: int = 4096) -> TelemetryTable:
+        """Create (or return the existing) table `name` and record its columns in the schema."""
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = TelemetryTable(self, name, columns, batch_rows)
+            os.makedirs(os.path.join(self.directory, name), exist_ok=True)
+            self._chunks[name] = 0
+            schema = {key: list(t.columns) for key, t in self.tables.items()}
+            with open(os.path.join(self.directory, SCHEMA), 'w') as f:
+                json.dump(schema, f, indent=2)
+        return table
+
+    def _submit(self, table: TelemetryTable, batch: np.ndarray, rows: int):
+        try:
+            self._queue.put_nowait((table, batch, rows))
+        except queue.Full:
+            table._spare.append(batch)
+            self.dropped_rows += rows
+            self.metrics.count('dropped_telemetry_rows', rows)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            table, batch, rows = item
+            try:
+                if self.error is None:
+                    chunk = self._chunks[table.name]
+                    path = os.path.join(self.directory, table.name, f"{chunk:06d}.npy")
+                    np.save(path, batch[:, :rows])
+                    self._chunks[table.name] = chunk + 1
+            except OSError as e:
+                self.error = e  # e.g. disk full; keep draining so producers never block
+            table._spare.append(batch)
+
+    def close(self):
+        """Flush every table and wait for the writer to finish."""
+        for table in self.tables.values():
+            table.flush()
+        self._queue.put(None)  # Blocks only if the queue is full, which the writer is draining
+        self._thread.join()
+
+
+def load_table(directory: str, name: str) -> Dict[str, np.ndarray]:
+    """Read a table written by TelemetryWriter as {column: values}."""
+    with open(os.path.join(directory, SCHEMA)) as f:
+        columns = json.load(f)[name]
+    paths = sorted(glob.glob(os.path.join(directory, name, '*.npy')))
+    chunks = [np.load(path, mmap_mode='r') for path in paths]
+    data = np.concatenate(chunks, axis=1) if chunks else np.zeros((len(columns), 0))
+    return dict(zip(columns, data))
+
+
+class SessionTelemetry:
+    """The tables logged during a game session.
+
+    - features: band powers of every update (timestamp, source, one column per band)
+    - detector: detector state after each processed chunk (its `state_fields`);
+      a detector with other fields (e.g. switched mid-session) gets its own
+      table, detector_2, detector_3, ... in the order they appear
+    - blinks: detected blink events (timestamp, source, confidence)
+    - game: game events (clock time, kind index into GAME_EVENTS, player, scores)
+
+    Rows are logged per band-power update (fs / 16 a second per headset),
+    not per sample; use main.py --record to keep the raw samples.
+    """
+
+    def __init__(self, directory: str, bands: Sequence[str], max_pending: int = 32,
+                 metrics=DISABLED):
+        self.writer = TelemetryWriter(directory, max_pending=max_pending, metrics=metrics)
+        self.features = self.writer.table('features', ('timestamp', 'source') + tuple(bands))
+        self.blinks = self.writer.table('blinks', ('timestamp', 'source', 'confidence'), batch_rows=256)
+        self.game = self.writer.table('game', ('time', 'kind', 'player', 'l_score', 'r_score'),
+                                      batch_rows=256)
+        self.detectors: Dict[tuple, TelemetryTable] = {}  # Detector tables by state_fields
+
+    @property
+    def dropped_rows(self) -> int:
+        return self.writer.dropped_rows
+
+    def log_features(self, rows: np.ndarray, timestamps: np.ndarray, source: int = 0):
+        if len(rows):
+            self.features.extend(timestamps, source, *rows.T)
+
+    def log_detector(self, detector, timestamp: float, source: int = 0):
+        if detector is None or not detector.state_fields:
+            return
+        table = self.detectors.get(detector.state_fields)
+        if table is None:
+            # Created on first use, when the detector's fields are known
+            name = f"detector_{len(self.detectors) + 1}" if self.detectors else 'detector'
+            table = self.detectors[detector.state_fields] = self.writer.table(
+                name, ('timestamp', 'source') + tuple(detector.state_fields))
+        table.append(timestamp, source, *detector.state())
+
+    def log_blinks(self, events: List):
+        for event in events:
+            self.blinks.append(event.timestamp, event.source, event.confidence)
+
+    def log_game(self, time: float, kind: str, player: int, l_score: int, r_score: int):
+        self.game.append(time, GAME_EVENTS.index(kind), player, l_score, r_score)
+
+    def close(self):
+        self.writer.close()
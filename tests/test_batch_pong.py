@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from game_environments.batch_pong import simulate
+from game_environments.pong_state import TICK
+
+
+@pytest.mark.parametrize('start_time', [0.0, 1234.5])
+def test_blink_on_tick_boundary_applies_at_that_tick(start_time):
+    # PongGame applies a blink at the first tick ending after it, so a blink
+    # exactly at the start of tick 3 belongs to tick 3, not tick 2
+    boundary = start_time + 3 * TICK
+    games = simulate([[boundary], [boundary + 0.5 * TICK], [boundary - 0.5 * TICK]],
+                     duration=0.5, start_time=start_time, seed=0)
+    on, inside, before = games.paddle1_y
+    assert on == inside
+    assert on != before
+
+
+def test_blink_before_start_applies_at_first_tick():
+    games = simulate([[-0.5 * TICK], [0.0]], duration=0.5, seed=0)
+    assert games.game_started.all()
+    assert games.paddle1_y[0] == games.paddle1_y[1]
+
+
+def test_second_blink_in_a_tick_carries_over_to_the_next():
+    # Two blinks in tick 3 start the game at tick 3 and flip the paddle at tick 4,
+    # as PongGame keeps a player's second blink of a tick for the next one
+    same_tick = [3.1 * TICK, 3.6 * TICK]
+    games = simulate([same_tick, [3.1 * TICK, 4.1 * TICK], [3.1 * TICK]],
+                     duration=0.5, seed=0)
+    carried, consecutive, single = games.paddle1_y
+    assert carried == consecutive
+    assert carried != single
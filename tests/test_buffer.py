@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from eeg.buffer import RingBuffer
+
+
+def filled(capacity=64, slack=12, n=200):
+    ring = RingBuffer(capacity, 1, dtype=np.float64, slack=slack)
+    ring.write(np.arange(n, dtype=np.float64)[:, None], np.arange(n, dtype=np.float64))
+    return ring
+
+
+def test_full_window_is_trimmed_as_soon_as_the_producer_moves_on():
+    ring = filled()
+    count = ring.count
+    # The write slot for the next samples reuses the slots just before the window
+    assert ring.overrun(count, ring.capacity) == 0
+    ring.write(np.zeros((1, 1)), [0.0])
+    assert ring.overrun(count, ring.capacity) == 1
+
+
+def test_short_window_survives_capacity_minus_its_length():
+    ring = filled()
+    count = ring.count
+    n = ring.slack
+    ring.write(np.zeros((ring.capacity - n, 1)), np.zeros(ring.capacity - n))
+    assert ring.overrun(count, n) == 0
+    ring.write(np.zeros((1, 1)), [0.0])
+    assert ring.overrun(count, n) == 1
+
+
+def test_since_copies_long_backlogs_in_order():
+    ring = filled()
+    data, timestamps, count = ring.since(ring.count - ring.capacity)
+    assert count == ring.count
+    np.testing.assert_array_equal(timestamps, np.arange(count - ring.capacity, count))
+    np.testing.assert_array_equal(data[:, 0], timestamps)
+    assert not np.shares_memory(data, ring._data)